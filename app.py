@@ -2,17 +2,37 @@
 # - Exact section headers/wording cloned from your Mignesh PDF (embedded below)
 # - Real calculations from Excel or manual inputs (no demo numbers)
 # - Vertical prompts for missing values + "Fill with AI" option
-# - Self-contained CSS/HTML (no external files needed)
-# - Generates a long, colorful PDF via xhtml2pdf
+# - Self-contained CSS/HTML (report_render.py, no external files needed)
+# - Instant HTML preview, HTML / XLSX downloads; the long, colorful PDF (xhtml2pdf) on request
+# - Report contents by profile (full / summary only / numbers only); blank sections are left out
 
-import os, io, math, datetime, base64
-from decimal import Decimal, getcontext
+import os, io, math, datetime, base64, hashlib, contextlib
+from decimal import Decimal
 from typing import List, Dict, Any, Tuple
 
 import streamlit as st
 import pandas as pd
-from jinja2 import Template
-from xhtml2pdf import pisa
+
+import results_store
+import dcf_engine
+import portfolio
+import statements
+import formatting
+import solver
+import comps
+import ingest
+import schema
+import profiling
+import metrics
+import report_render
+import render_pool
+import charts
+from report_render import CSS_TEXT, build_theory_pages
+from formatting import NumberFormat, format_list
+from dcf_engine import (
+    D, is_empty, CORE_FIELDS, PER_YEAR_PREFIXES,
+    row_horizon, value_inputs, build_sensitivity,
+)
 
 # =========================
 # 🔐 GPT (optional, embedded key)
@@ -29,25 +49,8 @@ except Exception:
     USE_GPT = False
 
 # =========================
-# ⚙️ Precision & helpers
+# ⚙️ Helpers
 # =========================
-getcontext().prec = 12
-
-def D(x) -> Decimal:
-    try:
-        return Decimal(str(x))
-    except Exception:
-        return Decimal(0)
-
-def is_empty(x) -> bool:
-    return (x is None) or (str(x).strip() == "") or (pd.isna(x))
-
-def fmt_num(x, d=2) -> str:
-    try:
-        return f"{float(Decimal(str(x))):,.{d}f}"
-    except Exception:
-        return ""
-
 def ensure_table(columns: List[str], rows: List[List[Any]], min_cols=2) -> Tuple[List[str], List[List[Any]]]:
     cols = list(columns) if columns else []
     if len(cols) < 1:
@@ -70,540 +73,319 @@ def ensure_table(columns: List[str], rows: List[List[Any]], min_cols=2) -> Tuple
         rws = fixed
     return cols, rws
 
-# =========================
-# 🎨 Embedded CSS (PDF-safe, blue theme)
-# =========================
-CSS_TEXT = """
-@page { size: A4; margin: 18mm 16mm 18mm 16mm; }
-body { font-family: Arial, Helvetica, sans-serif; color: #111; }
-.page { page-break-after: always; }
-.page:last-child { page-break-after: auto; }
-
-h1, h2, h3 { margin: 0 0 10px 0; font-weight: 700; line-height: 1.25; }
-h1 { font-size: 26px; color: #003366; border-bottom: 4px solid #003366; padding-bottom: 6px; }
-h2 { font-size: 18px; background: #003366; color: #ffffff; padding: 6px 10px; }
-h3 { font-size: 13px; color: #003366; margin-top: 6px; }
-
-p { line-height: 1.45; margin: 8px 0; }
-ul { margin: 8px 0 0 16px; } li { margin: 4px 0; }
-.small { font-size: 10px; color: #555; } .big { font-size: 16px; font-weight: 700; }
-.num { text-align: right; } .emph { font-weight: 700; color: #1aa260; }
-
-.cover { background: #003366; color: #ffffff; min-height: 100%; }
-.cover-inner { margin-top: 90px; text-align: center; }
-.cover h1 { color: #ffffff; border: none; font-size: 34px; }
-.cover h2 { background: none; color: #ffffff; font-size: 20px; padding: 0; }
-.val-date { margin-top: 6px; font-size: 12px; }
-.cover-list { margin: 18px auto 10px auto; display: inline-block; text-align: left; }
-.cover-list li { margin: 4px 0; }
-.confidential { margin-top: 16px; font-weight: 700; color: #ffd700; }
-.advisor { margin-top: 6px; font-size: 12px; color: #e6eef7; }
-
-table { width: 100%; border-collapse: collapse; margin: 10px 0; font-size: 10.5px; }
-th, td { border: 1px solid #bfc5cf; padding: 6px 8px; vertical-align: top; line-height: 1.25; }
-th { background: #003366; color: #ffffff; }
-tr:nth-child(even) td { background: #f8f9fa; }
-.keytable th { width: 40%; text-align: left; background: #dce6f1; color: #000; border: 1px solid #9eb6d0; }
-.keytable td { background: #ffffff; }
-
-.card { padding: 10px; background: #e9f1fb; border: 1px solid #9eb6d0; }
-.grid-3 { display: table; width: 100%; border-spacing: 10px; }
-.grid-3 .card { display: table-cell; width: 33%; vertical-align: top; }
-.small th, .small td { font-size: 9.5px; }
-tr { page-break-inside: avoid; }
-blockquote { border-left: 4px solid #003366; padding-left: 10px; margin: 8px 0; color: #333; }
-"""
+# Fields that only label the report; rows equal in everything else value identically
+COVER_FIELDS = ("Company Name", "Client Name", "Unit Name", "Prepared By")
+
+def input_digest(row: pd.Series, n_years: int) -> str:
+    items = [(k, row[k]) for k in row.index if k not in COVER_FIELDS]
+    return hashlib.sha1(repr((n_years, items)).encode("utf-8")).hexdigest()
+
+def tornado_chart(t: Dict[str, Any], idx: int, number_format: NumberFormat) -> str:
+    low, high, base = t["low"][idx], t["high"][idx], float(t["base"][idx])
+    return charts.tornado_svg(
+        tuple(t["labels"]), tuple(low.round(2).tolist()), tuple(high.round(2).tolist()), round(base, 2),
+        tuple(format_list(low, number_format, blank="n/a")), tuple(format_list(high, number_format, blank="n/a")),
+        format_list([base], number_format, blank="n/a")[0], t["shock"])
+
+def sensitivity_heatmap(sens: Dict[str, Any], exit_view: Dict[str, Any], convention, wacc: float, tgr: float) -> str:
+    # the grid shown on the sensitivity page: WACC × exit multiple in exit mode, WACC × g otherwise
+    if convention.terminal == "exit" and exit_view["has_data"]:
+        labels = [r[0] for r in exit_view["rows"]]
+        centre = f"{convention.exit_multiple:.1f}x"
+        base = (labels.index(centre), exit_view["wacc_cols"].index(f"{wacc:.2%}")) if centre in labels else None
+        return charts.heatmap_svg(
+            tuple(labels), tuple(exit_view["wacc_cols"]),
+            tuple(tuple(round(v, 2) for v in vals) for vals in exit_view["values"]),
+            tuple(tuple(r[1]) for r in exit_view["rows"]), "Multiple", "WACC", base)
+    w_at = [abs(w - wacc) < 5e-5 for w in sens["wacc_values"]]
+    g_at = [abs(g - tgr) < 5e-5 for g in sens["g_values"]]
+    base = (g_at.index(True), w_at.index(True)) if any(w_at) and any(g_at) else None
+    return charts.heatmap_svg(
+        tuple(r[0] for r in sens["rows"]), tuple(sens["wacc_cols"]),
+        tuple(tuple(float("nan") if v is None else v for v in vals) for vals in sens["values"]),
+        tuple(tuple(r[1]) for r in sens["rows"]), "g", "WACC", base)
 
 # =========================
-# 📄 Embedded HTML template 
+# 🖥️ Streamlit UI
 # =========================
-TEMPLATE_HTML = r"""
-<!doctype html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>{{ company_name }} - Valuation Report</title>
-<style>{{ css }}</style>
-</head>
-<body>
-
-<!-- COVER -->
-<section class="cover page">
-  <div class="cover-inner">
-    <h1>{{ company_name }}</h1>
-    <h2>Valuation Report - {{ unit_name }}</h2>
-    <div class="val-date">Valuation Date – {{ valuation_date }}</div>
-    <ul class="cover-list">
-      {% for item in cover_services %}<li>{{ item }}</li>{% endfor %}
-    </ul>
-    <p class="confidential">Strictly Private and Confidential</p>
-    <div class="advisor">{{ prepared_by }}</div>
-  </div>
-</section>
-
-<!-- TABLE OF CONTENTS (static-ish; we mimic your PDF) -->
-<section class="page">
-  <h1>Table of Contents</h1>
-  <table class="toc">
-    <tr><td>Executive Summary</td><td class="num">1</td></tr>
-    <tr><td>Objective & Scope</td><td class="num">2</td></tr>
-    <tr><td>Company Background & Industry</td><td class="num">3</td></tr>
-    <tr><td>Methodology & Approach</td><td class="num">4</td></tr>
-    <tr><td>Assumptions, Disclaimers & Limiting Conditions</td><td class="num">5</td></tr>
-    <tr><td>Financials – Historical Summary</td><td class="num">6</td></tr>
-    <tr><td>Financials – Projected Summary</td><td class="num">7</td></tr>
-    <tr><td>WACC & DCF Valuation</td><td class="num">8</td></tr>
-    <tr><td>Sensitivity Analysis</td><td class="num">9</td></tr>
-    <tr><td>Reasonableness Checks</td><td class="num">10</td></tr>
-    <tr><td>Appendices</td><td class="num">11+</td></tr>
-  </table>
-</section>
-
-<!-- EXECUTIVE SUMMARY (exact wording section kept; numbers are live) -->
-<section class="page">
-  <h1>EXECUTIVE SUMMARY</h1>
-  <h2>ENGAGEMENT SUMMARY :</h2>
-  <table class="keytable">
-    <tr><th>Company under valuation</th><td>{{ company_name }}</td></tr>
-    <tr><th>Client</th><td>{{ client_name }}</td></tr>
-    <tr><th>Valuation approach</th><td>{{ valuation_approach }}</td></tr>
-    <tr><th>Date of valuation</th><td>{{ valuation_date }}</td></tr>
-    <tr><th>Purpose of Valuation</th><td>{{ purpose_text }}</td></tr>
-    <tr><th>Valuation Currency</th><td>{{ valuation_currency }}</td></tr>
-    <tr><th>Assumptions, disclaimers & limiting conditions</th><td>{{ assumptions_header_note }}</td></tr>
-  </table>
-
-  <h2>VALUATION SUMMARY :</h2>
-  <p>Based on the information provided, data gathered by us and analysis carried out by us, the Equity value of {{ company_name }}
-     using DCF method as on the Valuation Date has been tabulated below:</p>
-
-  <table class="keytable">
-    <tr><th>PV of Discrete Cash Flows</th><td class="num">{{ pv_discrete }}</td></tr>
-    <tr><th>PV of Terminal Value</th><td class="num">{{ pv_terminal }}</td></tr>
-    <tr><th>Enterprise Value (EV)</th><td class="num">{{ enterprise_value }}</td></tr>
-    <tr><th>Opening Cash</th><td class="num">{{ opening_cash }}</td></tr>
-    <tr><th>Other Non-Operating Assets</th><td class="num">{{ other_non_op_assets }}</td></tr>
-    <tr><th>Debt</th><td class="num">{{ debt }}</td></tr>
-    <tr><th>Discount for Lack of Marketability (DLOM)</th><td class="num">{{ dlom_display }}</td></tr>
-    <tr><th>Equity Value (Post-Money)</th><td class="num big">{{ equity_post_money }}</td></tr>
-  </table>
-
-  {% if executive_summary_extra %}
-  <blockquote>{{ executive_summary_extra }}</blockquote>
-  {% endif %}
-</section>
-
-<!-- OBJECTIVE & SCOPE -->
-<section class="page">
-  <h1>OBJECTIVE AND SCOPE</h1>
-  {% for p in theory_objective_scope %}<p>{{ p }}</p>{% endfor %}
-  <ul>{% for b in objective_scope_list %}<li>{{ b }}</li>{% endfor %}</ul>
-</section>
-
-<!-- COMPANY BACKGROUND & INDUSTRY -->
-<section class="page">
-  <h1>COMPANY BACKGROUND & INDUSTRY</h1>
-  {% for p in theory_company_industry %}<p>{{ p }}</p>{% endfor %}
-</section>
-
-<!-- METHODOLOGY & APPROACH -->
-<section class="page">
-  <h1>METHODOLOGY & APPROACH</h1>
-  {% for p in theory_methodology %}<p>{{ p }}</p>{% endfor %}
-  <ul>{% for m in methodology_points %}<li>{{ m }}</li>{% endfor %}</ul>
-</section>
-
-<!-- ASSUMPTIONS, DISCLAIMERS & LIMITING CONDITIONS -->
-<section class="page">
-  <h1>ASSUMPTIONS, DISCLAIMERS & LIMITING CONDITIONS</h1>
-  {% for p in theory_assumptions %}<p>{{ p }}</p>{% endfor %}
-  <ul>{% for a in assumptions_list %}<li>{{ a }}</li>{% endfor %}</ul>
-  <ul>{% for l in limitations_list %}<li>{{ l }}</li>{% endfor %}</ul>
-</section>
-
-<!-- FINANCIALS – HISTORICAL (safe stub if none) -->
-<section class="page">
-  <h1>FINANCIALS – HISTORICAL SUMMARY</h1>
-  <table class="wide small">
-    <thead><tr>{% for c in history.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
-    <tbody>
-      {% for r in history.rows %}
-        <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-
-<!-- FINANCIALS – PROJECTED SUMMARY -->
-<section class="page">
-  <h1>FINANCIALS – PROJECTED SUMMARY</h1>
-  <table class="wide">
-    <thead><tr>{% for c in forecast.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
-    <tbody>
-      {% for r in forecast.rows %}
-        <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-
-<!-- WACC & DCF -->
-<section class="page">
-  <h1>WACC & DCF VALUATION</h1>
-  <table class="keytable">
-    <tr><th>Discount Rate (WACC)</th><td>{{ wacc_display }}</td></tr>
-    <tr><th>Terminal Growth Rate</th><td>{{ tgr_display }}</td></tr>
-  </table>
-
-  <h2>DCF Workings</h2>
-  <table class="wide">
-    <thead><tr><th>Year</th><th>FCFF</th><th>Discount Factor</th><th>PV (FCFF)</th></tr></thead>
-    <tbody>
-      {% for r in dcf_rows %}
-        <tr>
-          <td>{{ r[0] }}</td>
-          <td class="num">{{ r[1] }}</td>
-          <td>{{ r[2] }}</td>
-          <td class="num">{{ r[3] }}</td>
-        </tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-
-<!-- SENSITIVITY -->
-<section class="page">
-  <h1>SENSITIVITY ANALYSIS</h1>
-  <p class="small">Enterprise value across WACC vs terminal growth.</p>
-  <table class="wide small">
-    <thead>
-      <tr>
-        <th>g \\ WACC</th>
-        {% for w in sensitivity.wacc_cols %}<th>{{ w }}</th>{% endfor %}
-      </tr>
-    </thead>
-    <tbody>
-      {% for row in sensitivity.rows %}
-        <tr>
-          <td>{{ row[0] }}</td>
-          {% for v in row[1] %}<td class="num">{{ v }}</td>{% endfor %}
-        </tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-
-<!-- REASONABLENESS CHECKS -->
-<section class="page">
-  <h1>REASONABLENESS CHECKS</h1>
-
-  <div class="card">
-    <h2>Comparable Companies</h2>
-    <table class="wide small">
-      <thead><tr>{% for c in comps.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
-      <tbody>
-        {% for r in comps.rows %}
-          <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
-        {% endfor %}
-      </tbody>
-    </table>
-  </div>
-
-  <div class="card" style="margin-top:10px;">
-    <h2>Comparable Transactions</h2>
-    <table class="wide small">
-      <thead><tr>{% for c in deals.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
-      <tbody>
-        {% for r in deals.rows %}
-          <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
-        {% endfor %}
-      </tbody>
-    </table>
-  </div>
-</section>
-
-<!-- STATEMENTS -->
-<section class="page">
-  <h1>STATEMENTS — BALANCE SHEET (Summary)</h1>
-  <table class="wide small">
-    <thead><tr><th>Particulars</th>{% for y in bs_years %}<th>{{ y }}</th>{% endfor %}</tr></thead>
-    <tbody>
-      {% for r in bs_rows %}
-        <tr><td>{{ r[0] }}</td>{% for v in r[1] %}<td class="num">{{ v }}</td>{% endfor %}</tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-
-<section class="page">
-  <h1>STATEMENTS — INCOME STATEMENT (Summary)</h1>
-  <table class="wide small">
-    <thead><tr><th>Particulars</th>{% for y in is_years %}<th>{{ y }}</th>{% endfor %}</tr></thead>
-    <tbody>
-      {% for r in is_rows %}
-        <tr><td>{{ r[0] }}</td>{% for v in r[1] %}<td class="num">{{ v }}</td>{% endfor %}</tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-
-<section class="page">
-  <h1>STATEMENTS — CASH FLOW (Summary)</h1>
-  <table class="wide small">
-    <thead><tr><th>Particulars</th>{% for y in cf_years %}<th>{{ y }}</th>{% endfor %}</tr></thead>
-    <tbody>
-      {% for r in cf_rows %}
-        <tr><td>{{ r[0] }}</td>{% for v in r[1] %}<td class="num">{{ v }}</td>{% endfor %}</tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-
-<!-- THEORY PAGES from your PDF (append to reach 20+ pages) -->
-{% for tp in theory_extra_pages %}
-<section class="page">
-  {{ tp }}
-</section>
-{% endfor %}
-
-<!-- APPENDICES -->
-{% for ap in appendices %}
-<section class="page">
-  <h1>{{ ap.title }}</h1>
-  <table class="wide small">
-    <thead><tr>{% for c in ap.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
-    <tbody>
-      {% for r in ap.rows %}
-        <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
-      {% endfor %}
-    </tbody>
-  </table>
-</section>
-{% endfor %}
-
-<!-- SIGN-OFF -->
-<section class="page">
-  <h1>Sign-off</h1>
-  <p>{{ prepared_by }} — {{ valuation_date }}</p>
-</section>
-
-</body>
-</html>
-"""
+st.set_page_config(page_title="Valuation Report", layout="wide")
+st.title("Valuation Report Generator — Mignesh Structure")
 
-# =========================
-# 📚 Theory text from your Mignesh PDF (embedded)
-# =========================
-# NOTE: This is the raw text extracted page-by-page. It reproduces the wording/sections.
-# You can tweak/trim any page if needed. These pages will be appended to ensure 20+ pages.
-THEORY_PAGES: List[str] = [
-r'''Mignesh Global Limited
-Valuation Report -Combined Unit
-Valuat... Advisory
-August - 2024
-Strictly Private and 
-Confidential''',
-r'''ALSERVE  CORPORATE  ADVISORS  LLP Table  of Contents
-3Section ''',
-r'''EXECUTIVE SUMMARY
-ENGAGEMENT SUMMARY :
-Company under valuation Mignesh Global Limited (MGL)
-Client Mignesh Global Limited (MGL)
-Valuation approach Income Approach (DCF)
-Date of valuation 31st August, 2024
-Purpose of Valuation
-The Management of the company is exploring an opportunity for identifying strategic investors for its 
-combined business unit and hence is desirous for carrying out an independent valuation exercise for 
-internal review purposes
-Valuation Currency INR in lakhs, Unless otherwise mentioned
-Assumptions, disclaimers limiting 
-conditions
-This valuation report should be read in conjunction with the assumptions, disclaimers, and 
-limiting conditions detailed throughout this report which are made in addition to those included 
-within the assumptions, disclaimers & limiting conditions section located within this report. Reliance 
-on this report and extends on of our liability is conditional upon the reader's acknowledgment and 
-understanding of these statements. This valuation is for the use of the client to whom it is addressed 
-and should not be used for any purpose other than the intended one. No responsibility is accepted 
-to any third party who may use or rely on the whole or any part of the content of this valuation. The 
-valuer has no pecuniary interest that would conflict with the proper valuation of the assets.''',
-r'''VALUATION SUMMARY :
-Based on the information provided, data gathered by us and analysis carried out by us, the Equity value of MGL using DCF method as 
-on the Valuation Date has been tabulated below:''',
-# ... (For brevity in this message, we’re embedding representative pages. 
-# In your local file, you can paste all 20 extracted pages here. The app will append these to reach 20+ pages.)
-]
-
-# If you want to ensure 20+ pages always, we can repeat/tile theory pages if needed:
-def build_theory_pages(min_pages: int = 12) -> List[str]:
-    pages = list(THEORY_PAGES)
-    while len(pages) < min_pages:
-        pages.extend(THEORY_PAGES)
-    # trim a bit to not explode file size
-    return pages[:min_pages]
+st.markdown("Upload Excel / Parquet / Arrow / CSV or enter values below. Any missing inputs will be prompted vertically. You may also click **Fill with AI** to suggest missing values.")
+
+uploaded = st.file_uploader("Upload Excel (.xlsx/.xls), Parquet, Arrow IPC or CSV matching column names (NOIAT_1..n etc.); multi-sheet workbooks are joined on Company Name", type=ingest.INPUT_TYPES)
+local_inputs = st.text_input("Or read inputs from a local file path (Arrow / Parquet files are memory-mapped)", value=ingest.INPUTS_PATH)
+
+manual_open = st.checkbox("Or, enter values manually (vertical form)", value=False)
 
 # =========================
-# 🧮 Valuation math
+# 📈 Metrics (process-wide; /metrics endpoint and textfile exporter are opt-in)
 # =========================
-CORE_FIELDS = [
-    "Company Name","Client Name","WACC","TGR","Opening Cash","Other Non-Op Assets",
-    "Debt","DLOM","Money Infusion","First_Period_Fraction"
-]
-PER_YEAR_PREFIXES = ["NOIAT_","Depreciation_","CapEx_","Inc_NWC_"]
-
-def detect_years(df: pd.DataFrame) -> int:
-    noi_cols = [c for c in df.columns if isinstance(c,str) and c.startswith("NOIAT_")]
-    if not noi_cols:
-        return 0
-    try:
-        idxs = sorted({int(c.split("_")[-1]) for c in noi_cols})
-        return max(idxs) if idxs else 0
-    except Exception:
-        return 0
-
-def compute_valuation(row: pd.Series, n_years: int) -> Dict[str, Any]:
-    # Core
-    wacc = D(row.get("WACC", 0)) / D(100)
-    tgr  = D(row.get("TGR", 0)) / D(100)
-    opening_cash = D(row.get("Opening Cash", 0))
-    other_nonop  = D(row.get("Other Non-Op Assets", 0))
-    debt         = D(row.get("Debt", 0))
-    dlom_pct     = D(row.get("DLOM", 0)) / D(100)
-    money_inf    = D(row.get("Money Infusion", 0))
-    first_frac   = D(row.get("First_Period_Fraction", 1))
-
-    periods = [first_frac] + [D(1)] * (n_years-1)
-    fcf_list = []
-    for i in range(1, n_years+1):
-        fcf = D(row.get(f"NOIAT_{i}",0)) + D(row.get(f"Depreciation_{i}",0)) - D(row.get(f"CapEx_{i}",0)) - D(row.get(f"Inc_NWC_{i}",0))
-        fcf_list.append(fcf)
-
-    pv_discrete = D(0); cum = D(0)
-    dcf_rows = []
-    for i, fcf in enumerate(fcf_list, start=1):
-        cum += periods[i-1]
-        dfac = D(1) / ((D(1)+wacc) ** cum)
-        pv   = fcf * dfac
-        pv_discrete += pv
-        dcf_rows.append([f"FY {i}", fmt_num(fcf,2), f"{float(dfac):.6f}", fmt_num(pv,2)])
-
-    if (wacc - tgr) == 0:
-        raise ValueError("WACC equals Terminal Growth Rate; please adjust inputs.")
-
-    terminal_fcf   = fcf_list[-1] * (D(1)+tgr)
-    terminal_value = terminal_fcf / (wacc - tgr)
-    pv_terminal    = terminal_value / ((D(1)+wacc) ** sum(periods))
-
-    enterprise_value = pv_discrete + pv_terminal
-    invested_capital = enterprise_value + opening_cash + other_nonop
-    equity_before_dlom = invested_capital - debt
-    dlom_amount = equity_before_dlom * dlom_pct
-    equity_after_dlom = equity_before_dlom - dlom_amount
-    equity_post_money = equity_after_dlom + money_inf
-
-    return {
-        "wacc": wacc, "tgr": tgr,
-        "pv_discrete": pv_discrete, "pv_terminal": pv_terminal,
-        "enterprise_value": enterprise_value,
-        "opening_cash": opening_cash, "other_nonop": other_nonop, "debt": debt,
-        "dlom_pct": dlom_pct, "equity_post_money": equity_post_money,
-        "dcf_rows": dcf_rows,
-        "fcf_list": fcf_list, "periods": periods
-    }
-
-def build_sensitivity(fcf_list: List[Decimal], periods: List[Decimal], wacc_base: float, g_base: float):
-    def frange(a, b, step):
-        vals = []
-        x = a
-        for _ in range(999):
-            if (step>0 and x>b) or (step<0 and x<b):
-                break
-            vals.append(round(x,4))
-            x = x + step
-        return vals
-
-    wr = frange(max(0.01, wacc_base - 0.03), wacc_base + 0.031, 0.01) or [round(wacc_base,4)]
-    gr = frange(max(-0.02, g_base - 0.02), g_base + 0.021, 0.005) or [round(g_base,4)]
-
-    def ev_for(w,g):
-        pv_d = D(0); cum=D(0)
-        for i, f in enumerate(fcf_list, start=1):
-            cum += periods[i-1]
-            dfac = D(1) / ((D(1)+D(w)) ** cum)
-            pv_d += f * dfac
-        if w - g <= 0:
-            return None
-        term_fcf = fcf_list[-1] * (D(1)+D(g))
-        tv = term_fcf / (D(w)-D(g))
-        pv_t = tv / ((D(1)+D(w)) ** sum(periods))
-        return float((pv_d + pv_t).quantize(Decimal("0.01")))
-    rows = []
-    for g in gr:
-        row_vals = []
-        for w in wr:
-            try:
-                v = ev_for(w,g)
-                row_vals.append(fmt_num(v,2) if v is not None and not math.isinf(v) and not math.isnan(v) else "n/a")
-            except Exception:
-                row_vals.append("n/a")
-        rows.append([f"{g:.2%}", row_vals])
-    return {"wacc_cols": [f"{w:.2%}" for w in wr], "rows": rows}
+try:
+    metrics.serve()
+except OSError as e:
+    st.warning(f"Metrics endpoint unavailable: {e}")
+metrics.register_cache("discount_factors", dcf_engine.discount_cache_stats)
+for chart_cache in ("tornado", "heatmap", "data_uri"):
+    metrics.register_cache(f"chart_{chart_cache}", lambda k=chart_cache: charts.chart_cache_stats()[k])
+metrics.register_cache("report_sections", report_render.section_cache_stats)
 
 # =========================
-# 🖥️ Streamlit UI
+# 📚 Results store (history across runs)
 # =========================
-st.set_page_config(page_title="Valuation Report", layout="wide")
-st.title("Valuation Report Generator — Mignesh Structure")
-
-st.markdown("Upload Excel or enter values below. Any missing inputs will be prompted vertically. You may also click **Fill with AI** to suggest missing values.")
+@st.cache_resource
+def get_results_store():
+    return results_store.connect()
 
-uploaded = st.file_uploader("Upload Excel (.xlsx/.xls) matching column names (NOIAT_1..n etc.)", type=["xlsx","xls"])
+with st.sidebar:
+    st.header("Results history")
+    save_results = st.checkbox("Save results to local store", value=True)
+    try:
+        store = get_results_store()
+    except Exception as e:
+        store = None
+        st.warning(f"Results store unavailable: {e}")
+    if store is not None:
+        lookback_days = st.number_input("Look back (days)", min_value=1, value=365, step=30)
+        since = datetime.date.today() - datetime.timedelta(days=int(lookback_days))
+        companies = results_store.list_companies(store)
+        if companies:
+            pick = st.selectbox("Company", companies)
+            st.dataframe(results_store.company_history(store, pick, since), hide_index=True)
+            st.caption("Portfolio EV by date")
+            st.dataframe(results_store.portfolio_ev_by_date(store, since), hide_index=True)
+        else:
+            st.caption("No stored valuations yet.")
+
+with st.sidebar:
+    st.header("Precision")
+    precision_mode = st.selectbox(
+        "Arithmetic", list(dcf_engine.PRECISION_MODES),
+        index=list(dcf_engine.PRECISION_MODES).index(dcf_engine.DEFAULT_MODE),
+        format_func=dcf_engine.PRECISION_MODES.get,
+    )
+    decimal_prec = dcf_engine.DEFAULT_DECIMAL_PREC
+    if precision_mode == "decimal":
+        decimal_prec = int(st.number_input("Decimal digits", min_value=6, max_value=60,
+                                           value=dcf_engine.DEFAULT_DECIMAL_PREC, step=1))
+    discount_stats_slot = st.empty()   # filled after the pipeline so it shows this run's lookups
+
+def show_discount_stats() -> None:
+    df_stats = dcf_engine.discount_cache_stats()
+    discount_stats_slot.caption(f"Discount-factor table: {df_stats['size']} profiles, "
+                                f"{df_stats['hits']} hits / {df_stats['misses']} misses ({df_stats['hit_rate']:.0%} hit rate)")
+
+def end_run() -> None:
+    # last thing every run does: this run's cache caption and the metrics textfile
+    show_discount_stats()
+    metrics.write_textfile()
+
+def stop() -> None:
+    # st.stop() skips the end of the script, so the branches that bail out end the run themselves
+    end_run()
+    st.stop()
+
+def default_fiscal_year_end(d: datetime.date) -> datetime.date:
+    # Indian fiscal year: ends 31 March
+    fye = datetime.date(d.year, 3, 31)
+    return fye if fye > d else datetime.date(d.year + 1, 3, 31)
+
+with st.sidebar:
+    st.header("Valuation conventions")
+    valuation_date = st.date_input("Valuation date", value=datetime.date.today())
+    discounting = st.selectbox("Discounting", list(dcf_engine.DISCOUNT_CONVENTIONS),
+                               format_func=dcf_engine.DISCOUNT_CONVENTIONS.get)
+    stub = None
+    if discounting == "stub":
+        fiscal_year_end = st.date_input("Fiscal year-end", value=default_fiscal_year_end(valuation_date))
+        try:
+            stub = dcf_engine.stub_fraction(valuation_date, fiscal_year_end)
+            st.caption(f"Stub period: {stub:.4f} years (replaces First_Period_Fraction)")
+        except ValueError as e:
+            st.error(str(e))
+            stop()
+    terminal_method = st.selectbox("Terminal value", list(dcf_engine.TERMINAL_METHODS),
+                                   format_func=dcf_engine.TERMINAL_METHODS.get)
+    exit_multiple = dcf_engine.DEFAULT_CONVENTION.exit_multiple
+    exit_basis = dcf_engine.DEFAULT_CONVENTION.exit_basis
+    if terminal_method == "exit":
+        exit_basis = st.selectbox("Exit multiple basis", list(dcf_engine.EXIT_BASES),
+                                  format_func=dcf_engine.EXIT_BASES.get,
+                                  help="EV / EBITDA reads the final-year EBITDA_n column.")
+        exit_multiple = float(st.number_input("Exit multiple (x)", min_value=0.0, value=exit_multiple, step=0.5))
+    convention = dcf_engine.Convention(discounting, stub, terminal_method, exit_multiple, exit_basis)
+    needs_ebitda = terminal_method == "exit" and exit_basis == "ebitda"
+
+with st.sidebar:
+    st.header("Sensitivity grids")
+    grid_drivers = dcf_engine.active_drivers(convention)
+    driver_label = lambda k: f"{dcf_engine.DRIVERS[k][0]} ({dcf_engine.DRIVERS[k][2]})"
+    grid_specs: List[dcf_engine.GridSpec] = []
+    n_grids = int(st.number_input("Extra driver × driver grids", min_value=0, max_value=6, value=0, step=1,
+                                  help="Axes are steps from each company's base, in the unit shown."))
+    for g in range(n_grids):
+        with st.expander(f"Grid {g + 1}", expanded=True):
+            axes = []
+            for axis, default in (("Rows", g % len(grid_drivers)), ("Columns", 0 if g % len(grid_drivers) else 1)):
+                key = st.selectbox(axis, grid_drivers, index=default, format_func=driver_label, key=f"grid_{g}_{axis}")
+                lo, hi = dcf_engine.DRIVER_STEP_RANGES[dcf_engine.DRIVERS[key][2]]
+                a1, a2, a3 = st.columns(3)
+                grid_from = a1.number_input("From", value=lo, key=f"grid_{g}_{axis}_from")
+                grid_to = a2.number_input("To", value=hi, key=f"grid_{g}_{axis}_to")
+                points = a3.number_input("Points", min_value=2, max_value=15, value=7, key=f"grid_{g}_{axis}_n")
+                axes.append((key, dcf_engine.grid_steps(grid_from, grid_to, points)))
+            metric = st.selectbox("Value", list(dcf_engine.GRID_METRICS), format_func=dcf_engine.GRID_METRICS.get,
+                                  key=f"grid_{g}_metric")
+            if axes[0][0] == axes[1][0]:
+                st.warning("Pick two different drivers; this grid is skipped.")
+                continue
+            grid_specs.append(dcf_engine.GridSpec(axes[0][0], axes[1][0], axes[0][1], axes[1][1], metric))
 
-manual_open = st.checkbox("Or, enter values manually (vertical form)", value=False)
+with st.sidebar:
+    st.header("Number format")
+    grouping = st.selectbox("Digit grouping", list(formatting.GROUPINGS), format_func=formatting.GROUPINGS.get)
+    negative_style = st.selectbox("Negatives", list(formatting.NEGATIVE_STYLES),
+                                  format_func=formatting.NEGATIVE_STYLES.get)
+    decimals = int(st.number_input("Decimals", min_value=0, max_value=6, value=2, step=1))
+    number_format = NumberFormat(decimals, grouping, negative_style)
 
 # Placeholder for data rows (support multiple rows in Excel; manual is one)
 data_rows: List[pd.Series] = []
-n_years = 0
+input_frames: List[pd.DataFrame] = []
+n_years = statement_years = 0
 
-if uploaded:
+@st.cache_data(show_spinner=False)
+def load_workbook(digest: str, name: str, _data: bytes):
+    # keyed by content hash: re-uploading the same file skips parsing entirely
+    return ingest.load_inputs(name, _data)
+
+@st.cache_data(show_spinner=False)
+def load_local_workbook(path: str, mtime: float):
+    return ingest.load_local_inputs(path)
+
+@st.cache_data(show_spinner=False)
+def export_parquet(digest: str, _df: pd.DataFrame) -> bytes:
+    return ingest.to_parquet_bytes(_df)
+
+workbook, workbook_digest, input_source = None, "", "manual"
+if uploaded or local_inputs:
     try:
-        df = pd.read_excel(uploaded)
+        with metrics.stage("load_inputs"):
+            if uploaded:
+                data = uploaded.getvalue()
+                workbook_digest = ingest.file_digest(data)
+                workbook = load_workbook(workbook_digest, uploaded.name, data)
+                input_source = uploaded.name
+            else:
+                workbook_digest = f"{local_inputs}:{os.path.getmtime(local_inputs)}"
+                workbook = load_local_workbook(local_inputs, os.path.getmtime(local_inputs))
+                input_source = local_inputs
     except Exception as e:
-        st.error(f"Failed to read Excel: {e}")
-        st.stop()
-    n_years = detect_years(df)
+        metrics.failure("load_inputs")
+        st.error(f"Failed to read inputs: {e}")
+        stop()
+    if workbook is None:
+        metrics.failure("load_inputs")
+        st.error(f"Input file not found: {local_inputs}")
+        stop()
+    df = workbook["frame"]
+    issues = workbook["issues"]
+    if len(issues):
+        st.warning(f"{len(issues)} cell(s) could not be read as numbers and are treated as missing.")
+        with st.expander("Unparsable cells"):
+            st.dataframe(issues, hide_index=True)
+    if len(workbook["roles"]) > 1:
+        st.caption("Sheets: " + ", ".join(f"{name} → {role}" for name, role in workbook["roles"].items()))
+    horizon = schema.detect_horizon(df)
+    n_years, statement_years = horizon.years, horizon.statement_years
     if n_years == 0:
-        st.error("No projection columns found (need NOIAT_1, NOIAT_2, ...).")
-        st.stop()
+        metrics.failure("load_inputs")
+        st.error("No projection columns found (need NOIAT_1, Depreciation_1, ...).")
+        stop()
     st.success(f"Detected projection years: 1..{n_years}")
+    if horizon.short_families:
+        st.caption("Shorter projection families (rows need every year up to their own horizon): "
+                   + ", ".join(f"{p}1..{last}" for p, last in horizon.short_families.items()))
     data_rows = [r for _, r in df.iterrows()]
-
-# Manual input block
-manual_values = {}
-if manual_open:
-    st.subheader("Manual Inputs (vertical)")
+    input_frames.append(df)
+    if os.path.splitext(input_source)[1].lower() in ingest.EXCEL_EXTS:
+        st.download_button("Export normalized inputs (Parquet)", data=export_parquet(workbook_digest, df),
+                           file_name=os.path.splitext(os.path.basename(input_source))[0] + ".parquet",
+                           mime="application/octet-stream",
+                           help="Re-upload the Parquet file next time to skip Excel parsing.")
+
+# Manual input block — widgets live in a fragment: edits rerun only the form and its live
+# preview (vectorized engine); the report pipeline sees the inputs once they are applied
+@st.fragment
+def manual_form() -> None:
+    values: Dict[str, Any] = {}
     cols = st.columns(2)
     with cols[0]:
-        manual_values["Company Name"] = st.text_input("Company Name", value="ABC Pvt Ltd")
-        manual_values["Client Name"] = st.text_input("Client Name", value="ABC Pvt Ltd")
-        manual_values["WACC"] = st.number_input("WACC (%)", value=14.0)
-        manual_values["TGR"] = st.number_input("Terminal Growth Rate (%)", value=3.0)
-        manual_values["Opening Cash"] = st.number_input("Opening Cash", value=0.0, step=1.0)
-        manual_values["Other Non-Op Assets"] = st.number_input("Other Non-Op Assets", value=0.0, step=1.0)
-        manual_values["Debt"] = st.number_input("Debt", value=0.0, step=1.0)
-        manual_values["DLOM"] = st.number_input("DLOM (%)", value=0.0)
-        manual_values["Money Infusion"] = st.number_input("Money Infusion", value=0.0, step=1.0)
-        manual_values["First_Period_Fraction"] = st.number_input("First Period Fraction (e.g., 1 for full year)", value=1.0)
+        values["Company Name"] = st.text_input("Company Name", value="ABC Pvt Ltd")
+        values["Client Name"] = st.text_input("Client Name", value="ABC Pvt Ltd")
+        values["WACC"] = st.number_input("WACC (%)", value=14.0)
+        values["TGR"] = st.number_input("Terminal Growth Rate (%)", value=3.0)
+        values["Opening Cash"] = st.number_input("Opening Cash", value=0.0, step=1.0)
+        values["Other Non-Op Assets"] = st.number_input("Other Non-Op Assets", value=0.0, step=1.0)
+        values["Debt"] = st.number_input("Debt", value=0.0, step=1.0)
+        values["DLOM"] = st.number_input("DLOM (%)", value=0.0)
+        values["Money Infusion"] = st.number_input("Money Infusion", value=0.0, step=1.0)
+        values["First_Period_Fraction"] = st.number_input("First Period Fraction (e.g., 1 for full year)", value=1.0)
     with cols[1]:
-        n_years = st.number_input("Number of Projection Years", min_value=1, max_value=20, value=5, step=1)
+        years = int(st.number_input("Number of Projection Years", min_value=1, max_value=20, value=5, step=1))
         st.caption("Enter NOIAT/Dep/CapEx/Inc_NWC for each year:")
-        for i in range(1, n_years+1):
-            manual_values[f"NOIAT_{i}"] = st.number_input(f"NOIAT_{i}", value=0.0, step=1.0, key=f"noi_{i}")
-            manual_values[f"Depreciation_{i}"] = st.number_input(f"Depreciation_{i}", value=0.0, step=1.0, key=f"dep_{i}")
-            manual_values[f"CapEx_{i}"] = st.number_input(f"CapEx_{i}", value=0.0, step=1.0, key=f"cap_{i}")
-            manual_values[f"Inc_NWC_{i}"] = st.number_input(f"Inc_NWC_{i}", value=0.0, step=1.0, key=f"nwc_{i}")
+        for i in range(1, years+1):
+            values[f"NOIAT_{i}"] = st.number_input(f"NOIAT_{i}", value=0.0, step=1.0, key=f"noi_{i}")
+            values[f"Depreciation_{i}"] = st.number_input(f"Depreciation_{i}", value=0.0, step=1.0, key=f"dep_{i}")
+            values[f"CapEx_{i}"] = st.number_input(f"CapEx_{i}", value=0.0, step=1.0, key=f"cap_{i}")
+            values[f"Inc_NWC_{i}"] = st.number_input(f"Inc_NWC_{i}", value=0.0, step=1.0, key=f"nwc_{i}")
+
+    # first render applies the defaults, as the form always did
+    st.session_state.setdefault("manual_inputs", (values, years))
+    t0 = datetime.datetime.now()
+    live = dcf_engine.compute_batch(pd.DataFrame([values]), years, convention).iloc[0]
+    elapsed_ms = (datetime.datetime.now() - t0).total_seconds() * 1000
+    m1, m2 = st.columns(2)
+    m1.metric("Enterprise Value (live)", formatting.fmt_num(live["enterprise_value"], number_format.decimals, number_format) or "n/a")
+    m2.metric("Equity Value, Post-Money (live)", formatting.fmt_num(live["equity_post_money"], number_format.decimals, number_format) or "n/a")
+    pending = st.session_state["manual_inputs"] != (values, years)
+    st.caption(f"Preview computed in {elapsed_ms:.1f} ms." + (" Changes not yet applied to the report." if pending else ""))
+    if st.button("Apply inputs to report", disabled=not pending):
+        st.session_state["manual_inputs"] = (values, years)
+        st.rerun()
+
+if manual_open:
+    st.subheader("Manual Inputs (vertical)")
+    manual_form()
+    manual_values, n_years = st.session_state["manual_inputs"]
 
     # Wrap manual into a pandas Series so we reuse same pipeline
     data_rows.insert(0, pd.Series(manual_values))
+    input_frames.insert(0, pd.DataFrame([manual_values]))
+
+# One key per distinct input (workbook content or applied manual values): results-store runs and
+# filled-in values hang off it, so a new upload starts clean
+input_key = hashlib.sha1(repr((workbook_digest, st.session_state.get("manual_inputs") if manual_open else None))
+                         .encode("utf-8")).hexdigest()
+
+# Values filled in by hand or by AI for a row persist across reruns and apply to every path
+# (portfolio, solver, reports), so all of them value the same inputs
+row_fills: Dict[int, Dict[str, Any]] = st.session_state.setdefault("row_fills", {}).setdefault(input_key, {})
+all_inputs = pd.concat(input_frames, ignore_index=True) if input_frames else pd.DataFrame()
+for fill_idx, fills in row_fills.items():
+    for k, v in fills.items():
+        data_rows[fill_idx][k] = v
+        all_inputs.loc[fill_idx, k] = v
+
+def fill_value(k: str, v: Any) -> Any:
+    # numbers typed into a text box are stored as numbers, as the schema coerces workbook cells;
+    # None when the text is not a number (never stored: it would land in a numeric column)
+    if k in ("Company Name", "Client Name") or isinstance(v, (int, float)):
+        return v
+    try:
+        return float(str(v).replace(",", "").strip())
+    except ValueError:
+        return None
 
 # Missing values prompt + AI fill for each row
 def fill_with_ai(row: pd.Series, n_years:int) -> pd.Series:
@@ -629,12 +411,13 @@ def fill_with_ai(row: pd.Series, n_years:int) -> pd.Series:
         + ". Keep WACC and TGR as percent (e.g., 12 means 12%). CapEx and Inc_NWC can be positive (cash outflows)."
     )
     try:
-        resp = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[{"role":"user","content":prompt}],
-            temperature=0.2,
-            max_tokens=500
-        )
+        with metrics.AI_SECONDS.time(purpose="fill"):
+            resp = openai.ChatCompletion.create(
+                model="gpt-4o-mini",
+                messages=[{"role":"user","content":prompt}],
+                temperature=0.2,
+                max_tokens=500
+            )
         text = resp.choices[0].message.content.strip()
         import json
         obj = json.loads(text)
@@ -644,299 +427,523 @@ def fill_with_ai(row: pd.Series, n_years:int) -> pd.Series:
             except Exception:
                 pass
     except Exception as e:
+        metrics.failure("ai_fill")
         st.warning(f"AI fill failed: {e}")
     return row
 
+# =========================
+# 🔁 Comparables dataset (market multiples)
+# =========================
+@st.cache_data(show_spinner=False)
+def load_peer_index(name: str, data: bytes):
+    return comps.build_peer_index(comps.normalize(comps.read_dataset(name, data)))
+
+@st.cache_data(show_spinner=False)
+def load_local_peer_index(path: str):
+    frame = comps.load_local_dataset(path)
+    return comps.build_peer_index(comps.normalize(frame)) if frame is not None else None
+
+@st.cache_data(show_spinner=False)
+def load_sheet_peer_index(digest: str, kind: str, _frame: pd.DataFrame):
+    return comps.build_peer_index(comps.normalize(_frame))
+
+with st.expander("Comparables (optional): comparable companies / transactions dataset"):
+    pc1, pc2 = st.columns(2)
+    comps_file = pc1.file_uploader("Comparable companies (CSV / Parquet / Excel)", type=["csv","parquet","xlsx","xls"])
+    deals_file = pc2.file_uploader("Comparable transactions (CSV / Parquet / Excel)", type=["csv","parquet","xlsx","xls"])
+    peer_indexes = {}
+    peer_sources = {}   # kind → what the dataset was read from (keys the cached report outputs)
+    for kind, f, path in [("comps", comps_file, comps.COMPS_PATH), ("deals", deals_file, comps.DEALS_PATH)]:
+        try:
+            if f:
+                peer_sources[kind] = ingest.file_digest(f.getvalue())
+                idx_ = load_peer_index(f.name, f.getvalue())
+            elif workbook is not None and workbook[kind] is not None:
+                peer_sources[kind] = workbook_digest
+                idx_ = load_sheet_peer_index(workbook_digest, kind, workbook[kind])
+            else:
+                peer_sources[kind] = (path, os.path.getmtime(path) if os.path.exists(path) else None)
+                idx_ = load_local_peer_index(path)
+        except Exception as e:
+            idx_ = None
+            metrics.failure("peer_load")
+            st.warning(f"Could not load {kind} dataset: {e}")
+        if idx_ is not None:
+            peer_indexes[kind] = idx_
+            st.caption(f"{kind}: {len(idx_['peers'])} rows across {len(idx_['slices'])} sectors")
+
+# =========================
+# 📊 Portfolio view (all rows, batched)
+# =========================
+report_mode = st.radio("Output", ["Company reports", "Portfolio summary only"], horizontal=True)
+report_profile = st.radio("Report contents", list(report_render.REPORT_PROFILES),
+                          format_func=report_render.PROFILE_LABELS.get, horizontal=True)
+
+if data_rows and (len(data_rows) > 1 or report_mode == "Portfolio summary only"):
+    with metrics.stage("portfolio_batch"):
+        batch = dcf_engine.compute_batch(all_inputs, n_years, convention)
+    summary = portfolio.portfolio_summary(batch)
+    st.subheader("Portfolio Summary")
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Companies valued", f"{summary['valued']} / {summary['companies']}")
+    total_ev_s, total_equity_s = format_list([summary["total_ev"], summary["total_equity"]], number_format)
+    m2.metric("Aggregate EV", total_ev_s)
+    m3.metric("Aggregate Equity (Post-Money)", total_equity_s)
+    if summary["excluded"]:
+        st.caption("Excluded (incomplete inputs): " + ", ".join(summary["excluded"][:20])
+                   + (" ..." if len(summary["excluded"]) > 20 else ""))
+    stats = pd.DataFrame(
+        {"Enterprise Value": [v for _, v in summary["ev_stats"]],
+         "Equity Value": [v for _, v in summary["equity_stats"]]},
+        index=[k for k, _ in summary["ev_stats"]],
+    )
+    c1, c2 = st.columns([1, 2])
+    c1.dataframe(stats)
+    c2.dataframe(summary["ranking"], hide_index=True)
+    # the built PDF is kept until the inputs, fills or settings behind it change
+    portfolio_key = hashlib.sha1(repr((input_key, sorted(row_fills.items()), n_years, convention,
+                                       valuation_date, number_format)).encode("utf-8")).hexdigest()
+    if st.button("Build portfolio PDF"):
+        try:
+            st.session_state["portfolio_pdf"] = (portfolio_key, portfolio.render_portfolio_pdf(
+                summary, CSS_TEXT, valuation_date.strftime("%d %B %Y"), number_format))
+        except Exception as e:
+            metrics.failure("portfolio_pdf")
+            st.error(f"Portfolio PDF failed: {e}")
+    if st.session_state.get("portfolio_pdf", (None,))[0] == portfolio_key:
+        st.download_button("Download Portfolio PDF", data=st.session_state["portfolio_pdf"][1],
+                           file_name="Portfolio_Valuation_Summary.pdf", mime="application/pdf")
+
+# =========================
+# 🎯 Reverse solve (implied WACC / TGR / NOIAT scale)
+# =========================
+if data_rows:
+    with st.expander("Reverse solve: implied WACC / TGR for a target value"):
+        sc1, sc2, sc3 = st.columns(3)
+        solve_for = sc1.selectbox("Solve for", solver.solvable(convention), format_func=solver.SOLVE_FOR.get)
+        solve_target = sc2.selectbox("Target", list(solver.TARGETS), format_func=solver.TARGETS.get)
+        solve_frame = all_inputs
+        target_cols = [c for c in solve_frame.columns if isinstance(c, str) and c.lower().startswith("target")]
+        target_source = sc3.selectbox("Target values", ["Single value for all rows"] + target_cols)
+        target_value = None
+        if target_source == "Single value for all rows":
+            target_value = st.number_input("Target value", value=0.0, step=1.0)
+        if st.button("Solve"):
+            targets = (target_value if target_value is not None
+                       else pd.to_numeric(solve_frame[target_source], errors="coerce").to_numpy())
+            solved = solver.solve_batch(solve_frame, n_years, solve_for, solve_target, targets, convention)
+            info = solver.solve_summary(solved)
+            st.caption(f"Converged {info['converged']} / {info['rows']} rows in at most "
+                       f"{info['max_iterations']} iterations ({info['evaluations']} batched DCF evaluations).")
+            shown = solved.assign(
+                target=format_list(solved["target"], number_format),
+                achieved=format_list(solved["achieved"], number_format, blank="n/a"),
+                solved=[("n/a" if pd.isna(v) else (f"{v:.4f}x" if solve_for == "noiat_scale" else f"{v:.4%}"))
+                        for v in solved["solved"]],
+            )
+            st.dataframe(shown, hide_index=True)
+
 # Process each row to PDF
 if not data_rows:
     st.info("Upload an Excel or enable manual entry.")
+elif report_mode == "Portfolio summary only":
+    pass
 else:
-    for idx, row in enumerate(data_rows):
-        company = str(row.get("Company Name", f"Company_row_{idx}")).strip() or f"Company_row_{idx}"
-        st.subheader(f"Processing: {company}")
-
-        # Identify missing fields
-        missing_fields = []
-        for k in CORE_FIELDS:
-            if k in ["Client Name"]:  # optional core
-                continue
-            if is_empty(row.get(k, None)):
-                missing_fields.append(k)
-        for i in range(1, n_years+1):
-            for p in PER_YEAR_PREFIXES:
-                k = f"{p}{i}"
+    statement_tables = statements.build_statement_tables(all_inputs, statement_years or n_years, number_format)
+    # batch tables only the report reads are built on first use (not at all for a summary profile)
+    def batch_tables(build):
+        def run():
+            with metrics.stage("batch_tables"):
+                return build()
+        return report_render.Lazy(run)
+    exit_tables = batch_tables(lambda: dcf_engine.exit_multiple_tables(all_inputs, n_years, convention, number_format))
+    tornado_all = batch_tables(lambda: dcf_engine.tornado(all_inputs, n_years, convention))
+    with metrics.stage("batch_tables"):
+        grid_tables = dcf_engine.driver_grid_tables(all_inputs, n_years, grid_specs, convention, number_format)
+    # one run per distinct input: a new upload in the same session starts a new run instead of
+    # overwriting the previous one
+    run_id = st.session_state.setdefault("run_ids", {}).setdefault(input_key, results_store.new_run_id())
+    if store is not None and save_results:
+        results_store.start_run(store, run_id, source=input_source)
+    valued: Dict[str, Tuple[str, Dict[str, Any], Dict[str, Any]]] = {}   # input digest → (company, res, sens)
+    # every row converted to the chosen precision in one pass (fills included); the loop values these
+    with metrics.stage("ingest"):
+        typed_rows = dcf_engine.ingest_frame(all_inputs, n_years, precision_mode)
+    # everything a row's HTML / XLSX depends on besides the row itself; the outputs are kept per row
+    # until this or the row changes, so a rerun that changes nothing renders nothing again
+    report_settings = (input_key, sorted(row_fills.items()), n_years, convention, valuation_date, number_format,
+                       grid_specs, precision_mode, decimal_prec, report_profile, sorted(peer_sources.items()))
+    report_outputs = st.session_state.setdefault("report_outputs", {})
+    profile_dir = profiling.profile_dir()
+    row_profiler = profiling.RowProfiler(profile_dir, run_id) if profile_dir else None
+    # the profiler closes the open row however the loop ends (error, st.stop, st.rerun)
+    with row_profiler if row_profiler is not None else contextlib.nullcontext():
+        for idx, row in enumerate(data_rows):
+            company = str(row.get("Company Name", f"Company_row_{idx}")).strip() or f"Company_row_{idx}"
+            if row_profiler is not None:
+                row_profiler.row(idx, company)
+            st.subheader(f"Processing: {company}")
+            row_years = row_horizon(row, n_years) or n_years
+            if row_years < n_years:
+                st.caption(f"Forecast horizon for this row: {row_years} years")
+
+            # Identify missing fields
+            missing_fields = []
+            for k in CORE_FIELDS:
+                if k in ["Client Name"]:  # optional core
+                    continue
                 if is_empty(row.get(k, None)):
                     missing_fields.append(k)
+            for i in range(1, row_years+1):
+                for p in PER_YEAR_PREFIXES:
+                    k = f"{p}{i}"
+                    if is_empty(row.get(k, None)):
+                        missing_fields.append(k)
+            if needs_ebitda and is_empty(row.get(f"EBITDA_{row_years}", None)):
+                missing_fields.append(f"EBITDA_{row_years}")
+
+            # Vertical prompt
+            if missing_fields:
+                with st.expander(f"⚠️ Missing values for {company} — click to fill"):
+                    st.write("Please complete the following fields:")
+                    new_vals = {}
+                    for k in missing_fields:
+                        if k.endswith(tuple(str(i) for i in range(10))):
+                            new_vals[k] = st.number_input(k, value=0.0, step=1.0, key=f"miss_{idx}_{k}")
+                        elif k in ["WACC","TGR","DLOM"]:
+                            new_vals[k] = st.number_input(k+" (%)", value=0.0, step=0.1, key=f"miss_{idx}_{k}")
+                        else:
+                            new_vals[k] = st.text_input(k, value="", key=f"miss_{idx}_{k}")
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        if st.button(f"Apply manual entries to {company}", key=f"apply_{idx}"):
+                            entered = {k: fill_value(k, v) for k, v in new_vals.items() if not is_empty(v)}
+                            unreadable = [k for k, v in entered.items() if v is None]
+                            if unreadable:
+                                st.error(f"Not a number: {', '.join(unreadable)}. Nothing was applied to {company}.")
+                            else:
+                                row_fills[idx] = {**row_fills.get(idx, {}), **entered}
+                                st.rerun()
+                    with c2:
+                        if st.button(f"💡 Fill with AI suggestions for {company}", key=f"aifill_{idx}") and USE_GPT:
+                            filled = fill_with_ai(row.copy(), row_years)
+                            suggested = {k: fill_value(k, filled.get(k, None)) for k in missing_fields
+                                         if not is_empty(filled.get(k, None))}
+                            row_fills[idx] = {**row_fills.get(idx, {}),
+                                              **{k: v for k, v in suggested.items() if v is not None}}
+                            st.rerun()
+
+            # Re-check required (the same rule the batched portfolio / tornado / grids / solver apply)
+            still_missing = dcf_engine.missing_inputs(row, row_years, convention)
+
+            if still_missing:
+                metrics.failure("missing_inputs")
+                st.error(f"Cannot generate report for {company}. Still missing: {', '.join(still_missing[:10])}{' ...' if len(still_missing)>10 else ''}")
+                continue
 
-        # Vertical prompt
-        if missing_fields:
-            with st.expander(f"⚠️ Missing values for {company} — click to fill"):
-                st.write("Please complete the following fields:")
-                new_vals = {}
-                for k in missing_fields:
-                    if k.endswith(tuple(str(i) for i in range(10))):
-                        new_vals[k] = st.number_input(k, value=0.0, step=1.0, key=f"miss_{idx}_{k}")
-                    elif k in ["WACC","TGR","DLOM"]:
-                        new_vals[k] = st.number_input(k+" (%)", value=0.0, step=0.1, key=f"miss_{idx}_{k}")
-                    else:
-                        new_vals[k] = st.text_input(k, value="", key=f"miss_{idx}_{k}")
-                c1, c2 = st.columns(2)
-                with c1:
-                    if st.button(f"Apply manual entries to {company}", key=f"apply_{idx}"):
-                        for k,v in new_vals.items():
-                            row[k] = v
-                with c2:
-                    if st.button(f"💡 Fill with AI suggestions for {company}", key=f"aifill_{idx}") and USE_GPT:
-                        row = fill_with_ai(row, n_years)
-                        st.experimental_rerun()
-
-        # Re-check required
-        still_missing = []
-        for k in ["WACC","TGR","Opening Cash","Other Non-Op Assets","Debt","DLOM","Money Infusion","First_Period_Fraction"]:
-            if is_empty(row.get(k, None)):
-                still_missing.append(k)
-        for i in range(1, n_years+1):
-            for p in PER_YEAR_PREFIXES:
-                k = f"{p}{i}"
-                if is_empty(row.get(k, None)):
-                    still_missing.append(k)
-
-        if still_missing:
-            st.error(f"Cannot generate report for {company}. Still missing: {', '.join(still_missing[:10])}{' ...' if len(still_missing)>10 else ''}")
-            continue
-
-        # Compute valuation
-        try:
-            res = compute_valuation(row, n_years)
-        except Exception as e:
-            st.error(f"Error computing valuation for {company}: {e}")
-            continue
-
-        # Build tables for template
-        forecast_cols = ["Year","NOIAT","Depreciation","CapEx","Inc NWC","FCFF"]
-        forecast_rows = []
-        for i in range(1, n_years+1):
-            fcf = res["fcf_list"][i-1]
-            forecast_rows.append([
-                f"FY {i}",
-                fmt_num(row.get(f"NOIAT_{i}",0),2),
-                fmt_num(row.get(f"Depreciation_{i}",0),2),
-                fmt_num(row.get(f"CapEx_{i}",0),2),
-                fmt_num(row.get(f"Inc_NWC_{i}",0),2),
-                fmt_num(fcf,2)
-            ])
-        forecast_cols, forecast_rows = ensure_table(forecast_cols, forecast_rows, min_cols=2)
-
-        # Statements (optional if present)
-        def table_from_prefix_map(prefix_map):
-            table = []
-            for label, prefix in prefix_map:
-                vals = []
-                for i in range(1, n_years+1):
-                    col = f"{prefix}{i}"
-                    v = fmt_num(row[col]) if col in row and not is_empty(row[col]) else ""
-                    vals.append(v)
-                table.append((label, vals))
-            return table
-
-        bs_map = [
-            ("Total Shareholders' Fund","BS_Shareholders_Fund_FY"),
-            ("Long-term borrowings","BS_Long_Term_Borrowings_FY"),
-            ("Deferred tax liabilities","BS_Deferred_Tax_FY"),
-            ("Total Non-Current Liabilities","BS_Total_Non_Current_Liabilities_FY"),
-            ("Total Current Liabilities","BS_Total_Current_Liabilities_FY"),
-            ("Total Equity & Liabilities","BS_Total_Equity_Liabilities_FY"),
-            ("Inventories","BS_Inventories_FY"),
-            ("Trade Receivables","BS_Trade_Receivables_FY"),
-            ("Cash and Cash Equivalents","BS_Cash_FY"),
-            ("Total Current Assets","BS_Total_Current_Assets_FY"),
-            ("Total Non Current Assets","BS_Total_Non_Current_Assets_FY"),
-            ("Total Assets","BS_Total_Assets_FY"),
-        ]
-        is_map = [
-            ("Revenue From Operations","Revenue_FY"),
-            ("Other Income","Other_Income_FY"),
-            ("Total Revenue","Total_Revenue_FY"),
-            ("Operating Expenses","Operating_Expenses_FY"),
-            ("Cost of Goods Sold","COGS_FY"),
-            ("Employee Benefit Expense","Employee_Expense_FY"),
-            ("Other Expense","Other_Expense_FY"),
-            ("EBITDA","EBITDA_FY"),
-            ("Depreciation","Depreciation_FY"),
-            ("EBIT","EBIT_FY"),
-            ("Finance Cost","Finance_Cost_FY"),
-            ("Profit before tax","PBT_FY"),
-            ("Income Taxes","Tax_FY"),
-            ("Net Income / (Loss)","Net_Income_FY"),
-        ]
-        cf_map = [
-            ("Profit before Tax","PBT_FY"),
-            ("Add: Depreciation","Depreciation_FY"),
-            ("Increase (Decrease) in Trade receivables","Inc_Trade_Receivables_FY"),
-            ("Increase (Decrease) in Inventory","Inc_Inventories_FY"),
-            ("Increase (Decrease) in Trade Payables","Inc_Trade_Payables_FY"),
-            ("Incremental Net Working Capital","Inc_NWC_FY"),
-            ("Additional CAPEX","CapEx_FY"),
-            ("Net Cash generated from Operating Activities","NCF_Operating_FY"),
-            ("Net Cash used in Investing Activities","NCF_Investing_FY"),
-            ("Net Cash generated from Financing Activities","NCF_Financing_FY"),
-            ("Net change in Cash & Cash Equivalents","NCF_Change_FY"),
-            ("Opening Cash Balance","Opening_Cash_FY"),
-            ("Closing Cash Balance","Closing_Cash_FY"),
-        ]
-
-        bs_rows = table_from_prefix_map(bs_map)
-        is_rows = table_from_prefix_map(is_map)
-        cf_rows = table_from_prefix_map(cf_map)
-
-        bs_years = [f"FY{i}" for i in range(1, n_years+1)] or ["FY"]
-        is_years = [f"FY{i}" for i in range(1, n_years+1)] or ["FY"]
-        cf_years = [f"FY{i}" for i in range(1, n_years+1)] or ["FY"]
-
-        # History safe table (blank ok)
-        history_cols, history_rows = ensure_table(["Metric","Value"], [], min_cols=2)
-
-        # Sensitivity
-        sens = build_sensitivity(res["fcf_list"], res["periods"], float(res["wacc"]), float(res["tgr"]))
-
-        # Theory blocks (fixed wording from your PDF)
-        theory_objective_scope = [
-            "The Management of the company is exploring an opportunity for identifying strategic investors for its combined business unit and hence is desirous for carrying out an independent valuation exercise for internal review purposes.",
-            "This valuation report is intended solely for the purpose stated and must be read in conjunction with the assumptions, disclaimers and limiting conditions contained herein.",
-        ]
-        objective_scope_list = [
-            "Determine fair equity value as on valuation date.",
-            "Review management’s projections and assess reasonableness.",
-            "Apply Income Approach (DCF) as primary method.",
-        ]
-        theory_company_industry = [
-            "The Company operates as a combined unit with diversified revenue streams.",
-            "The broader industry context, competitive landscape, and growth prospects have been considered qualitatively in forming our view of risks and returns.",
-        ]
-        theory_methodology = [
-            "Our primary approach is the Income Approach (DCF), estimating FCFF and discounting at an appropriate WACC to arrive at Enterprise Value.",
-            "Market and transaction multiples may be referenced for reasonableness checks; however, the DCF forms the core of the conclusion.",
-        ]
-        methodology_points = [
-            "Income Approach — Discounted Cash Flow (FCFF).",
-            "Market Approach — Comparable companies/transactions (reasonableness).",
-            "Cost Approach — Not considered appropriate for this asset mix.",
-        ]
-        theory_assumptions = [
-            "We have relied upon information provided by the Management and public sources believed to be reliable.",
-            "This report should not be used for any purpose other than that stated. No responsibility is accepted to any third party.",
-        ]
-        assumptions_list = [
-            "No material unforeseen legal/tax changes beyond those enacted.",
-            "Working capital and capex follow historical norms unless specified.",
-        ]
-        limitations_list = [
-            "Actual results may differ materially from projections.",
-            "We have not performed an audit; certain information has been accepted as provided.",
-        ]
-
-        # Build appendices to stretch pages
-        appendices = []
-        appx1_cols, appx1_rows = ensure_table(forecast_cols, forecast_rows, min_cols=2)
-        appendices.append({"title":"Appendix A — Detailed Projection Table","columns":appx1_cols,"rows":appx1_rows})
-        appx2_cols, appx2_rows = ensure_table(["Year","FCFF","Discount Factor","PV (FCFF)"], res["dcf_rows"], min_cols=2)
-        appendices.append({"title":"Appendix B — DCF PV Schedule","columns":appx2_cols,"rows":appx2_rows})
-
-        # Extra theory pages to ensure 20+ pages
-        extra_theory_pages = build_theory_pages(min_pages=12)  # adds ~12 pages; combined with other sections exceeds 20
-
-        # Executive summary extra (optional GPT)
-        executive_summary_extra = ""
-        if USE_GPT:
-            try:
-                today_s = datetime.date.today().strftime("%d %B %Y")
-                prompt = (
-                    f"You are a valuation expert. Draft a concise, board-ready executive note for {company} as of {today_s}. "
-                    f"Use these numbers (INR): EV {float(res['enterprise_value']):.2f}, Equity Post-Money {float(res['equity_post_money']):.2f}, "
-                    f"WACC {float(res['wacc']*100):.2f}%, TGR {float(res['tgr']*100):.2f}%. Keep to 120-150 words."
-                )
-                r = openai.ChatCompletion.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role":"user","content":prompt}],
-                    temperature=0.2,
-                    max_tokens=220
-                )
-                executive_summary_extra = r.choices[0].message.content.strip()
-            except Exception as e:
-                executive_summary_extra = ""
-
-        # Reasonableness (safe empty headers)
-        comps_cols, comps_rows = ensure_table(["Company","EV/Revenue","EV/EBITDA","P/E"], [], min_cols=2)
-        deals_cols, deals_rows = ensure_table(["Deal","EV/Revenue","EV/EBITDA","Date"], [], min_cols=2)
-
-        # Context for template
-        ctx = {
-            "css": CSS_TEXT,
-            "company_name": company,
-            "unit_name": str(row.get("Unit Name","Combined Unit")),
-            "valuation_date": datetime.date.today().strftime("%d %B %Y"),
-            "prepared_by": str(row.get("Prepared By","Advisory")),
-
-            "cover_services": ["Business Valuation","Financial Modeling","Advisory Services"],
-
-            "client_name": str(row.get("Client Name", company)),
-            "valuation_approach": "Income Approach (DCF)",
-            "purpose_text": "The Management is exploring an opportunity for strategic investors and hence requires an independent valuation for internal review.",
-            "valuation_currency": "INR in lakhs, unless otherwise mentioned",
-            "assumptions_header_note": "This valuation report should be read in conjunction with the assumptions, disclaimers, and limiting conditions detailed throughout this report.",
-
-            "pv_discrete": fmt_num(res["pv_discrete"],2),
-            "pv_terminal": fmt_num(res["pv_terminal"],2),
-            "enterprise_value": fmt_num(res["enterprise_value"],2),
-            "opening_cash": fmt_num(res["opening_cash"],2),
-            "other_non_op_assets": fmt_num(res["other_nonop"],2),
-            "debt": fmt_num(res["debt"],2),
-            "dlom_display": fmt_num(D(row.get("DLOM",0)),2) + " %",
-            "equity_post_money": fmt_num(res["equity_post_money"],2),
-
-            "executive_summary_extra": executive_summary_extra,
-
-            "theory_objective_scope": theory_objective_scope,
-            "objective_scope_list": objective_scope_list,
-            "theory_company_industry": theory_company_industry,
-            "theory_methodology": theory_methodology,
-            "methodology_points": methodology_points,
-            "theory_assumptions": theory_assumptions,
-            "assumptions_list": assumptions_list,
-            "limitations_list": limitations_list,
-
-            "history": {"columns": history_cols, "rows": history_rows},
-            "forecast": {"columns": forecast_cols, "rows": forecast_rows},
-
-            "wacc_display": f"{float(res['wacc']*100):.2f} %",
-            "tgr_display": f"{float(res['tgr']*100):.2f} %",
-            "dcf_rows": res["dcf_rows"],
-
-            "sensitivity": sens,
-
-            "bs_years": bs_years, "bs_rows": bs_rows,
-            "is_years": is_years, "is_rows": is_rows,
-            "cf_years": cf_years, "cf_rows": cf_rows,
-
-            "comps": {"columns": comps_cols, "rows": comps_rows},
-            "deals": {"columns": deals_cols, "rows": deals_rows},
-
-            "appendices": appendices,
-            "theory_extra_pages": extra_theory_pages,
-        }
-
-        # Render & PDF
-        try:
-            rendered = Template(TEMPLATE_HTML).render(**ctx)
-            pdf_bytes = io.BytesIO()
-            pisa_status = pisa.CreatePDF(io.StringIO(rendered), dest=pdf_bytes)
-            pdf_bytes.seek(0)
-            if pisa_status.err:
-                st.error("PDF generation failed (xhtml2pdf). Try reducing content or check inputs.")
+            # Compute valuation (once per distinct set of inputs; duplicates share the result)
+            digest = input_digest(row, row_years)
+            reused_from = None
+            if digest in valued:
+                reused_from, res, sens = valued[digest]
+                st.caption(f"Same inputs as {reused_from} — valuation reused.")
             else:
-                st.success("PDF generated.")
-                fn = f"{company.replace(' ','_')}_Valuation_Report.pdf"
-                st.download_button("Download PDF", data=pdf_bytes, file_name=fn, mime="application/pdf")
-        except Exception as e:
-            st.error(f"Template render error for {company}: {e}")
-
+                try:
+                    with metrics.stage("compute"):
+                        res = value_inputs(typed_rows[idx], row_years, precision_mode, decimal_prec,
+                                           number_format, convention)
+                except Exception as e:
+                    metrics.failure("compute")
+                    st.error(f"Error computing valuation for {company}: {e}")
+                    continue
+
+            # Build tables for template
+            forecast_cols = ["Year","NOIAT","Depreciation","CapEx","Inc NWC","FCFF"]
+            forecast_values = [[row.get(f"{p}{i}",0) for p in PER_YEAR_PREFIXES] + [res["fcf_list"][i-1]]
+                               for i in range(1, row_years+1)]
+            forecast_cells = format_list(forecast_values, number_format)
+            forecast_rows = [[f"FY {i}"] + cells for i, cells in enumerate(forecast_cells, start=1)]
+            forecast_cols, forecast_rows = ensure_table(forecast_cols, forecast_rows, min_cols=2)
+
+            # Statements (optional if present) — pre-built for the whole workbook
+            stmt = statement_tables[idx]
+            bs_rows, is_rows, cf_rows = stmt["bs_rows"], stmt["is_rows"], stmt["cf_rows"]
+            bs_years = is_years = cf_years = stmt["years"]
+
+            # History safe table (blank ok)
+            history_cols, history_rows = ensure_table(["Metric","Value"], [], min_cols=2)
+
+            # Sensitivity
+            if reused_from is None:
+                with metrics.stage("sensitivity"):
+                    sens = build_sensitivity(res["fcf_list"], res["periods"], float(res["wacc"]), float(res["tgr"]),
+                                             precision_mode, decimal_prec, number_format, convention, res["ebitda_last"])
+                valued[digest] = (company, res, sens)
+
+            if store is not None and save_results:
+                try:
+                    results_store.record_valuation(store, run_id, idx, company, valuation_date, row, res, sens,
+                                                   precision=(f"decimal:{decimal_prec}" if precision_mode == "decimal"
+                                                              else precision_mode))
+                except Exception as e:
+                    metrics.failure("store_save")
+                    st.warning(f"Could not save results for {company}: {e}")
+
+            # Theory blocks (fixed wording from your PDF)
+            theory_objective_scope = [
+                "The Management of the company is exploring an opportunity for identifying strategic investors for its combined business unit and hence is desirous for carrying out an independent valuation exercise for internal review purposes.",
+                "This valuation report is intended solely for the purpose stated and must be read in conjunction with the assumptions, disclaimers and limiting conditions contained herein.",
+            ]
+            objective_scope_list = [
+                "Determine fair equity value as on valuation date.",
+                "Review management’s projections and assess reasonableness.",
+                "Apply Income Approach (DCF) as primary method.",
+            ]
+            theory_company_industry = [
+                "The Company operates as a combined unit with diversified revenue streams.",
+                "The broader industry context, competitive landscape, and growth prospects have been considered qualitatively in forming our view of risks and returns.",
+            ]
+            theory_methodology = [
+                "Our primary approach is the Income Approach (DCF), estimating FCFF and discounting at an appropriate WACC to arrive at Enterprise Value.",
+                "Market and transaction multiples may be referenced for reasonableness checks; however, the DCF forms the core of the conclusion.",
+            ]
+            methodology_points = [
+                "Income Approach — Discounted Cash Flow (FCFF).",
+                "Market Approach — Comparable companies/transactions (reasonableness).",
+                "Cost Approach — Not considered appropriate for this asset mix.",
+            ]
+            theory_assumptions = [
+                "We have relied upon information provided by the Management and public sources believed to be reliable.",
+                "This report should not be used for any purpose other than that stated. No responsibility is accepted to any third party.",
+            ]
+            assumptions_list = [
+                "No material unforeseen legal/tax changes beyond those enacted.",
+                "Working capital and capex follow historical norms unless specified.",
+            ]
+            limitations_list = [
+                "Actual results may differ materially from projections.",
+                "We have not performed an audit; certain information has been accepted as provided.",
+            ]
+
+            # Build appendices to stretch pages
+            def build_appendices():
+                appendices = []
+                appx1_cols, appx1_rows = ensure_table(forecast_cols, forecast_rows, min_cols=2)
+                appendices.append({"title":"Appendix A — Detailed Projection Table","columns":appx1_cols,"rows":appx1_rows})
+                appx2_cols, appx2_rows = ensure_table(["Year","FCFF","Discount Factor","PV (FCFF)"], res["dcf_rows"], min_cols=2)
+                appendices.append({"title":"Appendix B — DCF PV Schedule","columns":appx2_cols,"rows":appx2_rows})
+                return appendices
+
+            # Extra theory pages to ensure 20+ pages (adds ~12 pages; combined with other sections exceeds 20)
+            extra_theory_pages = report_render.Lazy(lambda: build_theory_pages(min_pages=12))
+
+            # Executive summary extra (optional GPT)
+            executive_summary_extra = ""
+            if USE_GPT:
+                try:
+                    today_s = valuation_date.strftime("%d %B %Y")
+                    prompt = (
+                        f"You are a valuation expert. Draft a concise, board-ready executive note for {company} as of {today_s}. "
+                        f"Use these numbers (INR): EV {float(res['enterprise_value']):.2f}, Equity Post-Money {float(res['equity_post_money']):.2f}, "
+                        f"WACC {float(res['wacc']*100):.2f}%, TGR {float(res['tgr']*100):.2f}%. Keep to 120-150 words."
+                    )
+                    with metrics.AI_SECONDS.time(purpose="summary"):
+                        r = openai.ChatCompletion.create(
+                            model="gpt-4o-mini",
+                            messages=[{"role":"user","content":prompt}],
+                            temperature=0.2,
+                            max_tokens=220
+                        )
+                    executive_summary_extra = r.choices[0].message.content.strip()
+                except Exception as e:
+                    metrics.failure("ai_summary")
+                    executive_summary_extra = ""
+
+            # Reasonableness: market multiples from the peer dataset (safe empty headers otherwise)
+            def build_reasonableness():
+                subject_metrics = comps.company_metrics(row)
+                peer_tables = {}; peer_stats = []
+                for kind, label in [("comps", "Comparable companies"), ("deals", "Comparable transactions")]:
+                    cols_k = comps.TABLE_LAYOUTS[kind][0]
+                    if kind in peer_indexes:
+                        positions = comps.peer_positions(peer_indexes[kind], row.get("Sector", ""), subject_metrics["Revenue"])
+                        cols_k, rows_k, stats_k = comps.peer_table(peer_indexes[kind], positions, subject_metrics["Revenue"],
+                                                                   kind, number_format)
+                        peer_stats.append((label, stats_k))
+                    else:
+                        rows_k = []
+                    peer_tables[kind] = ensure_table(cols_k, rows_k, min_cols=2)
+
+                football_rows = []
+                if peer_stats:
+                    sens_vals = [v for vals in sens["values"] for v in vals if v is not None]
+                    dcf_range = (min(sens_vals, default=float(res["enterprise_value"])), float(res["enterprise_value"]),
+                                 max(sens_vals, default=float(res["enterprise_value"])))
+                    net_debt = float(res["debt"] - res["opening_cash"] - res["other_nonop"])
+                    ff = comps.football_field(subject_metrics, peer_stats, net_debt, dcf_range)
+                    ff_cells = format_list([r[1:] for r in ff], number_format, blank="n/a")
+                    football_rows = [[r[0]] + cells for r, cells in zip(ff, ff_cells)]
+                return {"comps": dict(zip(["columns", "rows"], peer_tables["comps"])),
+                        "deals": dict(zip(["columns", "rows"], peer_tables["deals"])),
+                        "football_field": {"rows": football_rows}}
+            reasonableness = report_render.Lazy(build_reasonableness)
+
+            # Charts (SVG, cached on their inputs): heatmap of the sensitivity grid and the driver tornado
+            def build_charts():
+                with metrics.stage("charts"):
+                    heatmap_svg = sensitivity_heatmap(sens, exit_tables.value()[idx], convention,
+                                                      float(res["wacc"]), float(res["tgr"]))
+                    tornado_svg = tornado_chart(tornado_all.value(), idx, number_format)
+                return {"heatmap": charts.embed(heatmap_svg), "tornado": charts.embed(tornado_svg),
+                        "shock": f"{tornado_all.value()['shock']:.0%}", "svgs": [heatmap_svg, tornado_svg]}
+
+            def build_driver_grids():
+                driver_grids = []
+                with metrics.stage("charts"):
+                    for grid in grid_tables[idx] if grid_specs else []:
+                        grid_svg = charts.heatmap_svg(
+                            tuple(r[0] for r in grid["rows"]), tuple(grid["col_labels"]),
+                            tuple(tuple(round(v, 2) for v in vals) for vals in grid["values"]),
+                            tuple(tuple(r[1]) for r in grid["rows"]), grid["row_title"], grid["col_title"],
+                            grid["base"], grid["metric"])
+                        driver_grids.append({**grid, "svg": grid_svg, "chart": charts.embed(grid_svg)})
+                return driver_grids
+
+            # Context for template
+            ctx = {
+                "css": CSS_TEXT,
+                "company_name": company,
+                "unit_name": str(row.get("Unit Name","Combined Unit")),
+                "valuation_date": valuation_date.strftime("%d %B %Y"),
+                "prepared_by": str(row.get("Prepared By","Advisory")),
+
+                "cover_services": ["Business Valuation","Financial Modeling","Advisory Services"],
+
+                "client_name": str(row.get("Client Name", company)),
+                "valuation_approach": "Income Approach (DCF)",
+                "purpose_text": "The Management is exploring an opportunity for strategic investors and hence requires an independent valuation for internal review.",
+                "valuation_currency": "INR in lakhs, unless otherwise mentioned",
+                "assumptions_header_note": "This valuation report should be read in conjunction with the assumptions, disclaimers, and limiting conditions detailed throughout this report.",
+
+                **dict(zip(
+                    ["pv_discrete","pv_terminal","enterprise_value","opening_cash",
+                     "other_non_op_assets","debt","equity_post_money"],
+                    format_list([res["pv_discrete"], res["pv_terminal"], res["enterprise_value"], res["opening_cash"],
+                                 res["other_nonop"], res["debt"], res["equity_post_money"]], number_format),
+                )),
+                "dlom_display": format_list([row.get("DLOM",0)], number_format)[0] + " %",
+
+                "executive_summary_extra": executive_summary_extra,
+
+                "theory_objective_scope": theory_objective_scope,
+                "objective_scope_list": objective_scope_list,
+                "theory_company_industry": theory_company_industry,
+                "theory_methodology": theory_methodology,
+                "methodology_points": methodology_points,
+                "theory_assumptions": theory_assumptions,
+                "assumptions_list": assumptions_list,
+                "limitations_list": limitations_list,
+
+                "history": {"columns": history_cols, "rows": history_rows},
+                "forecast": {"columns": forecast_cols, "rows": forecast_rows},
+
+                "wacc_display": f"{float(res['wacc']*100):.2f} %",
+                "tgr_display": f"{float(res['tgr']*100):.2f} %",
+                "discounting_display": dcf_engine.DISCOUNT_CONVENTIONS[convention.discounting]
+                    + (f" — stub {convention.stub:.4f} years" if convention.stub is not None else ""),
+                "terminal_display": dcf_engine.TERMINAL_METHODS[convention.terminal]
+                    + (f" — {convention.exit_multiple:g}x {dcf_engine.EXIT_BASES[convention.exit_basis]}"
+                       if convention.terminal == "exit" else ""),
+                "dcf_rows": res["dcf_rows"],
+
+                "sensitivity": sens,
+                "terminal_method": convention.terminal,
+                "exit_view": report_render.Lazy(lambda: exit_tables.value()[idx]),
+                "charts": report_render.Lazy(build_charts),
+                "driver_grids": report_render.Lazy(build_driver_grids),
+
+                "bs_years": bs_years, "bs_rows": bs_rows, "bs_has_data": stmt["bs_has_data"],
+                "is_years": is_years, "is_rows": is_rows, "is_has_data": stmt["is_has_data"],
+                "cf_years": cf_years, "cf_rows": cf_rows, "cf_has_data": stmt["cf_has_data"],
+
+                "comps": report_render.Lazy(lambda: reasonableness.value()["comps"]),
+                "deals": report_render.Lazy(lambda: reasonableness.value()["deals"]),
+                "football_field": report_render.Lazy(lambda: reasonableness.value()["football_field"]),
+
+                "appendices": report_render.Lazy(build_appendices),
+                "theory_extra_pages": extra_theory_pages,
+            }
+
+            # Outputs: HTML preview and HTML / XLSX downloads right away; the PDF only on request.
+            # compose() evaluates only what the chosen profile's non-blank sections read.
+            report_key = hashlib.sha1(repr((report_settings, idx)).encode("utf-8")).hexdigest()
+            composed = None
+            if report_outputs.get(idx, (None,))[0] != report_key:
+                try:
+                    composed = report_render.compose(ctx, report_profile)
+                    with metrics.stage("render_html"):
+                        html = report_render.render_html(composed)
+                except Exception as e:
+                    metrics.failure("render_html")
+                    st.error(f"Template render error for {company}: {e}")
+                    continue
+                with metrics.stage("render_xlsx"):
+                    xlsx = report_render.render_xlsx(company, res, sens,
+                                                     [[f"FY {i}"] + v for i, v in enumerate(forecast_values, start=1)],
+                                                     stmt, grid_tables[idx] if grid_specs else [])
+                svgs = (composed.get("charts", {}).get("svgs", [])
+                        + [grid["svg"] for grid in composed.get("driver_grids", [])])
+                report_outputs[idx] = (report_key, html, xlsx, svgs)
+            _, html, xlsx, svgs = report_outputs[idx]
+            metrics.ROWS_PROCESSED.inc()
+            if svgs:
+                with st.expander(f"Sensitivity charts — {company}"):
+                    for svg in svgs:
+                        st.image(svg)
+            fn = f"{company.replace(' ','_')}_Valuation_Report"
+            with st.expander(f"Report preview — {company}", expanded=len(data_rows) == 1):
+                st.iframe(html, height=720)
+            c1, c2, c3 = st.columns(3)
+            c1.download_button("Download HTML", data=html, file_name=fn + ".html", mime="text/html", key=f"html_{idx}")
+            c2.download_button("Download XLSX", data=xlsx,
+                               file_name=fn + ".xlsx", key=f"xlsx_{idx}",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            # a built PDF is kept per row until the report content changes; a row whose report is
+            # identical to an already built one takes that PDF
+            html_digest = hashlib.sha1(html.encode("utf-8")).hexdigest()
+            built_pdfs = st.session_state.setdefault("report_pdfs", {})
+            if built_pdfs.get(idx, (None,))[0] != html_digest:
+                same = next((pdf for d, pdf in built_pdfs.values() if d == html_digest), None)
+                if same is not None:
+                    built_pdfs[idx] = (html_digest, same)
+            if c3.button("Build PDF", key=f"pdf_{idx}"):
+                try:
+                    with metrics.stage("render_pdf"):
+                        built_pdfs[idx] = (html_digest, render_pool.render_pdf_bytes(
+                                composed or report_render.compose(ctx, report_profile),
+                                row_profiler.worker_profile() if row_profiler is not None else None))
+                    metrics.PDFS_GENERATED.inc()
+                    st.success("PDF generated.")
+                except RuntimeError:
+                    metrics.failure("render_pdf")
+                    st.error("PDF generation failed (xhtml2pdf). Try reducing content or check inputs.")
+                except Exception as e:
+                    metrics.failure("render_pdf")
+                    st.error(f"Template render error for {company}: {e}")
+            if built_pdfs.get(idx, (None,))[0] == html_digest:
+                c3.download_button("Download PDF", data=built_pdfs[idx][1], file_name=fn + ".pdf",
+                                   mime="application/pdf", key=f"pdfdl_{idx}")
+
+    # Per-row profiles (opt-in): slowest rows first, top functions by own time for the picked row
+    if row_profiler is not None:
+        profiled = sorted(row_profiler.results, key=lambda r: r["seconds"], reverse=True)
+        with st.sidebar:
+            st.header("Profile")
+            st.caption(f"pstats + collapsed stacks per row in {profile_dir}")
+            st.dataframe(pd.DataFrame(profiled, columns=["row", "company", "seconds", "samples"]), hide_index=True)
+            if profiled:
+                pick = st.selectbox("Hotspots for", range(len(profiled)),
+                                    format_func=lambda i: f"{profiled[i]['company']} ({profiled[i]['seconds']:.2f}s)")
+                st.dataframe(pd.DataFrame(profiled[pick]["hotspots"]), hide_index=True)
+
+end_run()
@@ -0,0 +1,50 @@
+# bench_css.py — Batch render with and without pre-parsed stylesheets
+# Run from the repo root:  python -m benchmarks.bench_css [reports] [theory_pages]
+# - each variant runs in a fresh process so neither inherits the other's parsed CSS or warm caches
+# - reparse:   stock xhtml2pdf context, default CSS and <style> blocks parsed for every report
+# - preparsed: PreparsedCSSContext, plain-rules sources parsed once and reused
+# - "css" is the time inside pisaContext.parseCSS, i.e. what the cache can save
+
+import sys, time, multiprocessing as mp
+
+from xhtml2pdf.context import pisaContext
+
+import report_render
+from benchmarks.bench_render import sample_context
+
+def _worker(variant: str, reports: int, theory_pages: int, out: "mp.Queue") -> None:
+    report_render.use_preparsed_css(variant == "preparsed")
+    ctx = sample_context(theory_pages)
+    report_render.render_html(ctx)  # warm imports / template compile outside the measurement
+
+    css_seconds = [0.0]
+    parse_css = pisaContext.parseCSS
+    def timed_parse(self):
+        t = time.perf_counter()
+        try:
+            return parse_css(self)
+        finally:
+            css_seconds[0] += time.perf_counter() - t
+    pisaContext.parseCSS = timed_parse
+
+    t0 = time.perf_counter()
+    for _ in range(reports):
+        with report_render.render_pdf(ctx) as f:
+            f.read()
+    out.put((variant, time.perf_counter() - t0, css_seconds[0]))
+
+def main(reports: int = 200, theory_pages: int = 0) -> None:
+    print(f"{reports} reports, {theory_pages} theory pages")
+    ctx = mp.get_context("spawn")
+    for variant in ("reparse", "preparsed"):
+        q = ctx.Queue()
+        p = ctx.Process(target=_worker, args=(variant, reports, theory_pages, q))
+        p.start()
+        name, secs, css = q.get()
+        p.join()
+        print(f"{name:10s} total {secs:7.2f}s  per report {secs / reports * 1000:7.1f} ms  "
+              f"css {css / reports * 1000:6.2f} ms/report ({css / secs:5.1%})")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,54 @@
+# bench_ingest.py — Multi-sheet workbook parse: per-sheet read_excel vs one workbook load
+# Run from the repo root:  python -m benchmarks.bench_ingest [companies] [sheets] [repeats]
+# - threads:  one pd.read_excel per sheet on a thread pool (the previous ingest path)
+# - single:   workbook opened once, every sheet parsed from it (ingest default)
+# - processes: sheets split over processes, one workbook load per process
+# - best of [repeats] runs per variant; "processes" falls back to single on a one-core machine
+
+import io, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+def sample_workbook(companies: int = 2000, sheets: int = 6) -> bytes:
+    r = np.random.default_rng(0)
+    names = [f"Company {i}" for i in range(companies)]
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as xw:
+        for s in range(sheets):
+            df = pd.DataFrame(r.uniform(0, 1000, (companies, 24)), columns=[f"NOIAT_{s * 24 + i + 1}" for i in range(24)])
+            df.insert(0, ingest.COMPANY_KEY, names)
+            df.to_excel(xw, sheet_name=f"Projections {s}", index=False)
+    return buf.getvalue()
+
+def _threads(data: bytes) -> dict:
+    names = ingest.sheet_names(data)
+    with ThreadPoolExecutor(max_workers=min(ingest.MAX_WORKERS, len(names))) as pool:
+        futures = {n: pool.submit(pd.read_excel, io.BytesIO(data), sheet_name=n) for n in names}
+        return {n: f.result() for n, f in futures.items()}
+
+def main(companies: int = 2000, sheets: int = 6, repeats: int = 3) -> None:
+    data = sample_workbook(companies, sheets)
+    print(f"{companies} companies x {sheets} sheets, {len(data) / 1e6:.1f} MB, {os.cpu_count()} cpu(s)")
+    variants = [
+        ("threads", _threads),
+        ("single", lambda d: ingest.parse_sheets(d, use_processes=False)),
+        ("processes", lambda d: ingest.parse_sheets(d, use_processes=True)),
+    ]
+    base = None
+    for name, fn in variants:
+        secs = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            parsed = fn(data)
+            secs = min(secs, time.perf_counter() - t0)
+        base = base or secs
+        rows = sum(len(df) for df in parsed.values())
+        print(f"{name:10s} {secs:6.2f}s  {base / secs:4.2f}x vs threads  rows {rows}")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
@@ -0,0 +1,55 @@
+# bench_precision.py — Cost of each precision mode on a large batch
+# Run from the repo root:  python -m benchmarks.bench_precision [rows] [years]
+# - ingest:  one-pass conversion of the whole frame (ingest_frame)
+# - value:   compute over pre-converted inputs (value_inputs)
+# - sens:    WACC x g sensitivity grid for the first 200 rows
+
+import sys, time
+
+import numpy as np
+import pandas as pd
+
+import dcf_engine
+
+def synthetic_frame(n_rows: int, n_years: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {
+        "Company Name": [f"Company {i}" for i in range(n_rows)],
+        "WACC": rng.choice([11.5, 12.0, 13.5, 14.0, 15.0], n_rows),
+        "TGR": rng.choice([2.0, 3.0, 4.0], n_rows),
+        "Opening Cash": rng.uniform(0, 100, n_rows).round(2),
+        "Other Non-Op Assets": rng.uniform(0, 50, n_rows).round(2),
+        "Debt": rng.uniform(0, 200, n_rows).round(2),
+        "DLOM": rng.choice([0.0, 10.0, 15.0], n_rows),
+        "Money Infusion": 0.0,
+        "First_Period_Fraction": rng.choice([1.0, 0.5, 0.75], n_rows),
+    }
+    for i in range(1, n_years+1):
+        data[f"NOIAT_{i}"] = rng.uniform(50, 500, n_rows).round(2)
+        data[f"Depreciation_{i}"] = rng.uniform(5, 50, n_rows).round(2)
+        data[f"CapEx_{i}"] = rng.uniform(5, 80, n_rows).round(2)
+        data[f"Inc_NWC_{i}"] = rng.uniform(0, 30, n_rows).round(2)
+    return pd.DataFrame(data)
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def main(n_rows: int = 10000, n_years: int = 5) -> None:
+    df = synthetic_frame(n_rows, n_years)
+    print(f"{n_rows} rows x {n_years} years")
+    print(f"{'mode':<10}{'ingest s':>10}{'value s':>10}{'sens(200) s':>13}{'rows/s':>12}")
+    for mode in dcf_engine.PRECISION_MODES:
+        inputs, t_ing = _timed(lambda: dcf_engine.ingest_frame(df, n_years, mode))
+        results, t_val = _timed(lambda: [dcf_engine.value_inputs(x, n_years, mode) for x in inputs])
+        _, t_sens = _timed(lambda: [
+            dcf_engine.build_sensitivity(r["fcf_list"], r["periods"], float(r["wacc"]), float(r["tgr"]), mode)
+            for r in results[:200]
+        ])
+        print(f"{mode:<10}{t_ing:>10.3f}{t_val:>10.3f}{t_sens:>13.3f}{n_rows / (t_ing + t_val):>12,.0f}")
+    _, t_batch = _timed(lambda: dcf_engine.compute_batch(df, n_years))
+    print(f"{'batch':<10}{'':>10}{t_batch:>10.3f}{'':>13}{n_rows / t_batch:>12,.0f}  (numpy, compute_batch)")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
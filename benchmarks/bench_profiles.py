@@ -0,0 +1,30 @@
+# bench_profiles.py — PDF render time per report profile (full / summary / numbers)
+# Run from the repo root:  python -m benchmarks.bench_profiles [reports] [theory_pages]
+# - same context for every profile; compose() picks the sections, blank ones are dropped
+# - the section cache is cleared between profiles so each starts cold
+
+import sys, time
+
+import report_render
+from benchmarks.bench_render import sample_context
+
+def main(reports: int = 20, theory_pages: int = 12) -> None:
+    ctx = sample_context(theory_pages)
+    report_render.warm_up()
+    print(f"{reports} reports, {theory_pages} theory pages")
+    base = None
+    for profile in report_render.REPORT_PROFILES:
+        report_render.SECTIONS = report_render.SectionCache()
+        t0 = time.perf_counter()
+        for _ in range(reports):
+            composed = report_render.compose(ctx, profile)
+            with report_render.render_pdf(composed) as f:
+                size = len(f.read())
+        secs = (time.perf_counter() - t0) / reports
+        base = base or secs
+        print(f"{profile:8s} {secs * 1000:7.1f} ms/report  {secs / base:5.1%} of full  "
+              f"pdf {size / 1024:5.0f} KB  sections: {', '.join(composed['sections'])}")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
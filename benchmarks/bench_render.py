@@ -0,0 +1,71 @@
+# bench_render.py — Peak memory of the report render: in-memory strings vs streamed / spooled
+# Run from the repo root:  python -m benchmarks.bench_render [reports] [theory_pages]
+# - each variant runs in a fresh process so ru_maxrss is that variant's own peak
+# - in-memory: render() → StringIO → BytesIO (the old app path)
+# - streamed:  generate() → spooled HTML file → xhtml2pdf → spooled PDF file
+
+import sys, time, resource, multiprocessing as mp
+from typing import Dict, Any
+
+import pandas as pd
+
+import report_render
+import statements
+import dcf_engine
+from benchmarks.bench_precision import synthetic_frame
+
+def sample_context(theory_pages: int = 12, n_years: int = 10) -> Dict[str, Any]:
+    history = {f"{prefix}{i}": 1234.5 * i
+               for _, prefix in statements.BS_MAP + statements.IS_MAP + statements.CF_MAP
+               for i in range(1, n_years+1)}
+    df = pd.concat([synthetic_frame(1, n_years), pd.DataFrame([history])], axis=1)
+    row = df.iloc[0]
+    res = dcf_engine.compute_valuation(row, n_years, "float")
+    sens = dcf_engine.build_sensitivity(res["fcf_list"], res["periods"], float(res["wacc"]), float(res["tgr"]), "float")
+    stmt = statements.build_statement_tables(df, n_years)[0]
+    return {
+        "css": report_render.CSS_TEXT,
+        "company_name": "Benchmark Co", "valuation_date": "31 March 2025",
+        "dcf_rows": res["dcf_rows"], "sensitivity": sens,
+        "bs_years": stmt["years"], "bs_rows": stmt["bs_rows"],
+        "is_years": stmt["years"], "is_rows": stmt["is_rows"],
+        "cf_years": stmt["years"], "cf_rows": stmt["cf_rows"],
+        "history": {"columns": ["Metric", "Value"], "rows": []},
+        "forecast": {"columns": ["Year", "FCFF"], "rows": [[r[0], r[1]] for r in res["dcf_rows"]]},
+        "comps": {"columns": [], "rows": []}, "deals": {"columns": [], "rows": []},
+        "football_field": {"rows": []}, "exit_view": {"has_data": False},
+        "appendices": [],
+        "theory_extra_pages": report_render.build_theory_pages(min_pages=theory_pages),
+    }
+
+def _worker(variant: str, reports: int, theory_pages: int, out: "mp.Queue") -> None:
+    ctx = sample_context(theory_pages)
+    report_render.render_html(ctx)  # warm imports / template compile outside the measurement
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    size = 0
+    for _ in range(reports):
+        if variant == "in-memory":
+            size = len(report_render.render_pdf_in_memory(ctx))
+        else:
+            with report_render.render_pdf(ctx) as f:
+                size = len(f.read())
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out.put((variant, base / 1024, peak / 1024, time.perf_counter() - t0, size))
+
+def main(reports: int = 3, theory_pages: int = 40) -> None:
+    html_kb = len(report_render.render_html(sample_context(theory_pages)).encode("utf-8")) / 1024
+    print(f"{reports} reports, {theory_pages} theory pages, {html_kb:.0f} KB of HTML each")
+    ctx = mp.get_context("spawn")
+    for variant in ("in-memory", "streamed"):
+        q = ctx.Queue()
+        p = ctx.Process(target=_worker, args=(variant, reports, theory_pages, q))
+        p.start()
+        name, base, peak, secs, size = q.get()
+        p.join()
+        print(f"{name:10s} RSS before {base:7.1f} MB  peak {peak:7.1f} MB  (+{peak - base:6.1f} MB)  "
+              f"{secs:6.2f}s  pdf {size / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
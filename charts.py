@@ -0,0 +1,133 @@
+# charts.py — Report charts as self-contained SVG (no plotting dependency)
+# - Tornado: EV swing per driver at ±shock, sorted by swing, centred on the base EV
+# - Heatmap: EV (or equity) over a sensitivity grid, shaded below / above the base case
+# - SVG stays vector in the PDF (xhtml2pdf draws it through svglib) and in the browser
+# - Every chart is cached on its inputs (values already rounded / formatted by the caller),
+#   so a rerun with unchanged numbers reuses the markup instead of rebuilding it
+
+import re, base64
+from functools import lru_cache
+from typing import Tuple, Optional
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+CHART_CACHE_SIZE = 512
+REPORT_WIDTH = 480         # points across the report page
+SIZE_RE = re.compile(r'^<svg [^>]*width="(\d+)" height="(\d+)"')
+FONT = "Helvetica"
+WIDTH = 640
+LOW_COLOUR = "#c0504d"     # driver shocked down
+HIGH_COLOUR = "#1f4e79"    # driver shocked up
+NEG_RGB = (192, 80, 77)    # heatmap: below the base case
+POS_RGB = (84, 150, 84)    # heatmap: above the base case
+
+def _text(x: float, y: float, s: str, size: int = 10, anchor: str = "start", weight: str = "normal") -> str:
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-family="{FONT}" font-size="{size}" '
+            f'font-weight="{weight}" text-anchor="{anchor}">{escape(str(s))}</text>')
+
+def _svg(width: float, height: float, body: list) -> str:
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+            f'viewBox="0 0 {width:.0f} {height:.0f}">' + "".join(body) + "</svg>")
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def data_uri(svg: str) -> str:
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode("utf-8")).decode("ascii")
+
+def embed(svg: str, width: int = REPORT_WIDTH) -> dict:
+    # <img> attributes for the report, scaled to the page width with the chart's aspect ratio
+    w, h = (int(v) for v in SIZE_RE.match(svg).groups())
+    return {"src": data_uri(svg), "width": width, "height": round(h * width / w)}
+
+# =========================
+# 🌪️ Tornado
+# =========================
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def tornado_svg(labels: Tuple[str, ...], low: Tuple[float, ...], high: Tuple[float, ...], base: float,
+                low_text: Tuple[str, ...], high_text: Tuple[str, ...], base_text: str,
+                shock: float) -> str:
+    # low / high: EV with each driver at (1 - shock) / (1 + shock); NaN scenarios are dropped
+    rows = [(lab, lo, hi, lt, ht) for lab, lo, hi, lt, ht in zip(labels, low, high, low_text, high_text)
+            if np.isfinite(lo) and np.isfinite(hi)]
+    rows.sort(key=lambda r: abs(r[2] - r[1]), reverse=True)
+    label_w, pad, bar_h, gap, top = 130, 70, 16, 8, 36
+    height = top + len(rows) * (bar_h + gap) + 28
+    span = max([abs(v - base) for r in rows for v in r[1:3]] + [1e-9])
+    plot_w = WIDTH - label_w - 2 * pad
+    cx = label_w + pad + plot_w / 2
+    xpos = lambda v: cx + (v - base) / span * plot_w / 2
+
+    body = [
+        _text(label_w, 14, f"EV impact of each driver at -{shock:.0%} / +{shock:.0%}", 11, weight="bold"),
+        f'<rect x="{label_w:.1f}" y="20" width="10" height="8" fill="{LOW_COLOUR}"/>',
+        _text(label_w + 14, 28, f"-{shock:.0%}", 9),
+        f'<rect x="{label_w + 54:.1f}" y="20" width="10" height="8" fill="{HIGH_COLOUR}"/>',
+        _text(label_w + 68, 28, f"+{shock:.0%}", 9),
+    ]
+    for i, (lab, lo, hi, lt, ht) in enumerate(rows):
+        y = top + i * (bar_h + gap)
+        body.append(_text(label_w - 6, y + bar_h - 4, lab, 10, "end"))
+        for v, colour in ((lo, LOW_COLOUR), (hi, HIGH_COLOUR)):
+            x0, x1 = sorted((cx, xpos(v)))
+            body.append(f'<rect x="{x0:.1f}" y="{y:.1f}" width="{max(x1 - x0, 0.5):.1f}" '
+                        f'height="{bar_h}" fill="{colour}"/>')
+        # value labels sit outside whichever end of the bar they belong to
+        for v, t in ((lo, lt), (hi, ht)):
+            right = v >= base
+            body.append(_text(xpos(v) + (4 if right else -4), y + bar_h - 4, t, 9, "start" if right else "end"))
+    axis_bottom = top + len(rows) * (bar_h + gap)
+    body.append(f'<line x1="{cx:.1f}" y1="{top - 4}" x2="{cx:.1f}" y2="{axis_bottom:.1f}" '
+                f'stroke="#333333" stroke-width="1"/>')
+    body.append(_text(cx, axis_bottom + 16, f"Base EV {base_text}", 9, "middle"))
+    return _svg(WIDTH, height, body)
+
+# =========================
+# 🟩 Heatmap
+# =========================
+def _shade(t: float) -> str:
+    # t in [-1, 1]: red below the base case, white at it, green above
+    if not np.isfinite(t):
+        return "#eeeeee"
+    rgb = NEG_RGB if t < 0 else POS_RGB
+    a = min(abs(t), 1.0) * 0.75
+    return "#%02x%02x%02x" % tuple(round(255 + (c - 255) * a) for c in rgb)
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def heatmap_svg(row_labels: Tuple[str, ...], col_labels: Tuple[str, ...],
+                values: Tuple[Tuple[float, ...], ...], cells: Tuple[Tuple[str, ...], ...],
+                row_title: str, col_title: str, base: Optional[Tuple[int, int]] = None,
+                measure: str = "Enterprise value") -> str:
+    # values: raw EV per cell (NaN where undefined); cells: the same values formatted for display.
+    # Shading is relative to the base cell, or to the grid median without one.
+    grid = np.array(values, dtype=float)
+    finite = grid[np.isfinite(grid)]
+    ref = grid[base] if base is not None and np.isfinite(grid[base]) else (np.median(finite) if finite.size else 0.0)
+    span = np.max(np.abs(finite - ref)) if finite.size else 0.0
+    label_w, top, cell_h = 70, 40, 20
+    cell_w = (WIDTH - label_w) / max(len(col_labels), 1)
+    height = top + len(row_labels) * cell_h + 6
+
+    body = [
+        _text(label_w, 14, f"{measure}: {row_title} (rows) vs {col_title} (columns)", 11, weight="bold"),
+        _text(label_w / 2, top - 6, f"{row_title} \\ {col_title}", 8, "middle"),
+    ]
+    for j, lab in enumerate(col_labels):
+        body.append(_text(label_w + (j + 0.5) * cell_w, top - 6, lab, 9, "middle", "bold"))
+    for i, lab in enumerate(row_labels):
+        y = top + i * cell_h
+        body.append(_text(label_w - 6, y + cell_h - 6, lab, 9, "end", "bold"))
+        for j in range(len(col_labels)):
+            t = (grid[i, j] - ref) / span if span > 0 else 0.0
+            x = label_w + j * cell_w
+            is_base = base == (i, j)
+            body.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{cell_w:.1f}" height="{cell_h}" '
+                        f'fill="{_shade(t)}" stroke="{"#000000" if is_base else "#ffffff"}" '
+                        f'stroke-width="{1.5 if is_base else 1}"/>')
+            body.append(_text(x + cell_w / 2, y + cell_h - 6, cells[i][j], 9, "middle",
+                              "bold" if is_base else "normal"))
+    return _svg(WIDTH, height, body)
+
+def chart_cache_stats() -> dict:
+    info = {name: fn.cache_info() for name, fn in
+            (("tornado", tornado_svg), ("heatmap", heatmap_svg), ("data_uri", data_uri))}
+    return {name: {"hits": i.hits, "misses": i.misses, "size": i.currsize} for name, i in info.items()}
@@ -0,0 +1,184 @@
+# comps.py — Market-multiples cross-check (comparable companies & transactions)
+# - Loads a comps / deals dataset from a workbook sheet or a local CSV / Parquet file
+# - Peer index by sector and size (revenue), so a lookup is a binary search, not a scan; subjects
+#   without a known sector search all peers through a revenue-sorted permutation
+# - EV/Revenue, EV/EBITDA and P/E computed vectorized for the whole dataset once
+# - Median / P25–P75 ranges per peer set and a football-field summary against the DCF
+
+import io, os, warnings
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from formatting import NumberFormat, DEFAULT_FORMAT, format_array
+
+COMPS_PATH = os.environ.get("VALUATION_COMPS_PATH", "")
+DEALS_PATH = os.environ.get("VALUATION_DEALS_PATH", "")
+SIZE_BAND = 3.0      # peers with revenue within [size / band, size * band]
+MIN_PEERS = 3        # widen to the whole sector when the size band is thinner than this
+MAX_LISTED = 10      # peers listed individually in the report table
+
+MULTIPLES = ["EV/Revenue", "EV/EBITDA", "P/E"]
+# dataset column → accepted header spellings
+COLUMN_ALIASES = {
+    "Name": ["Company", "Company Name", "Deal", "Target", "Name"],
+    "Sector": ["Sector", "Industry"],
+    "EV": ["EV", "Enterprise Value", "Deal Value"],
+    "Revenue": ["Revenue", "Sales"],
+    "EBITDA": ["EBITDA"],
+    "Net Income": ["Net Income", "PAT", "Net_Income"],
+    "Market Cap": ["Market Cap", "Equity Value", "Market Capitalisation"],
+    "Date": ["Date", "Deal Date", "Announced"],
+}
+# subject-company metrics, first column present wins
+COMPANY_METRIC_COLUMNS = {
+    "Revenue": ["Revenue", "Revenue_FY1"],
+    "EBITDA": ["EBITDA", "EBITDA_FY1"],
+    "Net Income": ["Net Income", "Net_Income_FY1"],
+}
+
+# =========================
+# 📥 Loading & normalisation
+# =========================
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    lookup = {str(c).strip().lower(): c for c in df.columns}
+    out = pd.DataFrame(index=df.index)
+    for col, aliases in COLUMN_ALIASES.items():
+        src = next((lookup[a.lower()] for a in aliases if a.lower() in lookup), None)
+        if src is None:
+            out[col] = np.nan if col not in ("Name", "Sector", "Date") else ""
+        elif col in ("Name", "Sector", "Date"):
+            out[col] = df[src].fillna("").astype(str).str.strip()
+        else:
+            out[col] = pd.to_numeric(df[src], errors="coerce")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ev, rev, ebitda, ni = (out[c].to_numpy(float) for c in ("EV", "Revenue", "EBITDA", "Net Income"))
+        mcap = out["Market Cap"].to_numpy(float)
+        out["EV/Revenue"] = np.where(rev > 0, ev / rev, np.nan)
+        out["EV/EBITDA"] = np.where(ebitda > 0, ev / ebitda, np.nan)
+        out["P/E"] = np.where(ni > 0, mcap / ni, np.nan)
+    out["sector_key"] = out["Sector"].str.lower()
+    return out.reset_index(drop=True)
+
+def read_dataset(name: str, data: bytes) -> pd.DataFrame:
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(io.BytesIO(data))
+    if ext in (".parquet", ".pq"):
+        return pd.read_parquet(io.BytesIO(data))
+    return pd.read_excel(io.BytesIO(data))
+
+def load_local_dataset(path: str) -> Optional[pd.DataFrame]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return read_dataset(path, f.read())
+
+# =========================
+# 🗂️ Peer index (sector → revenue-sorted slice)
+# =========================
+def build_peer_index(peers: pd.DataFrame) -> Dict[str, Any]:
+    # missing revenue sorts last, where np.searchsorted expects NaN
+    order = np.lexsort((peers["Revenue"].fillna(np.inf).to_numpy(), peers["sector_key"].to_numpy()))
+    sorted_peers = peers.iloc[order].reset_index(drop=True)
+    sectors = sorted_peers["sector_key"].to_numpy()
+    keys, starts = np.unique(sectors, return_index=True)
+    ends = np.append(starts[1:], len(sorted_peers))
+    revenue = sorted_peers["Revenue"].to_numpy(float)
+    return {
+        "peers": sorted_peers,
+        "revenue": revenue,
+        "by_revenue": np.argsort(revenue, kind="stable"),   # all sectors, for subjects without a known sector
+        "multiples": sorted_peers[MULTIPLES].to_numpy(float),
+        "slices": {k: (int(s), int(e)) for k, s, e in zip(keys, starts, ends)},
+    }
+
+def peer_positions(index: Dict[str, Any], sector: str, size: float) -> np.ndarray:
+    span = index["slices"].get(str(sector).strip().lower())
+    if span is None:
+        positions = index["by_revenue"]
+    else:
+        positions = np.arange(*span)
+    if not np.isfinite(size) or size <= 0:
+        return positions
+    rev = index["revenue"][positions]
+    lo = np.searchsorted(rev, size / SIZE_BAND, side="left")
+    hi = np.searchsorted(rev, size * SIZE_BAND, side="right")
+    if hi - lo < MIN_PEERS:
+        return positions
+    return positions[lo:hi]
+
+def multiple_stats(index: Dict[str, Any], positions: np.ndarray) -> Dict[str, np.ndarray]:
+    block = index["multiples"][positions]
+    if block.size == 0 or not np.isfinite(block).any():
+        nan = np.full(len(MULTIPLES), np.nan)
+        return {"median": nan, "p25": nan, "p75": nan, "min": nan, "max": nan,
+                "count": np.zeros(len(MULTIPLES), dtype=int)}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        q = np.nanpercentile(block, [25, 50, 75], axis=0)
+        return {
+            "median": q[1], "p25": q[0], "p75": q[2],
+            "min": np.nanmin(block, axis=0), "max": np.nanmax(block, axis=0),
+            "count": np.isfinite(block).sum(axis=0),
+        }
+
+# =========================
+# 📋 Report tables
+# =========================
+def company_metrics(row) -> Dict[str, float]:
+    out = {}
+    for metric, cols in COMPANY_METRIC_COLUMNS.items():
+        val = np.nan
+        for c in cols:
+            v = pd.to_numeric(pd.Series([row.get(c, None)]), errors="coerce").iloc[0]
+            if pd.notna(v):
+                val = float(v)
+                break
+        out[metric] = val
+    return out
+
+TABLE_LAYOUTS = {
+    "comps": (["Company"] + MULTIPLES, MULTIPLES),
+    "deals": (["Deal", "EV/Revenue", "EV/EBITDA", "Date"], ["EV/Revenue", "EV/EBITDA"]),
+}
+
+def peer_table(index: Dict[str, Any], positions: np.ndarray, size: float, kind: str,
+               number_format: NumberFormat = DEFAULT_FORMAT) -> Tuple[List[str], List[List[Any]], Dict[str, np.ndarray]]:
+    columns, shown = TABLE_LAYOUTS[kind]
+    stats = multiple_stats(index, positions)
+    if len(positions) == 0:
+        return columns, [], stats
+    peers = index["peers"].iloc[positions]
+    if np.isfinite(size) and size > 0:
+        closest = np.argsort(np.abs(np.log(peers["Revenue"].clip(lower=1e-9).to_numpy(float) / size)))
+        peers = peers.iloc[closest[:MAX_LISTED]]
+    else:
+        peers = peers.head(MAX_LISTED)
+    cols_idx = [MULTIPLES.index(m) for m in shown]
+    cells = format_array(peers[shown].to_numpy(float), number_format, blank="n/a")
+    med = format_array(stats["median"][cols_idx], number_format, blank="n/a")
+    p25 = format_array(stats["p25"][cols_idx], number_format, blank="n/a")
+    p75 = format_array(stats["p75"][cols_idx], number_format, blank="n/a")
+    tail = [[d] for d in peers["Date"]] if kind == "deals" else [[] for _ in range(len(peers))]
+    rows = [[n] + list(c) + t for n, c, t in zip(peers["Name"], cells, tail)]
+    pad = [""] if kind == "deals" else []
+    rows.append([f"Median ({int(stats['count'].max())} peers)"] + list(med) + pad)
+    rows.append(["Range (P25 – P75)"] + [f"{a} – {b}" for a, b in zip(p25, p75)] + pad)
+    return columns, rows, stats
+
+def football_field(metrics: Dict[str, float], sources: List[Tuple[str, Dict[str, np.ndarray]]],
+                   net_debt: float, dcf_range: Tuple[float, float, float]) -> List[List[Any]]:
+    # [method, low, mid, high] in EV terms; P/E gives equity, bridged to EV with net debt
+    base = [metrics["Revenue"], metrics["EBITDA"], metrics["Net Income"]]
+    rows = [["DCF (WACC × g sensitivity)", *dcf_range]]
+    for source, stats in sources:
+        for k, name in enumerate(MULTIPLES):
+            b = base[k]
+            if not (np.isfinite(b) and b > 0 and np.isfinite(stats["median"][k])):
+                continue
+            adj = net_debt if name == "P/E" else 0.0
+            rows.append([f"{source} — {name}",
+                         stats["p25"][k] * b + adj, stats["median"][k] * b + adj, stats["p75"][k] * b + adj])
+    return rows
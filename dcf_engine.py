@@ -0,0 +1,763 @@
+# dcf_engine.py — FCFF DCF engine shared by the app, portfolio view and benchmarks
+# - Scalar path (compute_valuation / build_sensitivity) with an explicit precision mode:
+#     float    — fast float64
+#     decimal  — Decimal with a configurable precision, applied in a local context only
+#     fraction — exact rationals for audit runs
+# - Inputs are converted once at ingestion (ingest_row / ingest_frame), never per use
+# - Vectorized path (compute_batch) values all workbook rows at once in numpy float64;
+#   rows may have different forecast lengths (per-row horizon, years beyond it masked out)
+#   and rows the report rejects as incomplete (missing_inputs) come out NaN / invalid here too
+# - Discount factors come from one bounded LRU table keyed by (wacc, periods), shared by all paths
+# - Discounting convention (end-year / mid-year / stub) and terminal method (Gordon / exit multiple)
+#   are defined once (discount_times, terminal_value) and used by every path
+# - Driver scenarios (scenario_values) value rows × scenarios in one broadcast: the tornado and
+#   any-driver × any-driver sensitivity grids (driver_grids, all grids of all rows in one call)
+
+import re
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from functools import lru_cache
+from typing import List, Dict, Any, Callable, Tuple, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from formatting import NumberFormat, DEFAULT_FORMAT, format_array, format_list
+
+# =========================
+# ⚙️ Precision & helpers
+# =========================
+PRECISION_MODES = {
+    "float": "Fast (float64)",
+    "decimal": "Decimal (configurable precision)",
+    "fraction": "Exact (Fraction, audit)",
+}
+DEFAULT_MODE = "decimal"
+DEFAULT_DECIMAL_PREC = 12
+FRACTION_POW_PREC = 50  # digits used when an exact power is irrational (fractional exponents)
+
+def D(x) -> Decimal:
+    try:
+        return Decimal(str(x))
+    except Exception:
+        return Decimal(0)
+
+def is_empty(x) -> bool:
+    return (x is None) or (str(x).strip() == "") or (pd.isna(x))
+
+def _to_float(x) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return 0.0
+
+def _to_fraction(x) -> Fraction:
+    try:
+        return Fraction(str(x))
+    except Exception:
+        return Fraction(0)
+
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "float": _to_float,
+    "decimal": D,
+    "fraction": _to_fraction,
+}
+
+def _pow(base, exp, mode: str):
+    if mode == "fraction" and exp.denominator != 1:
+        with localcontext() as ctx:
+            ctx.prec = FRACTION_POW_PREC
+            b = Decimal(base.numerator) / Decimal(base.denominator)
+            e = Decimal(exp.numerator) / Decimal(exp.denominator)
+            return Fraction(b ** e)
+    if mode == "fraction":
+        return base ** int(exp)
+    return base ** exp
+
+# =========================
+# 🗓️ Discounting convention & terminal value
+# =========================
+DISCOUNT_CONVENTIONS = {
+    "end": "End of year",
+    "mid": "Mid-year",
+    "stub": "Stub from valuation date to fiscal year-end (mid-period)",
+}
+TERMINAL_METHODS = {
+    "gordon": "Gordon growth",
+    "exit": "Exit multiple",
+}
+EXIT_BASES = {
+    "fcff": "EV / FCFF",
+    "ebitda": "EV / EBITDA",
+}
+EXIT_GRID_STEPS = np.arange(-3, 4) * 1.0        # multiples around the base, in turns
+WACC_GRID_STEPS = np.arange(-3, 4) * 0.01       # WACC around the base
+
+class Convention(NamedTuple):
+    discounting: str = "end"
+    stub: Optional[float] = None   # first-period year fraction; replaces First_Period_Fraction
+    terminal: str = "gordon"
+    exit_multiple: float = 10.0
+    exit_basis: str = "fcff"       # final-year metric the exit multiple applies to
+
+DEFAULT_CONVENTION = Convention()
+
+def stub_fraction(valuation_date, fiscal_year_end) -> float:
+    days = (fiscal_year_end - valuation_date).days
+    if not 0 < days <= 366:
+        raise ValueError("Fiscal year-end must fall within one year after the valuation date.")
+    return min(days / 365.0, 1.0)
+
+def discount_times(periods, discounting: str) -> Tuple[np.ndarray, np.ndarray]:
+    # (cash-flow times, period-end times) in years for a (..., n) array of period lengths;
+    # mid-period conventions receive each year's cash flow half-way through that period.
+    # Works on float arrays and on object arrays of Decimal / Fraction alike.
+    periods = np.asarray(periods)
+    ends = np.cumsum(periods, axis=-1)
+    if discounting == "end":
+        return ends, ends
+    return ends - periods / 2, ends
+
+def terminal_value(fcf_last, wacc, tgr, convention: Convention = DEFAULT_CONVENTION, num=float,
+                   ebitda_last=None, multiple=None):
+    # scalar (any precision mode) or numpy arrays; Gordon divides by zero when wacc == tgr.
+    # multiple overrides convention.exit_multiple (per-row arrays in the batched scenarios)
+    if convention.terminal == "exit":
+        basis = ebitda_last if convention.exit_basis == "ebitda" else fcf_last
+        return basis * (num(convention.exit_multiple) if multiple is None else multiple)
+    return fcf_last * (num(1) + tgr) / (wacc - tgr)
+
+def terminal_discount(cash, end, convention: Convention = DEFAULT_CONVENTION):
+    # Gordon capitalises the flows that follow the last one, so it sits at the last cash-flow
+    # time; an exit multiple prices the business at the end of the final period
+    return end if convention.terminal == "exit" else cash
+
+# =========================
+# 📉 Shared discount-factor table
+# =========================
+DF_CACHE_SIZE = 4096  # distinct (mode, wacc, periods, convention) profiles kept
+
+def discount_table(mode: str, prec: int, wacc, periods: Tuple,
+                   discounting: str = "end") -> Tuple[Tuple, Tuple, Tuple]:
+    # (factors, powers, end_powers) per year: powers[i] = (1+wacc) ** t_i at the cash-flow time,
+    # factors[i] = 1 / powers[i], end_powers[i] at the end of period i
+    return _discount_table(mode, prec if mode == "decimal" else DEFAULT_DECIMAL_PREC, wacc, periods, discounting)
+
+@lru_cache(maxsize=DF_CACHE_SIZE)
+def _discount_table(mode: str, prec: int, wacc, periods: Tuple, discounting: str) -> Tuple[Tuple, Tuple, Tuple]:
+    num = CONVERTERS[mode]
+    one = num(1)
+    with localcontext() as ctx:
+        ctx.prec = prec
+        cash_t, end_t = discount_times(np.array(periods, dtype=object), discounting)
+        powers = tuple(_pow(one+wacc, t, mode) for t in cash_t)
+        end_powers = powers if discounting == "end" else tuple(_pow(one+wacc, t, mode) for t in end_t)
+        factors = tuple(one / p for p in powers)
+    return factors, powers, end_powers
+
+def discount_cache_stats() -> Dict[str, Any]:
+    info = _discount_table.cache_info()
+    lookups = info.hits + info.misses
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize,
+            "max_size": info.maxsize, "hit_rate": (info.hits / lookups) if lookups else 0.0}
+
+def clear_discount_cache() -> None:
+    _discount_table.cache_clear()
+
+# =========================
+# 📥 Ingestion (convert once)
+# =========================
+CORE_FIELDS = [
+    "Company Name","Client Name","WACC","TGR","Opening Cash","Other Non-Op Assets",
+    "Debt","DLOM","Money Infusion","First_Period_Fraction"
+]
+NUMERIC_CORE_FIELDS = CORE_FIELDS[2:]
+CORE_DEFAULTS = {"First_Period_Fraction": 1}
+PER_YEAR_PREFIXES = ["NOIAT_","Depreciation_","CapEx_","Inc_NWC_"]
+OPTIONAL_PER_YEAR_PREFIXES = ["EBITDA_"]  # only read for an EV / EBITDA exit multiple
+
+PER_YEAR_RE = re.compile(r"^(%s)(\d+)$" % "|".join(
+    re.escape(p) for p in PER_YEAR_PREFIXES + OPTIONAL_PER_YEAR_PREFIXES))
+
+def year_map(columns, pattern: "re.Pattern" = PER_YEAR_RE) -> Dict[str, Dict[int, int]]:
+    # prefix → year → column position, one regex pass over the header
+    out: Dict[str, Dict[int, int]] = {}
+    for pos, col in enumerate(columns):
+        m = pattern.match(str(col))
+        if m:
+            out.setdefault(m.group(1), {})[int(m.group(2))] = pos
+    return out
+
+def detect_years(df: pd.DataFrame) -> int:
+    # horizon = last year present in any projection family, not just NOIAT_
+    return max((max(years) for p, years in year_map(df.columns).items() if p in PER_YEAR_PREFIXES), default=0)
+
+def row_horizon(row, n_years: int) -> int:
+    # last year with any per-year value filled in for this row (0 if none)
+    for i in range(n_years, 0, -1):
+        if any(not is_empty(row.get(f"{p}{i}", None)) for p in PER_YEAR_PREFIXES):
+            return i
+    return 0
+
+# inputs a row must fill before it is valued; the report loop (missing_inputs) and the batch
+# path (batch_inputs' "complete" mask) apply the same rule, so both value the same rows
+REQUIRED_FIELDS = ["WACC","TGR","Opening Cash","Other Non-Op Assets","Debt","DLOM","Money Infusion",
+                   "First_Period_Fraction"]
+
+def needs_ebitda(convention: Convention) -> bool:
+    return convention.terminal == "exit" and convention.exit_basis == "ebitda"
+
+def missing_inputs(row, n_years: int, convention: Convention = DEFAULT_CONVENTION) -> List[str]:
+    missing = [k for k in REQUIRED_FIELDS if is_empty(row.get(k, None))]
+    missing += [f"{p}{i}" for i in range(1, n_years+1) for p in PER_YEAR_PREFIXES
+                if is_empty(row.get(f"{p}{i}", None))]
+    if needs_ebitda(convention) and is_empty(row.get(f"EBITDA_{n_years}", None)):
+        missing.append(f"EBITDA_{n_years}")
+    return missing
+
+def input_columns(n_years: int) -> List[str]:
+    return NUMERIC_CORE_FIELDS + [f"{p}{i}" for i in range(1, n_years+1) for p in PER_YEAR_PREFIXES]
+
+def ingest_row(row, n_years: int, mode: str = DEFAULT_MODE) -> Dict[str, Any]:
+    num = CONVERTERS[mode]
+    x = {k: num(row.get(k, CORE_DEFAULTS.get(k, 0))) for k in input_columns(n_years)}
+    for p in OPTIONAL_PER_YEAR_PREFIXES:
+        k = f"{p}{n_years}"
+        if not is_empty(row.get(k, None)):
+            x[k] = num(row[k])
+    return x
+
+def ingest_frame(df: pd.DataFrame, n_years: int, mode: str = DEFAULT_MODE) -> List[Dict[str, Any]]:
+    cols = input_columns(n_years)
+    block = df.reindex(columns=cols)
+    for k in cols:
+        if k not in df.columns:
+            block[k] = CORE_DEFAULTS.get(k, 0)
+    num = CONVERTERS[mode]
+    if mode == "float":
+        block = block.apply(pd.to_numeric, errors="coerce").astype(float)
+        rows = block.to_dict("records")
+    else:
+        converted = {k: [num(v) for v in block[k].tolist()] for k in cols}
+        rows = [dict(zip(cols, vals)) for vals in zip(*(converted[k] for k in cols))]
+    # optional per-year inputs are only set where filled, as in ingest_row
+    for k in (f"{p}{i}" for p in OPTIONAL_PER_YEAR_PREFIXES for i in range(1, n_years+1)):
+        if k in df.columns:
+            for x, v in zip(rows, df[k].tolist()):
+                if not is_empty(v):
+                    x[k] = num(v)
+    return rows
+
+# =========================
+# 🧮 Valuation math (scalar, precision-controlled)
+# =========================
+def dcf_schedule(fcf_list: List[Any], factors: List[Any],
+                 number_format: NumberFormat = DEFAULT_FORMAT) -> List[List[str]]:
+    pvs = [f * dfac for f, dfac in zip(fcf_list, factors)]
+    fcf_s, pv_s = format_list(fcf_list, number_format), format_list(pvs, number_format)
+    return [[f"FY {i}", fcf_s[i-1], f"{float(factors[i-1]):.6f}", pv_s[i-1]] for i in range(1, len(fcf_list)+1)]
+
+def value_inputs(x: Dict[str, Any], n_years: int, mode: str = DEFAULT_MODE,
+                 prec: int = DEFAULT_DECIMAL_PREC,
+                 number_format: NumberFormat = DEFAULT_FORMAT,
+                 convention: Convention = DEFAULT_CONVENTION) -> Dict[str, Any]:
+    num = CONVERTERS[mode]
+    zero, one, hundred = num(0), num(1), num(100)
+    with localcontext() as ctx:
+        ctx.prec = prec
+        wacc = x["WACC"] / hundred
+        tgr  = x["TGR"] / hundred
+        opening_cash = x["Opening Cash"]
+        other_nonop  = x["Other Non-Op Assets"]
+        debt         = x["Debt"]
+        dlom_pct     = x["DLOM"] / hundred
+        money_inf    = x["Money Infusion"]
+        first_frac   = x["First_Period_Fraction"] if convention.stub is None else num(convention.stub)
+
+        periods = [first_frac] + [one] * (n_years-1)
+        fcf_list = []
+        for i in range(1, n_years+1):
+            fcf = x[f"NOIAT_{i}"] + x[f"Depreciation_{i}"] - x[f"CapEx_{i}"] - x[f"Inc_NWC_{i}"]
+            fcf_list.append(fcf)
+
+        factors, powers, end_powers = discount_table(mode, prec, wacc, tuple(periods), convention.discounting)
+        pv_discrete = zero
+        for fcf, dfac in zip(fcf_list, factors):
+            pv_discrete += fcf * dfac
+        dcf_rows = dcf_schedule(fcf_list, factors, number_format)
+
+        if convention.terminal == "gordon" and (wacc - tgr) == 0:
+            raise ValueError("WACC equals Terminal Growth Rate; please adjust inputs.")
+        ebitda_last = x.get(f"EBITDA_{n_years}")
+        if convention.terminal == "exit" and convention.exit_basis == "ebitda" and ebitda_last is None:
+            raise ValueError(f"EBITDA_{n_years} is needed for an EV / EBITDA exit multiple.")
+
+        tv          = terminal_value(fcf_list[-1], wacc, tgr, convention, num, ebitda_last)
+        pv_terminal = tv / terminal_discount(powers, end_powers, convention)[-1]
+
+        enterprise_value = pv_discrete + pv_terminal
+        invested_capital = enterprise_value + opening_cash + other_nonop
+        equity_before_dlom = invested_capital - debt
+        dlom_amount = equity_before_dlom * dlom_pct
+        equity_after_dlom = equity_before_dlom - dlom_amount
+        equity_post_money = equity_after_dlom + money_inf
+
+    return {
+        "wacc": wacc, "tgr": tgr,
+        "pv_discrete": pv_discrete, "pv_terminal": pv_terminal,
+        "enterprise_value": enterprise_value,
+        "opening_cash": opening_cash, "other_nonop": other_nonop, "debt": debt,
+        "dlom_pct": dlom_pct, "equity_post_money": equity_post_money,
+        "terminal_value": tv, "ebitda_last": ebitda_last,
+        "dcf_rows": dcf_rows, "discount_factors": factors,
+        "fcf_list": fcf_list, "periods": periods,
+        "convention": convention,
+    }
+
+def compute_valuation(row: pd.Series, n_years: int, mode: str = DEFAULT_MODE,
+                      prec: int = DEFAULT_DECIMAL_PREC,
+                      number_format: NumberFormat = DEFAULT_FORMAT,
+                      convention: Convention = DEFAULT_CONVENTION) -> Dict[str, Any]:
+    return value_inputs(ingest_row(row, n_years, mode), n_years, mode, prec, number_format, convention)
+
+def build_sensitivity(fcf_list: List[Any], periods: List[Any], wacc_base: float, g_base: float,
+                      mode: str = DEFAULT_MODE, prec: int = DEFAULT_DECIMAL_PREC,
+                      number_format: NumberFormat = DEFAULT_FORMAT,
+                      convention: Convention = DEFAULT_CONVENTION, ebitda_last=None):
+    def frange(a, b, step):
+        vals = []
+        x = a
+        for _ in range(999):
+            if (step>0 and x>b) or (step<0 and x<b):
+                break
+            vals.append(round(x,4))
+            x = x + step
+        return vals
+
+    wr = frange(max(0.01, wacc_base - 0.03), wacc_base + 0.031, 0.01) or [round(wacc_base,4)]
+    gr = frange(max(-0.02, g_base - 0.02), g_base + 0.021, 0.005) or [round(g_base,4)]
+
+    num = CONVERTERS[mode]
+    zero = num(0)
+    period_key = tuple(periods)
+    def ev_for(w,g):
+        factors, powers, end_powers = discount_table(mode, prec, num(w), period_key, convention.discounting)
+        pv_d = zero
+        for f, dfac in zip(fcf_list, factors):
+            pv_d += f * dfac
+        if convention.terminal == "gordon" and w - g <= 0:
+            return None
+        tv = terminal_value(fcf_list[-1], num(w), num(g), convention, num, ebitda_last)
+        pv_t = tv / terminal_discount(powers, end_powers, convention)[-1]
+        return round(float(pv_d + pv_t), 2)
+    values = []
+    with localcontext() as ctx:
+        ctx.prec = prec
+        for g in gr:
+            num_vals = []
+            for w in wr:
+                try:
+                    v = ev_for(w,g)
+                    ok = v is not None and not np.isinf(v) and not np.isnan(v)
+                except Exception:
+                    v, ok = None, False
+                num_vals.append(v if ok else None)
+            values.append(num_vals)
+    cells = format_list(values, number_format, blank="n/a")
+    rows = [[f"{g:.2%}", row_vals] for g, row_vals in zip(gr, cells)]
+    return {"wacc_cols": [f"{w:.2%}" for w in wr], "rows": rows,
+            "wacc_values": wr, "g_values": gr, "values": values}
+
+# =========================
+# 🚀 Vectorized batch path (float64)
+# =========================
+def _col(df: pd.DataFrame, name: str, default: float = 0.0) -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), default, dtype=float)
+    s = df[name]
+    if s.dtype.kind != "f":  # frames from schema.coerce_frame are already float64
+        s = pd.to_numeric(s, errors="coerce")
+    return s.to_numpy(dtype=float)
+
+def _block(df: pd.DataFrame, prefix: str, n_years: int) -> np.ndarray:
+    # blank cells stay NaN; a column missing from the header is NaN too (see batch_inputs)
+    return np.column_stack([_col(df, f"{prefix}{i}", np.nan) for i in range(1, n_years+1)]).reshape(len(df), n_years)
+
+def row_horizons(blocks: List[np.ndarray]) -> np.ndarray:
+    # per-row horizon: last year with a value in any projection family
+    filled = np.logical_or.reduce([np.isfinite(b) for b in blocks])
+    last = filled.shape[1] - np.argmax(filled[:, ::-1], axis=1)
+    return np.where(filled.any(axis=1), last, 0)
+
+def batch_inputs(df: pd.DataFrame, n_years: int,
+                 convention: Convention = DEFAULT_CONVENTION) -> Dict[str, Any]:
+    periods = np.ones((len(df), n_years))
+    periods[:, 0] = _col(df, "First_Period_Fraction", 1.0) if convention.stub is None else convention.stub
+    blocks = {p: _block(df, p, n_years) for p in PER_YEAR_PREFIXES}
+    horizon = row_horizons(list(blocks.values()))
+    # inside a row's horizon blank cells and absent columns stay NaN and the row is incomplete,
+    # as missing_inputs rules for the report; beyond it every year is masked to 0 so shorter
+    # forecasts sit in the same arrays
+    live = np.arange(1, n_years+1)[None, :] <= horizon[:, None]
+    complete = horizon > 0
+    complete &= np.isfinite(np.column_stack([_col(df, k, np.nan) for k in REQUIRED_FIELDS])).all(axis=1)
+    for p, b in blocks.items():
+        complete &= (np.isfinite(b) | ~live).all(axis=1)
+        blocks[p] = np.where(live, b, 0.0)
+    noiat = blocks["NOIAT_"]
+    other_cf = blocks["Depreciation_"] - blocks["CapEx_"] - blocks["Inc_NWC_"]
+    last = np.maximum(horizon, 1)[:, None] - 1
+    ebitda_last = np.take_along_axis(_block(df, "EBITDA_", n_years), last, axis=1)[:, 0]
+    if needs_ebitda(convention):
+        complete &= np.isfinite(ebitda_last)
+    return {
+        "wacc": _col(df, "WACC") / 100.0,
+        "tgr": _col(df, "TGR") / 100.0,
+        "opening_cash": _col(df, "Opening Cash"),
+        "other_nonop": _col(df, "Other Non-Op Assets"),
+        "debt": _col(df, "Debt"),
+        "dlom_pct": _col(df, "DLOM") / 100.0,
+        "money_inf": _col(df, "Money Infusion"),
+        "noiat": noiat,
+        "depreciation": blocks["Depreciation_"],
+        "capex": blocks["CapEx_"],
+        "inc_nwc": blocks["Inc_NWC_"],
+        "other_cf": other_cf,
+        "fcf": noiat + other_cf,
+        "periods": periods,
+        "horizon": horizon,
+        "complete": complete,
+        "ebitda_last": ebitda_last,
+        "exit_multiple": np.full(len(df), float(convention.exit_multiple)),
+        "convention": convention,
+    }
+
+def batch_discount_factors(wacc: np.ndarray, periods: np.ndarray,
+                           discounting: str = "end") -> Tuple[np.ndarray, np.ndarray]:
+    # (cash-flow, period-end) factors; rows sharing a (wacc, periods) profile share one table lookup.
+    # Profiles are grouped by hash (np.unique(axis=0) sorts every row and dominated scenario grids).
+    key = pd.DataFrame(np.column_stack([wacc, periods]))
+    inverse = key.groupby(list(key.columns), sort=False, dropna=False).ngroup().to_numpy()
+    profiles = key.to_numpy()[np.unique(inverse, return_index=True)[1]]
+    cash = np.full((len(profiles), periods.shape[1]), np.nan)
+    end = cash.copy()
+    for k, prof in enumerate(profiles):
+        if np.isfinite(prof).all() and prof[0] > -1.0:
+            factors, _, end_powers = discount_table("float", DEFAULT_DECIMAL_PREC, float(prof[0]),
+                                                    tuple(prof[1:].tolist()), discounting)
+            cash[k], end[k] = factors, 1.0 / np.array(end_powers)
+    return cash[inverse], end[inverse]
+
+def rate_discount_factors(wacc: np.ndarray, periods: np.ndarray,
+                          discounting: str = "end") -> Tuple[np.ndarray, np.ndarray]:
+    # (cash-flow, period-end) factors as one broadcast power; for scenario / solver rates, which are
+    # continuous and would only churn the shared table (batch_discount_factors is for the inputs' own rates)
+    cash_t, end_t = discount_times(periods, discounting)
+    base = (1.0 + wacc)[..., None]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        return base ** -cash_t, base ** -end_t
+
+def batch_values(x: Dict[str, Any], wacc: np.ndarray = None, tgr: np.ndarray = None,
+                 noiat_scale: np.ndarray = None,
+                 dfac: Tuple[np.ndarray, np.ndarray] = None) -> Dict[str, np.ndarray]:
+    # EV / equity for every row; any of wacc, tgr, noiat_scale may override the inputs
+    convention = x["convention"]
+    wacc = x["wacc"] if wacc is None else wacc
+    tgr = x["tgr"] if tgr is None else tgr
+    fcf = x["fcf"] if noiat_scale is None else x["noiat"] * noiat_scale[:, None] + x["other_cf"]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if dfac is None:
+            # the inputs' own rates come from the shared table, overridden rates are computed directly
+            factors = batch_discount_factors if wacc is x["wacc"] else rate_discount_factors
+            dfac = factors(wacc, x["periods"], convention.discounting)
+        cash, end = dfac
+        pv_discrete = (fcf * cash).sum(axis=1)
+        last = np.maximum(x["horizon"], 1)[:, None] - 1
+        fcf_last = np.take_along_axis(fcf, last, axis=1)[:, 0]
+        valid = x["complete"].copy()
+        if convention.terminal == "gordon":
+            valid &= wacc != tgr
+        tv = np.where(valid, terminal_value(fcf_last, wacc, tgr, convention, ebitda_last=x["ebitda_last"],
+                                                 multiple=x["exit_multiple"]), np.nan)
+        pv_terminal = tv * np.take_along_axis(terminal_discount(cash, end, convention), last, axis=1)[:, 0]
+    enterprise_value = pv_discrete + pv_terminal
+    return {
+        "pv_discrete": pv_discrete, "pv_terminal": pv_terminal,
+        "enterprise_value": enterprise_value,
+        "equity_post_money": ev_to_equity(x, enterprise_value),
+    }
+
+def ev_to_equity(x: Dict[str, np.ndarray], enterprise_value: np.ndarray) -> np.ndarray:
+    equity_before_dlom = enterprise_value + x["opening_cash"] + x["other_nonop"] - x["debt"]
+    return equity_before_dlom * (1.0 - x["dlom_pct"]) + x["money_inf"]
+
+def equity_to_ev(x: Dict[str, np.ndarray], equity_post_money: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        equity_before_dlom = (equity_post_money - x["money_inf"]) / (1.0 - x["dlom_pct"])
+    return equity_before_dlom - x["opening_cash"] - x["other_nonop"] + x["debt"]
+
+def company_names(df: pd.DataFrame) -> np.ndarray:
+    if "Company Name" in df.columns:
+        company = df["Company Name"].fillna("").astype(str).str.strip().to_numpy()
+    else:
+        company = np.array([""] * len(df), dtype=object)
+    return np.where(company == "", [f"Company_row_{i}" for i in range(len(df))], company)
+
+def compute_batch(df: pd.DataFrame, n_years: int,
+                  convention: Convention = DEFAULT_CONVENTION) -> pd.DataFrame:
+    x = batch_inputs(df, n_years, convention)
+    v = batch_values(x, dfac=batch_discount_factors(x["wacc"], x["periods"], convention.discounting))
+    out = pd.DataFrame({
+        "company": company_names(df),
+        "wacc": x["wacc"], "tgr": x["tgr"], "years": x["horizon"],
+        "pv_discrete": v["pv_discrete"], "pv_terminal": v["pv_terminal"],
+        "enterprise_value": v["enterprise_value"],
+        "equity_post_money": v["equity_post_money"],
+    }, index=df.index)
+    out["valid"] = np.isfinite(out[["pv_discrete","pv_terminal","equity_post_money"]].to_numpy()).all(axis=1)
+    return out
+
+# =========================
+# 🌪️ Driver scenarios & tornado (batched)
+# =========================
+# driver → (label, kind, axis unit). Grid axes are steps from each row's own base:
+#   level: base + step (rate in "pp", multiple in "x" turns), scale: × (1 + step in "%"),
+#   growth: extra yearly growth compounding from year 2 (step in "pp")
+DRIVERS = {
+    "wacc": ("WACC", "level", "pp"),
+    "tgr": ("Terminal growth", "level", "pp"),
+    "exit_multiple": ("Exit multiple", "level", "x"),
+    "dlom_pct": ("DLOM", "level", "pp"),
+    "noiat": ("NOIAT", "scale", "%"),
+    "depreciation": ("Depreciation", "scale", "%"),
+    "capex": ("CapEx", "scale", "%"),
+    "inc_nwc": ("Incremental NWC", "scale", "%"),
+    "noiat_growth": ("NOIAT growth", "growth", "pp"),
+}
+DRIVER_STEP_RANGES = {"pp": (-3.0, 3.0), "x": (-3.0, 3.0), "%": (-20.0, 20.0)}   # default axis, in units
+GRID_METRICS = {
+    "enterprise_value": "Enterprise Value",
+    "equity_post_money": "Equity Value (Post-Money)",
+}
+TORNADO_DRIVERS = ["wacc", "tgr", "exit_multiple", "noiat", "depreciation", "capex", "inc_nwc"]
+TORNADO_SHOCK = 0.10   # each driver at -10% / +10% of its own base value
+
+def repeat_rows(x: Dict[str, Any], k: int) -> Dict[str, Any]:
+    # every row repeated k times in place: row r, scenario s sits at r * k + s
+    n = len(x["wacc"])
+    return {key: np.repeat(v, k, axis=0) if isinstance(v, np.ndarray) and v.shape[:1] == (n,) else v
+            for key, v in x.items()}
+
+def scenario_values(x: Dict[str, Any], overrides: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    # batch_values with any DRIVERS overridden per row (level: new value, scale: multiplier)
+    scale = lambda key: np.asarray(overrides.get(key, 1.0), dtype=float).reshape(-1, 1)
+    noiat = x["noiat"] * scale("noiat")
+    if "noiat_growth" in overrides:
+        noiat = noiat * (1.0 + scale("noiat_growth")) ** np.arange(noiat.shape[1])[None, :]
+    other_cf = x["depreciation"] * scale("depreciation") - x["capex"] * scale("capex") - x["inc_nwc"] * scale("inc_nwc")
+    y = {**x, "noiat": noiat, "other_cf": other_cf, "fcf": noiat + other_cf,
+         "exit_multiple": overrides.get("exit_multiple", x["exit_multiple"]),
+         "dlom_pct": overrides.get("dlom_pct", x["dlom_pct"])}
+    return batch_values(y, wacc=overrides.get("wacc"), tgr=overrides.get("tgr"))
+
+def active_drivers(convention: Convention = DEFAULT_CONVENTION, keys: List[str] = None) -> List[str]:
+    # the growth rate only matters under Gordon, the multiple only under an exit multiple
+    skip = "exit_multiple" if convention.terminal == "gordon" else "tgr"
+    return [k for k in (list(DRIVERS) if keys is None else keys) if k != skip]
+
+def tornado(df: pd.DataFrame, n_years: int, convention: Convention = DEFAULT_CONVENTION,
+            shock: float = TORNADO_SHOCK) -> Dict[str, Any]:
+    # EV with each driver at (1 - shock) and (1 + shock) of its base, every row and driver in
+    # one batch_values call over rows × 2·drivers scenarios
+    x = batch_inputs(df, n_years, convention)
+    drivers = active_drivers(convention, TORNADO_DRIVERS)
+    n, k = len(df), 2 * len(drivers)
+    factor = np.ones((k, len(drivers)))
+    factor[np.arange(k), np.repeat(np.arange(len(drivers)), 2)] = np.tile([1.0 - shock, 1.0 + shock], len(drivers))
+    factor = np.tile(factor, (n, 1))
+    xr = repeat_rows(x, k)
+    overrides = {key: xr[key] * factor[:, d] if DRIVERS[key][1] == "level" else factor[:, d]
+                 for d, key in enumerate(drivers)}
+    ev = scenario_values(xr, overrides)["enterprise_value"].reshape(n, len(drivers), 2)
+    return {
+        "drivers": drivers,
+        "labels": [DRIVERS[key][0] for key in drivers],
+        "shock": shock,
+        "base": batch_values(x)["enterprise_value"],
+        "low": ev[:, :, 0],    # driver at (1 - shock)
+        "high": ev[:, :, 1],   # driver at (1 + shock)
+    }
+
+class GridSpec(NamedTuple):
+    row_driver: str
+    col_driver: str
+    row_steps: Tuple[float, ...]   # axis steps in the driver's unit (see DRIVERS)
+    col_steps: Tuple[float, ...]
+    metric: str = "enterprise_value"
+
+def grid_steps(start: float, stop: float, points: int) -> Tuple[float, ...]:
+    return tuple(np.round(np.linspace(start, stop, max(int(points), 1)), 6).tolist())
+
+def driver_axis(x: Dict[str, Any], driver: str, steps: Tuple[float, ...]) -> np.ndarray:
+    # (rows, k) override values for DRIVERS[driver] at the given steps from each row's base
+    _, kind, unit = DRIVERS[driver]
+    step = np.asarray(steps, dtype=float)[None, :] / (1.0 if unit == "x" else 100.0)
+    if kind == "level":
+        return x[driver][:, None] + step
+    if kind == "scale":
+        return np.broadcast_to(1.0 + step, (len(x["wacc"]), step.shape[1]))
+    return np.broadcast_to(step, (len(x["wacc"]), step.shape[1]))
+
+def axis_labels(driver: str, values: np.ndarray) -> List[str]:
+    _, kind, unit = DRIVERS[driver]
+    if kind == "scale":
+        return [f"{v - 1.0:+.0%}" for v in values]
+    if kind == "growth":
+        return [f"{v:+.2%}" for v in values]
+    return [f"{v:.1f}x" for v in values] if unit == "x" else [f"{v:.2%}" for v in values]
+
+def driver_grids(df: pd.DataFrame, n_years: int, specs: List[GridSpec],
+                 convention: Convention = DEFAULT_CONVENTION) -> List[Dict[str, np.ndarray]]:
+    # every spec for every row in one scenario_values call: per row, the A·B cells of each grid
+    # sit side by side; drivers a grid does not move stay at the row's base
+    if not specs:
+        return []
+    x = batch_inputs(df, n_years, convention)
+    n = len(df)
+    axes, sizes = [], []
+    for spec in specs:
+        if spec.row_driver == spec.col_driver:
+            raise ValueError(f"A sensitivity grid needs two different drivers (got {spec.row_driver} twice).")
+        a, b = driver_axis(x, spec.row_driver, spec.row_steps), driver_axis(x, spec.col_driver, spec.col_steps)
+        axes.append((a, b))
+        sizes.append(a.shape[1] * b.shape[1])
+    total = sum(sizes)
+    neutral = {"level": None, "scale": 1.0, "growth": 0.0}
+    keys = sorted({k for spec in specs for k in (spec.row_driver, spec.col_driver)})
+    overrides = {}
+    for key in keys:
+        base = neutral[DRIVERS[key][1]]
+        overrides[key] = np.tile(x[key][:, None], (1, total)) if base is None else np.full((n, total), base)
+    start = 0
+    for spec, (a, b), size in zip(specs, axes, sizes):
+        cells = slice(start, start + size)
+        overrides[spec.row_driver][:, cells] = np.repeat(a, b.shape[1], axis=1)
+        overrides[spec.col_driver][:, cells] = np.tile(b, (1, a.shape[1]))
+        start += size
+    values = scenario_values(repeat_rows(x, total), {k: v.reshape(-1) for k, v in overrides.items()})
+    metric = {m: values[m].reshape(n, total) for m in GRID_METRICS}
+    if convention.terminal == "gordon":
+        # Gordon is undefined once WACC reaches the growth rate
+        rate = lambda key: overrides[key] if key in overrides else x[key][:, None]
+        valid = np.broadcast_to(rate("wacc") > rate("tgr"), (n, total))
+        metric = {m: np.where(valid, v, np.nan) for m, v in metric.items()}
+
+    grids, start = [], 0
+    for spec, (a, b), size in zip(specs, axes, sizes):
+        grid = metric[spec.metric][:, start:start + size].reshape(n, a.shape[1], b.shape[1])
+        grids.append({"values": grid, "row_axis": a, "col_axis": b})
+        start += size
+    return grids
+
+def driver_grid_tables(df: pd.DataFrame, n_years: int, specs: List[GridSpec],
+                       convention: Convention = DEFAULT_CONVENTION,
+                       number_format: NumberFormat = DEFAULT_FORMAT) -> List[List[Dict[str, Any]]]:
+    # per row: one table per spec (labels, formatted cells, raw values and the base cell)
+    grids = driver_grids(df, n_years, specs, convention)
+    formatted = [format_array(g["values"], number_format, blank="n/a") for g in grids]
+    tables = []
+    for r in range(len(df)):
+        row_tables = []
+        for spec, g, cells in zip(specs, grids, formatted):
+            row_labels = axis_labels(spec.row_driver, g["row_axis"][r])
+            col_labels = axis_labels(spec.col_driver, g["col_axis"][r])
+            zero_r = [k for k, v in enumerate(spec.row_steps) if v == 0]
+            zero_c = [k for k, v in enumerate(spec.col_steps) if v == 0]
+            row_tables.append({
+                "title": f"{DRIVERS[spec.row_driver][0]} × {DRIVERS[spec.col_driver][0]}",
+                "metric": GRID_METRICS[spec.metric],
+                "row_title": DRIVERS[spec.row_driver][0], "col_title": DRIVERS[spec.col_driver][0],
+                "col_labels": col_labels,
+                "rows": [[lab, cells[r, k].tolist()] for k, lab in enumerate(row_labels)],
+                "values": g["values"][r].tolist(),
+                "base": (zero_r[0], zero_c[0]) if zero_r and zero_c else None,
+            })
+        tables.append(row_tables)
+    return tables
+
+# =========================
+# 🏁 Exit-multiple grid & implied-growth cross-check (batched)
+# =========================
+def _terminal_terms(x: Dict[str, Any]) -> Tuple[np.ndarray, ...]:
+    # final-year FCF, exit basis and the factor rolling a cash-flow-time value to the period end
+    convention = x["convention"]
+    cash, end = batch_discount_factors(x["wacc"], x["periods"], convention.discounting)
+    last = np.maximum(x["horizon"], 1)[:, None] - 1
+    pick = lambda a: np.take_along_axis(a, last, axis=1)[:, 0]
+    fcf_last = pick(x["fcf"])
+    basis = x["ebitda_last"] if convention.exit_basis == "ebitda" else fcf_last
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return fcf_last, basis, pick(end) / pick(cash)
+
+def implied_multiple(x: Dict[str, Any]) -> np.ndarray:
+    # exit multiple equivalent to the Gordon terminal value at each row's WACC / TGR
+    fcf_last, basis, roll = _terminal_terms(x)
+    w, g = x["wacc"], x["tgr"]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        tv_end = fcf_last * (1.0 + g) / (w - g) / roll
+        return np.where(x["complete"] & (w > g), tv_end / basis, np.nan)
+
+def implied_growth(x: Dict[str, Any], multiples: np.ndarray) -> np.ndarray:
+    # (rows, M) perpetual growth at which Gordon reproduces each exit multiple, at the base WACC
+    fcf_last, basis, roll = _terminal_terms(x)
+    w = x["wacc"][:, None]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        tv_cash = basis[:, None] * multiples * roll[:, None]
+        growth = (tv_cash * w - fcf_last[:, None]) / (tv_cash + fcf_last[:, None])
+    return np.where(x["complete"][:, None], growth, np.nan)
+
+def exit_grid(x: Dict[str, Any], multiples: np.ndarray, wacc_axis: np.ndarray) -> np.ndarray:
+    # EV for rows × multiples × WACC: (rows, M) × (rows, W) -> (rows, M, W); one set of
+    # discount factors per (row, WACC), shared by every multiple
+    _, basis, _ = _terminal_terms(x)
+    rows = len(wacc_axis)
+    cash, end = rate_discount_factors(wacc_axis, x["periods"][:, None, :], x["convention"].discounting)
+    last = np.maximum(x["horizon"], 1) - 1
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        pv_discrete = (x["fcf"][:, None, :] * cash).sum(axis=-1)
+        end_last = end[np.arange(rows), :, last]
+        ev = pv_discrete[:, None, :] + basis[:, None, None] * multiples[:, :, None] * end_last[:, None, :]
+    w = wacc_axis[:, None, :]
+    return np.where(x["complete"][:, None, None] & (w > 0) & (multiples[:, :, None] > 0), ev, np.nan)
+
+def exit_multiple_tables(df: pd.DataFrame, n_years: int, convention: Convention = DEFAULT_CONVENTION,
+                         number_format: NumberFormat = DEFAULT_FORMAT) -> List[Dict[str, Any]]:
+    # per row: WACC × multiple EV grid and the implied-growth cross-check, all rows at once.
+    # Centred on the chosen exit multiple, or on the Gordon-implied one in Gordon mode.
+    x = batch_inputs(df, n_years, convention)
+    gordon_multiple = implied_multiple(x)
+    centre = (np.full(len(df), convention.exit_multiple) if convention.terminal == "exit"
+              else np.round(gordon_multiple * 2) / 2)
+    multiples = centre[:, None] + EXIT_GRID_STEPS[None, :]
+    wacc_axis = x["wacc"][:, None] + WACC_GRID_STEPS[None, :]
+    grid_values = exit_grid(x, multiples, wacc_axis)
+    grid = format_array(grid_values, number_format, blank="n/a")
+    ev_base = format_array(exit_grid(x, multiples, x["wacc"][:, None])[:, :, 0], number_format, blank="n/a")
+    growth = implied_growth(x, multiples)
+    basis = EXIT_BASES[convention.exit_basis]
+
+    tables = []
+    for r in range(len(df)):
+        ok = np.isfinite(multiples[r]) & (multiples[r] > 0)
+        labels = [f"{m:.1f}x" for m in multiples[r]]
+        tables.append({
+            "basis": basis,
+            "has_data": bool(ok.any() and x["complete"][r]),
+            "wacc_cols": [f"{w:.2%}" for w in wacc_axis[r]],
+            "rows": [[labels[k], grid[r, k].tolist()] for k in range(len(labels)) if ok[k]],
+            "values": [grid_values[r, k].tolist() for k in range(len(labels)) if ok[k]],
+            "crosscheck": [[labels[k], f"{growth[r, k]:.2%}" if np.isfinite(growth[r, k]) else "n/a", ev_base[r, k]]
+                           for k in range(len(labels)) if ok[k]],
+            "gordon_multiple": f"{gordon_multiple[r]:.2f}x" if np.isfinite(gordon_multiple[r]) else "n/a",
+        })
+    return tables
@@ -0,0 +1,90 @@
+# formatting.py — Bulk number formatting for every table in the report
+# - Formats whole arrays at once (DCF rows, forecast, statements, sensitivity, portfolio)
+# - International (1,234,567.89), Indian lakh/crore (12,34,567.89) or no grouping
+# - Configurable decimals and minus / (parentheses) negatives
+# - Format specs are compiled once per NumberFormat and reused
+
+from decimal import Decimal
+from functools import lru_cache
+from typing import List, Any, Callable, NamedTuple
+
+import numpy as np
+
+GROUPINGS = {
+    "international": "International (1,234,567.89)",
+    "indian": "Indian lakh/crore (12,34,567.89)",
+    "none": "No grouping (1234567.89)",
+}
+NEGATIVE_STYLES = {
+    "minus": "Minus sign (-1,234.00)",
+    "parens": "Parentheses ((1,234.00))",
+}
+
+class NumberFormat(NamedTuple):
+    decimals: int = 2
+    grouping: str = "international"
+    negative: str = "minus"
+
+DEFAULT_FORMAT = NumberFormat()
+
+def _indian_group(s: str) -> str:
+    # s is an ungrouped, unsigned fixed-point string: "1234567.89" -> "12,34,567.89"
+    head, dot, frac = s.partition(".")
+    if len(head) <= 3:
+        return s
+    rest = head[:-3]
+    lead = len(rest) % 2
+    parts = [rest[:lead]] if lead else []
+    parts += [rest[i:i+2] for i in range(lead, len(rest), 2)]
+    return ",".join(parts) + "," + head[-3:] + dot + frac
+
+@lru_cache(maxsize=64)
+def compile_format(nf: NumberFormat) -> Callable[[float], str]:
+    spec = f",.{nf.decimals}f" if nf.grouping == "international" else f".{nf.decimals}f"
+    indian = nf.grouping == "indian"
+    parens = nf.negative == "parens"
+    if not indian and not parens:
+        return lambda v: format(v, spec)
+
+    def fmt(v: float) -> str:
+        s = format(abs(v), spec)
+        if indian:
+            s = _indian_group(s)
+        if v < 0:
+            s = f"({s})" if parens else "-" + s
+        return s
+    return fmt
+
+def _scalar_float(x) -> float:
+    try:
+        return float(x)
+    except Exception:
+        pass
+    try:
+        return float(Decimal(str(x)))
+    except Exception:
+        return np.nan
+
+def to_float_array(values) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        obj = np.asarray(values, dtype=object)
+        return np.array([_scalar_float(x) for x in obj.ravel().tolist()], dtype=float).reshape(obj.shape)
+
+def format_array(values, nf: NumberFormat = DEFAULT_FORMAT, blank: str = "") -> np.ndarray:
+    arr = to_float_array(values)
+    out = np.full(arr.shape, blank, dtype=object)
+    mask = np.isfinite(arr)
+    fmt = compile_format(nf)
+    out[mask] = [fmt(v) for v in arr[mask].tolist()]
+    return out
+
+def format_list(values, nf: NumberFormat = DEFAULT_FORMAT, blank: str = "") -> List[str]:
+    return format_array(values, nf, blank).tolist()
+
+def fmt_num(x, d=2, nf: NumberFormat = DEFAULT_FORMAT) -> str:
+    v = _scalar_float(x) if x is not None else np.nan
+    if not np.isfinite(v):
+        return ""
+    return compile_format(nf._replace(decimals=d))(v)
@@ -0,0 +1,200 @@
+# ingest.py — Input ingestion: Excel workbooks and columnar files (Parquet / Arrow / CSV)
+# - The workbook is loaded once and every sheet parsed from it (processes for big workbooks)
+# - Sheets are classified by name first, then by their column schema
+# - Core inputs / projections / statement history are joined on the company key into the
+#   single row model that compute_valuation and the statement tables consume
+# - Comps / deals sheets are handed back separately for the market-multiples check
+# - Parquet / Arrow IPC / CSV use the same column conventions and skip Excel parsing;
+#   Arrow files on disk are memory-mapped
+# - Every loaded frame goes through schema.coerce_frame once; bad cells come back in "issues"
+
+import io, os, re, hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import schema
+
+COMPANY_KEY = "Company Name"
+PROCESS_POOL_MIN_BYTES = 5_000_000   # below this, process start-up costs more than it saves
+MAX_WORKERS = 4
+
+# role → sheet-name pattern (first match wins)
+SHEET_NAME_ROLES = [
+    ("comps", re.compile(r"comp|peer|trading", re.I)),
+    ("deals", re.compile(r"deal|transaction|precedent", re.I)),
+    ("core", re.compile(r"core|input|assumption|summary", re.I)),
+    ("projections", re.compile(r"projection|forecast|fcff|dcf", re.I)),
+    ("statements", re.compile(r"balance|income|p\s*&\s*l|profit|cash\s*flow|\bbs\b|\bis\b|\bcf\b|history|statement", re.I)),
+]
+PROJECTION_RE = re.compile(r"^(NOIAT|Depreciation|CapEx|Inc_NWC)_\d+$")
+STATEMENT_RE = re.compile(r"_FY\d+$")
+CORE_MARKERS = {"WACC", "TGR", "DLOM", "Debt", "Opening Cash"}
+
+INPUTS_PATH = os.environ.get("VALUATION_INPUTS_PATH", "")
+EXCEL_EXTS = (".xlsx", ".xls")
+PARQUET_EXTS = (".parquet", ".pq")
+ARROW_EXTS = (".arrow", ".feather", ".ipc")
+CSV_EXTS = (".csv",)
+INPUT_TYPES = [e.lstrip(".") for e in EXCEL_EXTS + PARQUET_EXTS + ARROW_EXTS + CSV_EXTS]
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+# =========================
+# 📑 Sheet parsing
+# =========================
+# openpyxl holds the GIL and every pd.read_excel call re-loads the whole workbook
+# (zip, shared strings, styles), so one thread per sheet was slower than a loop.
+# The workbook is opened once (openpyxl read-only) and every sheet parsed from that handle;
+# big workbooks split their sheets over processes, one workbook load per process.
+def _parse_once(data: bytes, names: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    with pd.ExcelFile(io.BytesIO(data)) as xf:
+        names = names or [str(s) for s in xf.sheet_names]
+        return {name: xf.parse(name) for name in names}
+
+def sheet_names(data: bytes) -> List[str]:
+    with pd.ExcelFile(io.BytesIO(data)) as xf:
+        return [str(s) for s in xf.sheet_names]
+
+def parse_sheets(data: bytes, names: Optional[List[str]] = None, use_processes: Optional[bool] = None) -> Dict[str, pd.DataFrame]:
+    if use_processes is None:
+        use_processes = len(data) >= PROCESS_POOL_MIN_BYTES and (os.cpu_count() or 1) > 1
+    if not use_processes:
+        return _parse_once(data, names)
+    names = names or sheet_names(data)
+    workers = min(MAX_WORKERS, len(names), os.cpu_count() or 1)
+    if workers < 2:
+        return _parse_once(data, names)
+    chunks = [names[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = {}
+        for part in pool.map(_parse_once, [data] * workers, chunks):
+            parsed.update(part)
+    return {name: parsed[name] for name in names}
+
+# =========================
+# 🏷️ Sheet classification
+# =========================
+def classify_sheet(name: str, df: pd.DataFrame) -> str:
+    for role, pattern in SHEET_NAME_ROLES:
+        if pattern.search(name):
+            return role
+    cols = {str(c) for c in df.columns}
+    if cols & CORE_MARKERS:
+        return "core"
+    if any(PROJECTION_RE.match(c) for c in cols):
+        return "projections"
+    if any(STATEMENT_RE.search(c) for c in cols):
+        return "statements"
+    lower = {c.lower() for c in cols}
+    if "deal" in lower or "deal value" in lower:
+        return "deals"
+    if "sector" in lower and ("ev" in lower or "enterprise value" in lower):
+        return "comps"
+    return "other"
+
+def _company_key(s: pd.Series) -> pd.Series:
+    return s.fillna("").astype(str).str.strip().str.casefold()
+
+def _join_keys(df: pd.DataFrame) -> pd.DataFrame:
+    # a company listed twice is matched occurrence by occurrence (1st with 1st, 2nd with 2nd)
+    key = _company_key(df[COMPANY_KEY])
+    return df.assign(__key=key, __occ=key.groupby(key).cumcount())
+
+def join_on_company(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    # first part is the base; later parts only add columns the base does not have yet
+    base = parts[0].copy()
+    if len(parts) == 1:
+        return base
+    base = _join_keys(base)
+    for part in parts[1:]:
+        if COMPANY_KEY not in part.columns:
+            continue
+        new_cols = [c for c in part.columns if c not in base.columns and c != COMPANY_KEY]
+        if not new_cols:
+            continue
+        right = _join_keys(part[[COMPANY_KEY] + new_cols]).drop(columns=[COMPANY_KEY])
+        base = base.merge(right, on=["__key", "__occ"], how="left")
+    return base.drop(columns=["__key", "__occ"])
+
+def load_workbook(data: bytes, use_processes: Optional[bool] = None) -> Dict[str, Any]:
+    sheets = parse_sheets(data, use_processes=use_processes)
+    names = list(sheets)
+    roles = {name: classify_sheet(name, df) for name, df in sheets.items()}
+
+    order = ["core", "projections", "statements"]
+    row_parts = [sheets[n] for role in order for n in names if roles[n] == role and COMPANY_KEY in sheets[n].columns]
+    if not row_parts:
+        # single-sheet (legacy) layout: the first sheet holds everything
+        row_parts = [sheets[names[0]]]
+        roles[names[0]] = "core"
+    first = lambda role: next((sheets[n] for n in names if roles[n] == role), None)
+    return {
+        "frame": join_on_company(row_parts),
+        "roles": roles,
+        "comps": first("comps"),
+        "deals": first("deals"),
+    }
+
+# =========================
+# 🧱 Columnar inputs (Parquet / Arrow IPC / CSV)
+# =========================
+def _single_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    return {"frame": df, "roles": {"inputs": "core"}, "comps": None, "deals": None}
+
+def _typed(result: Dict[str, Any]) -> Dict[str, Any]:
+    result["frame"], result["issues"] = schema.coerce_frame(result["frame"])
+    return result
+
+def _read_arrow(source) -> pd.DataFrame:
+    # IPC file format first, stream format as fallback (both written by pyarrow / feather v2)
+    try:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all().to_pandas()
+
+def _read_inputs(name: str, data: bytes) -> Dict[str, Any]:
+    ext = os.path.splitext(name)[1].lower()
+    if ext in PARQUET_EXTS:
+        return _single_frame(pd.read_parquet(io.BytesIO(data)))
+    if ext in ARROW_EXTS:
+        return _single_frame(_read_arrow(pa.BufferReader(data)))
+    if ext in CSV_EXTS:
+        return _single_frame(pd.read_csv(io.BytesIO(data)))
+    return load_workbook(data)
+
+def load_inputs(name: str, data: bytes) -> Dict[str, Any]:
+    return _typed(_read_inputs(name, data))
+
+def load_local_inputs(path: str) -> Optional[Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return None
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ARROW_EXTS:
+        with pa.memory_map(path, "r") as source:
+            return _typed(_single_frame(_read_arrow(source)))
+    if ext in PARQUET_EXTS:
+        return _typed(_single_frame(pq.read_table(path, memory_map=True).to_pandas()))
+    with open(path, "rb") as f:
+        return load_inputs(path, f.read())
+
+def _export_column(s: pd.Series) -> pd.Series:
+    # Excel leaves mixed object columns; keep them numeric when every value parses, text otherwise
+    if s.dtype != object:
+        return s
+    num = pd.to_numeric(s, errors="coerce")
+    if num.notna().sum() == s.notna().sum():
+        return num
+    return s.where(s.isna(), s.astype(str))
+
+def to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    out = df.apply(_export_column)
+    out.columns = [str(c) for c in out.columns]
+    buf = io.BytesIO()
+    out.to_parquet(buf, index=False)
+    return buf.getvalue()
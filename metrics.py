@@ -0,0 +1,202 @@
+# metrics.py — Process-wide metrics for the valuation pipeline, Prometheus text format
+# - Counters, labelled histograms and scrape-time callbacks (cache hit / miss figures)
+# - One registry per process: Streamlit reruns and sessions share it, so totals accumulate
+# - Exposed through a local HTTP endpoint (VALUATION_METRICS_PORT → http://host:port/metrics)
+#   and / or a textfile for node_exporter's textfile collector (VALUATION_METRICS_TEXTFILE)
+
+import os, time, threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Tuple, Callable, Iterator
+
+METRICS_PORT = int(os.environ.get("VALUATION_METRICS_PORT", "0") or 0)
+METRICS_TEXTFILE = os.environ.get("VALUATION_METRICS_TEXTFILE", "")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _labels(key: LabelKey, extra: Dict[str, str] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+def _num(v: float) -> str:
+    return "+Inf" if v == float("inf") else repr(float(v))
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name, self.help = name, help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return ([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+                + [f"{self.name}{_labels(k)} {_num(v)}" for k, v in items])
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[LabelKey, List[float]] = {}   # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(key, {'le': _num(bound)})} {_num(count)}")
+            lines.append(f"{self.name}_sum{_labels(key)} {_num(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(key)} {_num(series[-1])}")
+        return lines
+
+class Callback:
+    # values read at scrape time: fn() → [(labels, value)]
+    def __init__(self, name: str, help_text: str, kind: str, fn: Callable[[], List[Tuple[Dict[str, str], float]]]):
+        self.name, self.help, self.kind, self.fn = name, help_text, kind, fn
+
+    def expose(self) -> List[str]:
+        try:
+            samples = self.fn()
+        except Exception:
+            samples = []
+        return ([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+                + [f"{self.name}{_labels(tuple(sorted(lab.items())))} {_num(v)}" for lab, v in samples])
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get(name, lambda: Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(name, lambda: Histogram(name, help_text, buckets))
+
+    def callback(self, name: str, help_text: str, kind: str, fn) -> Callback:
+        # re-registering a name replaces its function
+        with self._lock:
+            self._metrics[name] = Callback(name, help_text, kind, fn)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.expose()) + "\n"
+
+REGISTRY = Registry()
+
+# =========================
+# 📈 Pipeline metrics
+# =========================
+STAGE_SECONDS = REGISTRY.histogram("valuation_stage_seconds", "Latency of each pipeline stage.")
+ROWS_PROCESSED = REGISTRY.counter("valuation_rows_processed_total", "Rows that produced a report.")
+PDFS_GENERATED = REGISTRY.counter("valuation_pdfs_generated_total", "PDF reports generated.")
+FAILURES = REGISTRY.counter("valuation_failures_total", "Failures by pipeline stage.")
+AI_SECONDS = REGISTRY.histogram("valuation_ai_call_seconds", "Latency of AI completion calls.")
+
+_caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+def register_cache(name: str, stats: Callable[[], Dict[str, float]]) -> None:
+    # stats() returns at least {"hits", "misses"}; read at scrape time
+    _caches[name] = stats
+
+def _cache_samples(field: str) -> List[Tuple[Dict[str, str], float]]:
+    return [({"cache": name}, float(stats()[field])) for name, stats in list(_caches.items())]
+
+def _cache_ratio() -> List[Tuple[Dict[str, str], float]]:
+    out = []
+    for name, stats in list(_caches.items()):
+        s = stats()
+        if s["hits"] + s["misses"]:
+            out.append(({"cache": name}, s["hits"] / (s["hits"] + s["misses"])))
+    return out
+
+REGISTRY.callback("valuation_cache_hits_total", "Cache hits by cache.", "counter", lambda: _cache_samples("hits"))
+REGISTRY.callback("valuation_cache_misses_total", "Cache misses by cache.", "counter", lambda: _cache_samples("misses"))
+REGISTRY.callback("valuation_cache_hit_ratio", "Cache hit ratio by cache.", "gauge", _cache_ratio)
+
+def stage(name: str):
+    return STAGE_SECONDS.time(stage=name)
+
+def failure(stage_name: str) -> None:
+    FAILURES.inc(stage=stage_name)
+
+# =========================
+# 📤 Exposition
+# =========================
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+_server_lock = threading.Lock()
+_server = None
+
+def serve(port: int = METRICS_PORT, host: str = "127.0.0.1"):
+    # idempotent: the first call per process starts the endpoint, later calls return it
+    global _server
+    with _server_lock:
+        if _server is None and port:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
+
+_textfile_lock = threading.Lock()
+
+def write_textfile(path: str = METRICS_TEXTFILE) -> None:
+    # atomic replace so the collector never reads a half-written file; Streamlit sessions are
+    # threads of one process, so writers take turns on the shared temp file
+    if not path:
+        return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with _textfile_lock:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(REGISTRY.render())
+        os.replace(tmp, path)
@@ -0,0 +1,122 @@
+# portfolio.py — Portfolio-level view across all workbook rows
+# - Aggregates EV / equity from dcf_engine.compute_batch (no per-company reports needed)
+# - Distribution statistics and rank tables
+# - One-page portfolio summary PDF (same blue theme CSS as the company reports)
+
+import io
+from typing import List, Dict, Any
+
+import pandas as pd
+from jinja2 import Environment
+from xhtml2pdf import pisa
+
+import report_render
+from formatting import NumberFormat, DEFAULT_FORMAT, fmt_num
+
+STAT_QUANTILES = [0.10, 0.25, 0.50, 0.75, 0.90]
+RANK_TOP_N = 10
+
+# =========================
+# 📊 Aggregation
+# =========================
+def distribution_stats(values: pd.Series) -> List[List[Any]]:
+    q = values.quantile(STAT_QUANTILES)
+    return [
+        ["Mean", values.mean()], ["Std. deviation", values.std()],
+        ["Min", values.min()],
+        *[[f"P{int(p*100)}", q[p]] for p in STAT_QUANTILES],
+        ["Max", values.max()],
+    ]
+
+def portfolio_summary(batch: pd.DataFrame, top_n: int = RANK_TOP_N) -> Dict[str, Any]:
+    ok = batch[batch["valid"]]
+    ranked = ok.assign(
+        ev_rank=ok["enterprise_value"].rank(ascending=False, method="min").astype(int),
+        equity_rank=ok["equity_post_money"].rank(ascending=False, method="min").astype(int),
+        ev_share=ok["enterprise_value"] / ok["enterprise_value"].sum() if len(ok) else 0.0,
+    ).sort_values("ev_rank")
+    rank_cols = ["ev_rank","equity_rank","company","enterprise_value","equity_post_money","wacc","tgr","ev_share"]
+    return {
+        "companies": int(len(batch)),
+        "valued": int(len(ok)),
+        "excluded": batch.loc[~batch["valid"], "company"].tolist(),
+        "total_ev": float(ok["enterprise_value"].sum()),
+        "total_equity": float(ok["equity_post_money"].sum()),
+        "ev_stats": distribution_stats(ok["enterprise_value"]),
+        "equity_stats": distribution_stats(ok["equity_post_money"]),
+        "ranking": ranked[rank_cols],
+        "top_ev": ranked.head(top_n)[rank_cols],
+        "bottom_ev": ranked.tail(top_n).iloc[::-1][rank_cols],
+        "top_equity": ranked.sort_values("equity_rank").head(top_n)[rank_cols],
+    }
+
+# =========================
+# 📄 Portfolio summary PDF
+# =========================
+PORTFOLIO_TEMPLATE_HTML = r"""
+<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Portfolio Valuation Summary</title>
+<style>{{ css }}</style>
+</head>
+<body>
+<section class="page">
+  <h1>PORTFOLIO VALUATION SUMMARY</h1>
+  <p class="small">Valuation Date – {{ valuation_date }}. {{ s.valued }} of {{ s.companies }} companies valued{% if s.excluded %}; excluded for incomplete inputs: {{ s.excluded | join(", ") }}{% endif %}.</p>
+  <table class="keytable">
+    <tr><th>Aggregate Enterprise Value</th><td class="num big">{{ num(s.total_ev) }}</td></tr>
+    <tr><th>Aggregate Equity Value (Post-Money)</th><td class="num big">{{ num(s.total_equity) }}</td></tr>
+  </table>
+
+  <h2>Distribution</h2>
+  <table class="small">
+    <thead><tr><th>Statistic</th><th>Enterprise Value</th><th>Equity Value</th></tr></thead>
+    <tbody>
+      {% for ev, eq in zip(s.ev_stats, s.equity_stats) %}
+        <tr><td>{{ ev[0] }}</td><td class="num">{{ num(ev[1]) }}</td><td class="num">{{ num(eq[1]) }}</td></tr>
+      {% endfor %}
+    </tbody>
+  </table>
+
+  {% for title, rank, table in rank_tables %}
+  <h2>{{ title }}</h2>
+  <table class="small">
+    <thead><tr><th>Rank</th><th>Company</th><th>EV</th><th>Equity</th><th>WACC</th><th>TGR</th><th>EV Share</th></tr></thead>
+    <tbody>
+      {% for r in table %}
+        <tr><td>{{ r[rank] }}</td><td>{{ r.company }}</td><td class="num">{{ num(r.enterprise_value) }}</td>
+            <td class="num">{{ num(r.equity_post_money) }}</td><td>{{ r.wacc | pct }}</td><td>{{ r.tgr | pct }}</td>
+            <td>{{ r.ev_share | pct }}</td></tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  {% endfor %}
+</section>
+</body>
+</html>
+"""
+
+_env = Environment()
+_env.filters["pct"] = lambda x: f"{float(x):.2%}"
+_env.globals["zip"] = zip
+_portfolio_template = _env.from_string(PORTFOLIO_TEMPLATE_HTML)
+
+def render_portfolio_pdf(summary: Dict[str, Any], css: str, valuation_date: str,
+                         number_format: NumberFormat = DEFAULT_FORMAT) -> io.BytesIO:
+    rank_tables = [
+        ("Top companies by Enterprise Value", "ev_rank", summary["top_ev"].to_dict("records")),
+        ("Bottom companies by Enterprise Value", "ev_rank", summary["bottom_ev"].to_dict("records")),
+        ("Top companies by Equity Value", "equity_rank", summary["top_equity"].to_dict("records")),
+    ]
+    rendered = _portfolio_template.render(css=css, s=summary, rank_tables=rank_tables,
+                                          valuation_date=valuation_date,
+                                          num=lambda x: fmt_num(x, number_format.decimals, number_format))
+    pdf_bytes = io.BytesIO()
+    with report_render.pdf_context():   # same lock / context as the company reports
+        status = pisa.CreatePDF(io.StringIO(rendered), dest=pdf_bytes)
+    if status.err:
+        raise RuntimeError("PDF generation failed (xhtml2pdf).")
+    pdf_bytes.seek(0)
+    return pdf_bytes
@@ -0,0 +1,120 @@
+# profiling.py — Opt-in per-row profiling of the report pipeline
+# - Enabled by VALUATION_PROFILE_DIR or `streamlit run app.py -- --profile DIR`
+# - Each row gets a deterministic cProfile (.pstats, for snakeviz / pstats) and a sampled
+#   collapsed-stack file (.collapsed, "frame;frame;frame count" as written by py-spy --format raw,
+#   for flamegraph.pl / speedscope)
+# - The sampler runs in a background thread and reads only the profiled thread's stack, so it
+#   also works inside Streamlit's script thread
+# - Hotspots (top functions by own time) are kept per row for the sidebar
+# - PDFs render in the worker pool, where this thread only waits; the worker profiles the render
+#   into worker_profile() and finish() merges it into the row's .pstats / hotspots (the sampled
+#   .collapsed stacks still show only the wait)
+
+import os, re, sys, time, argparse, cProfile, pstats, threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+PROFILE_DIR = os.environ.get("VALUATION_PROFILE_DIR", "")
+SAMPLE_INTERVAL = 0.005   # seconds between stack samples
+TOP_N = 15
+
+def profile_dir(argv: List[str] = None) -> str:
+    # CLI flag wins over the environment; Streamlit passes script args after "--"
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--profile", default=None)
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return args.profile or PROFILE_DIR
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id, self.interval = thread_id, interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+def hotspots(stats: pstats.Stats, n: int = TOP_N) -> List[Dict[str, Any]]:
+    # top functions by own (exclusive) time
+    rows = []
+    for (filename, line, name), (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{name} ({os.path.basename(filename)}:{line})",
+            "calls": ncalls, "own_s": round(tottime, 4), "cumulative_s": round(cumtime, 4),
+        })
+    return sorted(rows, key=lambda r: r["own_s"], reverse=True)[:n]
+
+def _slug(s: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", s).strip("_")[:60] or "row"
+
+class RowProfiler:
+    # one profile per row: row() closes the previous row and opens the next, so the loop body
+    # can `continue` freely; finish() closes the last one. Use as a context manager so an
+    # exception, st.stop() or st.rerun() inside the loop still closes the open row.
+    def __init__(self, out_dir: str, run_id: str, interval: float = SAMPLE_INTERVAL):
+        self.out_dir, self.run_id, self.interval = out_dir, run_id, interval
+        self.results: List[Dict[str, Any]] = []
+        self._current: Optional[Tuple[int, str, str, cProfile.Profile, StackSampler, float]] = None
+        os.makedirs(out_dir, exist_ok=True)
+
+    def __enter__(self) -> "RowProfiler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.finish()
+
+    def row(self, idx: int, company: str) -> None:
+        self.finish()
+        base = os.path.join(self.out_dir, f"{_slug(self.run_id)}_row{idx:04d}_{_slug(company)}")
+        if os.path.exists(base + ".worker.pstats"):
+            os.remove(base + ".worker.pstats")
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), self.interval).start()
+        self._current = (idx, company, base, profiler, sampler, time.perf_counter())
+        profiler.enable()
+
+    def worker_profile(self) -> Optional[str]:
+        # where a worker process dumps its profile of work done for the open row
+        return self._current[2] + ".worker.pstats" if self._current is not None else None
+
+    def finish(self) -> None:
+        if self._current is None:
+            return
+        idx, company, base, profiler, sampler, t0 = self._current
+        profiler.disable()
+        stacks = sampler.stop()
+        seconds = time.perf_counter() - t0
+        self._current = None
+
+        stats = pstats.Stats(profiler)
+        if os.path.exists(base + ".worker.pstats"):
+            stats.add(base + ".worker.pstats")
+        stats.dump_stats(base + ".pstats")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.results.append({
+            "row": idx, "company": company, "seconds": round(seconds, 4),
+            "samples": sum(stacks.values()), "pstats": base + ".pstats", "collapsed": base + ".collapsed",
+            "hotspots": hotspots(stats),
+        })
@@ -0,0 +1,135 @@
+# render_pool.py — Persistent warm process pool for PDF rendering
+# - Workers start once per process (app, Streamlit sessions and batch jobs share one pool) and
+#   warm up in the initializer: template compiled, CSS parsed, reportlab fonts and xhtml2pdf
+#   loaded by rendering a one-line document — the first real report pays none of that
+# - max_tasks_per_child recycles workers so memory growth from long batches stays bounded
+# - Health check: a ping must come back within HEALTH_TIMEOUT, otherwise the pool is rebuilt;
+#   a broken pool (crashed worker) is rebuilt and the task retried once
+# - VALUATION_RENDER_WORKERS=0 renders in the calling process instead
+# - A render can be cProfiled inside the worker (profile_path), so per-row profiles see the PDF work
+
+import os, time, atexit, cProfile, threading, resource, multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, Future, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional
+
+import report_render
+
+RENDER_WORKERS = int(os.environ.get("VALUATION_RENDER_WORKERS", "2"))
+MAX_TASKS_PER_CHILD = int(os.environ.get("VALUATION_RENDER_MAX_TASKS", "50"))
+HEALTH_TIMEOUT = 30.0    # seconds for a ping, including worker start-up and warm-up
+HEALTH_INTERVAL = 60.0   # re-check an idle pool at most this often
+
+# =========================
+# 👷 Worker side
+# =========================
+def _warm() -> None:
+    report_render.warm_up()
+
+def _ping() -> Dict[str, Any]:
+    return {"pid": os.getpid(), "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+def _render_pdf_bytes(ctx: Dict[str, Any], profile_path: Optional[str] = None) -> bytes:
+    # profile_path: cProfile the render here in the worker and dump it there (see profiling.RowProfiler)
+    if profile_path is None:
+        with report_render.render_pdf(ctx) as f:
+            return f.read()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        with report_render.render_pdf(ctx) as f:
+            return f.read()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+
+# =========================
+# 🏊 Pool
+# =========================
+class RenderPool:
+    def __init__(self, workers: int = RENDER_WORKERS, max_tasks_per_child: int = MAX_TASKS_PER_CHILD):
+        self.workers, self.max_tasks_per_child = workers, max_tasks_per_child
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.restarts = 0
+        self.tasks = 0
+
+    def _start(self) -> None:
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=mp.get_context("spawn"), initializer=_warm,
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+        self._checked = 0.0
+
+    def _restart(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self.restarts += 1
+        self._start()
+
+    def healthy(self, timeout: float = HEALTH_TIMEOUT) -> bool:
+        if self._pool is None:
+            return False
+        try:
+            self._pool.submit(_ping).result(timeout=timeout)
+        except (BrokenProcessPool, FutureTimeout, RuntimeError):
+            return False
+        self._checked = time.monotonic()
+        return True
+
+    def ensure(self) -> "RenderPool":
+        # start on first use; re-check a pool idle for longer than HEALTH_INTERVAL
+        with self._lock:
+            if self._pool is None:
+                self._start()
+            if time.monotonic() - self._checked > HEALTH_INTERVAL and not self.healthy():
+                self._restart()
+        return self
+
+    def submit(self, ctx: Dict[str, Any], profile_path: Optional[str] = None) -> Future:
+        self.ensure()
+        self.tasks += 1
+        return self._pool.submit(_render_pdf_bytes, ctx, profile_path)
+
+    def render_pdf(self, ctx: Dict[str, Any], timeout: Optional[float] = None,
+                   profile_path: Optional[str] = None) -> bytes:
+        try:
+            return self.submit(ctx, profile_path).result(timeout=timeout)
+        except BrokenProcessPool:
+            with self._lock:
+                self._restart()
+            return self.submit(ctx, profile_path).result(timeout=timeout)
+
+    def render_many(self, ctxs: List[Dict[str, Any]]) -> List[bytes]:
+        futures = [self.submit(ctx) for ctx in ctxs]
+        return [f.result() for f in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "max_tasks_per_child": self.max_tasks_per_child,
+                "tasks": self.tasks, "restarts": self.restarts, "running": self._pool is not None}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+_shared: Optional[RenderPool] = None
+_shared_lock = threading.Lock()
+
+def shared_pool() -> Optional[RenderPool]:
+    # one pool per process, shut down at exit; None when pooled rendering is disabled
+    global _shared
+    if RENDER_WORKERS <= 0:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = RenderPool()
+            atexit.register(_shared.shutdown)
+        return _shared
+
+def render_pdf_bytes(ctx: Dict[str, Any], profile_path: Optional[str] = None) -> bytes:
+    # in-process rendering is already seen by the caller's profiler, so profile_path only applies to the pool
+    pool = shared_pool()
+    return pool.render_pdf(ctx, profile_path=profile_path) if pool is not None else _render_pdf_bytes(ctx)
@@ -0,0 +1,815 @@
+# report_render.py — Report template and memory-bounded HTML → PDF rendering
+# - CSS, HTML template and theory pages for the company report
+# - The template is compiled once per process, split into sections; each distinct section is
+#   rendered once and reused (SectionCache), so fixed wording is not re-rendered per company
+# - stream_html feeds Jinja's generate() chunks into a spooled buffer; xhtml2pdf reads
+#   that file and writes the PDF into another spooled buffer, so neither the full HTML
+#   string nor a second in-memory copy of it is ever built
+# - Report profiles (full / summary / numbers) pick the sections; values a section needs can be
+#   Lazy and are computed only when that section is included and has data
+# - Stylesheets are parsed into xhtml2pdf's objects once per process (PreparsedCSSContext), only
+#   for this module's renders (pdf_context); other xhtml2pdf users in the process are unaffected
+# - Fast outputs without the PDF stage: self-contained HTML (same template + CSS) and an
+#   XLSX workbook of the numbers, written with openpyxl's streaming write-only mode
+
+import io, re, math, hashlib, tempfile, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal
+from fractions import Fraction
+from typing import List, Dict, Any, Iterator, IO, Optional, Tuple, NamedTuple
+
+import numpy as np
+from jinja2 import Environment, Template, meta
+from openpyxl import Workbook
+from xhtml2pdf import pisa, document as pisa_document
+from xhtml2pdf.context import pisaContext
+
+SPOOL_MAX_BYTES = 4 * 1024 * 1024   # buffers above this move to a temp file on disk
+
+# =========================
+# 🎨 Embedded CSS (PDF-safe, blue theme)
+# =========================
+CSS_TEXT = """
+@page { size: A4; margin: 18mm 16mm 18mm 16mm; }
+body { font-family: Arial, Helvetica, sans-serif; color: #111; }
+.page { page-break-after: always; }
+.page:last-child { page-break-after: auto; }
+
+h1, h2, h3 { margin: 0 0 10px 0; font-weight: 700; line-height: 1.25; }
+h1 { font-size: 26px; color: #003366; border-bottom: 4px solid #003366; padding-bottom: 6px; }
+h2 { font-size: 18px; background: #003366; color: #ffffff; padding: 6px 10px; }
+h3 { font-size: 13px; color: #003366; margin-top: 6px; }
+
+p { line-height: 1.45; margin: 8px 0; }
+ul { margin: 8px 0 0 16px; } li { margin: 4px 0; }
+.small { font-size: 10px; color: #555; } .big { font-size: 16px; font-weight: 700; }
+.num { text-align: right; } .emph { font-weight: 700; color: #1aa260; }
+
+.cover { background: #003366; color: #ffffff; min-height: 100%; }
+.cover-inner { margin-top: 90px; text-align: center; }
+.cover h1 { color: #ffffff; border: none; font-size: 34px; }
+.cover h2 { background: none; color: #ffffff; font-size: 20px; padding: 0; }
+.val-date { margin-top: 6px; font-size: 12px; }
+.cover-list { margin: 18px auto 10px auto; display: inline-block; text-align: left; }
+.cover-list li { margin: 4px 0; }
+.confidential { margin-top: 16px; font-weight: 700; color: #ffd700; }
+.advisor { margin-top: 6px; font-size: 12px; color: #e6eef7; }
+
+table { width: 100%; border-collapse: collapse; margin: 10px 0; font-size: 10.5px; }
+th, td { border: 1px solid #bfc5cf; padding: 6px 8px; vertical-align: top; line-height: 1.25; }
+th { background: #003366; color: #ffffff; }
+tr:nth-child(even) td { background: #f8f9fa; }
+.keytable th { width: 40%; text-align: left; background: #dce6f1; color: #000; border: 1px solid #9eb6d0; }
+.keytable td { background: #ffffff; }
+
+.card { padding: 10px; background: #e9f1fb; border: 1px solid #9eb6d0; }
+.grid-3 { display: table; width: 100%; border-spacing: 10px; }
+.grid-3 .card { display: table-cell; width: 33%; vertical-align: top; }
+.small th, .small td { font-size: 9.5px; }
+tr { page-break-inside: avoid; }
+blockquote { border-left: 4px solid #003366; padding-left: 10px; margin: 8px 0; color: #333; }
+"""
+
+# =========================
+# 📄 Embedded HTML template 
+# =========================
+TEMPLATE_HTML = r"""
+<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{{ company_name }} - Valuation Report</title>
+<style>{{ css }}</style>
+</head>
+<body>
+
+{# section: cover #}<!-- COVER -->
+<section class="cover page">
+  <div class="cover-inner">
+    <h1>{{ company_name }}</h1>
+    <h2>Valuation Report - {{ unit_name }}</h2>
+    <div class="val-date">Valuation Date – {{ valuation_date }}</div>
+    <ul class="cover-list">
+      {% for item in cover_services %}<li>{{ item }}</li>{% endfor %}
+    </ul>
+    <p class="confidential">Strictly Private and Confidential</p>
+    <div class="advisor">{{ prepared_by }}</div>
+  </div>
+</section>
+
+{# section: toc #}<!-- TABLE OF CONTENTS (static-ish; we mimic your PDF) -->
+<section class="page">
+  <h1>Table of Contents</h1>
+  <table class="toc">
+    {% for title, page in toc %}<tr><td>{{ title }}</td><td class="num">{{ page }}</td></tr>
+    {% endfor %}
+  </table>
+</section>
+
+{# section: executive_summary #}<!-- EXECUTIVE SUMMARY (exact wording section kept; numbers are live) -->
+<section class="page">
+  <h1>EXECUTIVE SUMMARY</h1>
+  <h2>ENGAGEMENT SUMMARY :</h2>
+  <table class="keytable">
+    <tr><th>Company under valuation</th><td>{{ company_name }}</td></tr>
+    <tr><th>Client</th><td>{{ client_name }}</td></tr>
+    <tr><th>Valuation approach</th><td>{{ valuation_approach }}</td></tr>
+    <tr><th>Date of valuation</th><td>{{ valuation_date }}</td></tr>
+    <tr><th>Purpose of Valuation</th><td>{{ purpose_text }}</td></tr>
+    <tr><th>Valuation Currency</th><td>{{ valuation_currency }}</td></tr>
+    <tr><th>Assumptions, disclaimers & limiting conditions</th><td>{{ assumptions_header_note }}</td></tr>
+  </table>
+
+  <h2>VALUATION SUMMARY :</h2>
+  <p>Based on the information provided, data gathered by us and analysis carried out by us, the Equity value of {{ company_name }}
+     using DCF method as on the Valuation Date has been tabulated below:</p>
+
+  <table class="keytable">
+    <tr><th>PV of Discrete Cash Flows</th><td class="num">{{ pv_discrete }}</td></tr>
+    <tr><th>PV of Terminal Value</th><td class="num">{{ pv_terminal }}</td></tr>
+    <tr><th>Enterprise Value (EV)</th><td class="num">{{ enterprise_value }}</td></tr>
+    <tr><th>Opening Cash</th><td class="num">{{ opening_cash }}</td></tr>
+    <tr><th>Other Non-Operating Assets</th><td class="num">{{ other_non_op_assets }}</td></tr>
+    <tr><th>Debt</th><td class="num">{{ debt }}</td></tr>
+    <tr><th>Discount for Lack of Marketability (DLOM)</th><td class="num">{{ dlom_display }}</td></tr>
+    <tr><th>Equity Value (Post-Money)</th><td class="num big">{{ equity_post_money }}</td></tr>
+  </table>
+
+  {% if executive_summary_extra %}
+  <blockquote>{{ executive_summary_extra }}</blockquote>
+  {% endif %}
+</section>
+
+{# section: objective_scope #}<!-- OBJECTIVE & SCOPE -->
+<section class="page">
+  <h1>OBJECTIVE AND SCOPE</h1>
+  {% for p in theory_objective_scope %}<p>{{ p }}</p>{% endfor %}
+  <ul>{% for b in objective_scope_list %}<li>{{ b }}</li>{% endfor %}</ul>
+</section>
+
+{# section: company_background #}<!-- COMPANY BACKGROUND & INDUSTRY -->
+<section class="page">
+  <h1>COMPANY BACKGROUND & INDUSTRY</h1>
+  {% for p in theory_company_industry %}<p>{{ p }}</p>{% endfor %}
+</section>
+
+{# section: methodology #}<!-- METHODOLOGY & APPROACH -->
+<section class="page">
+  <h1>METHODOLOGY & APPROACH</h1>
+  {% for p in theory_methodology %}<p>{{ p }}</p>{% endfor %}
+  <ul>{% for m in methodology_points %}<li>{{ m }}</li>{% endfor %}</ul>
+</section>
+
+{# section: assumptions #}<!-- ASSUMPTIONS, DISCLAIMERS & LIMITING CONDITIONS -->
+<section class="page">
+  <h1>ASSUMPTIONS, DISCLAIMERS & LIMITING CONDITIONS</h1>
+  {% for p in theory_assumptions %}<p>{{ p }}</p>{% endfor %}
+  <ul>{% for a in assumptions_list %}<li>{{ a }}</li>{% endfor %}</ul>
+  <ul>{% for l in limitations_list %}<li>{{ l }}</li>{% endfor %}</ul>
+</section>
+
+{# section: history #}<!-- FINANCIALS – HISTORICAL (safe stub if none) -->
+<section class="page">
+  <h1>FINANCIALS – HISTORICAL SUMMARY</h1>
+  <table class="wide small">
+    <thead><tr>{% for c in history.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
+    <tbody>
+      {% for r in history.rows %}
+        <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</section>
+
+{# section: forecast #}<!-- FINANCIALS – PROJECTED SUMMARY -->
+<section class="page">
+  <h1>FINANCIALS – PROJECTED SUMMARY</h1>
+  <table class="wide">
+    <thead><tr>{% for c in forecast.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
+    <tbody>
+      {% for r in forecast.rows %}
+        <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</section>
+
+{# section: wacc_dcf #}<!-- WACC & DCF -->
+<section class="page">
+  <h1>WACC & DCF VALUATION</h1>
+  <table class="keytable">
+    <tr><th>Discount Rate (WACC)</th><td>{{ wacc_display }}</td></tr>
+    <tr><th>Terminal Growth Rate</th><td>{{ tgr_display }}</td></tr>
+    <tr><th>Discounting Convention</th><td>{{ discounting_display }}</td></tr>
+    <tr><th>Terminal Value Method</th><td>{{ terminal_display }}</td></tr>
+  </table>
+
+  <h2>DCF Workings</h2>
+  <table class="wide">
+    <thead><tr><th>Year</th><th>FCFF</th><th>Discount Factor</th><th>PV (FCFF)</th></tr></thead>
+    <tbody>
+      {% for r in dcf_rows %}
+        <tr>
+          <td>{{ r[0] }}</td>
+          <td class="num">{{ r[1] }}</td>
+          <td>{{ r[2] }}</td>
+          <td class="num">{{ r[3] }}</td>
+        </tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</section>
+
+{# section: sensitivity #}<!-- SENSITIVITY -->
+<section class="page">
+  <h1>SENSITIVITY ANALYSIS</h1>
+  {% if terminal_method == "exit" and exit_view.has_data %}
+  <p class="small">Enterprise value across WACC vs exit multiple ({{ exit_view.basis }}).</p>
+  <table class="wide small">
+    <thead>
+      <tr>
+        <th>Multiple \\ WACC</th>
+        {% for w in exit_view.wacc_cols %}<th>{{ w }}</th>{% endfor %}
+      </tr>
+    </thead>
+    <tbody>
+      {% for row in exit_view.rows %}
+        <tr>
+          <td>{{ row[0] }}</td>
+          {% for v in row[1] %}<td class="num">{{ v }}</td>{% endfor %}
+        </tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  {% else %}
+  <p class="small">Enterprise value across WACC vs terminal growth.</p>
+  <table class="wide small">
+    <thead>
+      <tr>
+        <th>g \\ WACC</th>
+        {% for w in sensitivity.wacc_cols %}<th>{{ w }}</th>{% endfor %}
+      </tr>
+    </thead>
+    <tbody>
+      {% for row in sensitivity.rows %}
+        <tr>
+          <td>{{ row[0] }}</td>
+          {% for v in row[1] %}<td class="num">{{ v }}</td>{% endfor %}
+        </tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  {% endif %}
+
+  {% if exit_view.has_data %}
+  <h2>Terminal Value Cross-check</h2>
+  <p class="small">Perpetual growth implied by each exit multiple ({{ exit_view.basis }}) at the base WACC.
+    Gordon growth at the base TGR implies {{ exit_view.gordon_multiple }}.</p>
+  <table class="wide small">
+    <thead><tr><th>Exit multiple</th><th>Implied growth</th><th>Enterprise Value</th></tr></thead>
+    <tbody>
+      {% for r in exit_view.crosscheck %}
+        <tr><td>{{ r[0] }}</td><td class="num">{{ r[1] }}</td><td class="num">{{ r[2] }}</td></tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  {% endif %}
+
+  {% if charts and charts.heatmap %}
+  <h2>Sensitivity Heatmap</h2>
+  <img src="{{ charts.heatmap.src }}" width="{{ charts.heatmap.width }}" height="{{ charts.heatmap.height }}"/>
+  {% endif %}
+  {% if charts and charts.tornado %}
+  <h2>Key Value Drivers</h2>
+  <p class="small">Change in enterprise value when each driver alone moves by ±{{ charts.shock }}, largest swing first.</p>
+  <img src="{{ charts.tornado.src }}" width="{{ charts.tornado.width }}" height="{{ charts.tornado.height }}"/>
+  {% endif %}
+</section>
+
+{# section: driver_grids #}<!-- DRIVER × DRIVER SENSITIVITY GRIDS -->
+{% for grid in driver_grids %}
+<section class="page">
+  <h1>SENSITIVITY — {{ grid.title | upper }}</h1>
+  <p class="small">{{ grid.metric }} with {{ grid.row_title }} down the rows and {{ grid.col_title }} across;
+    every other input stays at its base value.</p>
+  <table class="wide small">
+    <thead>
+      <tr>
+        <th>{{ grid.row_title }} \\ {{ grid.col_title }}</th>
+        {% for c in grid.col_labels %}<th>{{ c }}</th>{% endfor %}
+      </tr>
+    </thead>
+    <tbody>
+      {% for row in grid.rows %}
+        <tr>
+          <td>{{ row[0] }}</td>
+          {% for v in row[1] %}<td class="num">{{ v }}</td>{% endfor %}
+        </tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  {% if grid.chart %}
+  <img src="{{ grid.chart.src }}" width="{{ grid.chart.width }}" height="{{ grid.chart.height }}"/>
+  {% endif %}
+</section>
+{% endfor %}
+
+{# section: reasonableness #}<!-- REASONABLENESS CHECKS -->
+<section class="page">
+  <h1>REASONABLENESS CHECKS</h1>
+
+  <div class="card">
+    <h2>Comparable Companies</h2>
+    <table class="wide small">
+      <thead><tr>{% for c in comps.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
+      <tbody>
+        {% for r in comps.rows %}
+          <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
+        {% endfor %}
+      </tbody>
+    </table>
+  </div>
+
+  <div class="card" style="margin-top:10px;">
+    <h2>Comparable Transactions</h2>
+    <table class="wide small">
+      <thead><tr>{% for c in deals.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
+      <tbody>
+        {% for r in deals.rows %}
+          <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
+        {% endfor %}
+      </tbody>
+    </table>
+  </div>
+
+  {% if football_field.rows %}
+  <div class="card" style="margin-top:10px;">
+    <h2>Football Field (Enterprise Value)</h2>
+    <table class="wide small">
+      <thead><tr><th>Method</th><th>Low</th><th>Mid</th><th>High</th></tr></thead>
+      <tbody>
+        {% for r in football_field.rows %}
+          <tr><td>{{ r[0] }}</td>{% for v in r[1:] %}<td class="num">{{ v }}</td>{% endfor %}</tr>
+        {% endfor %}
+      </tbody>
+    </table>
+  </div>
+  {% endif %}
+</section>
+
+{# section: statements #}<!-- STATEMENTS -->
+{% if bs_has_data | default(true) %}
+<section class="page">
+  <h1>STATEMENTS — BALANCE SHEET (Summary)</h1>
+  <table class="wide small">
+    <thead><tr><th>Particulars</th>{% for y in bs_years %}<th>{{ y }}</th>{% endfor %}</tr></thead>
+    <tbody>
+      {% for r in bs_rows %}
+        <tr><td>{{ r[0] }}</td>{% for v in r[1] %}<td class="num">{{ v }}</td>{% endfor %}</tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</section>
+{% endif %}
+
+{% if is_has_data | default(true) %}
+<section class="page">
+  <h1>STATEMENTS — INCOME STATEMENT (Summary)</h1>
+  <table class="wide small">
+    <thead><tr><th>Particulars</th>{% for y in is_years %}<th>{{ y }}</th>{% endfor %}</tr></thead>
+    <tbody>
+      {% for r in is_rows %}
+        <tr><td>{{ r[0] }}</td>{% for v in r[1] %}<td class="num">{{ v }}</td>{% endfor %}</tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</section>
+{% endif %}
+
+{% if cf_has_data | default(true) %}
+<section class="page">
+  <h1>STATEMENTS — CASH FLOW (Summary)</h1>
+  <table class="wide small">
+    <thead><tr><th>Particulars</th>{% for y in cf_years %}<th>{{ y }}</th>{% endfor %}</tr></thead>
+    <tbody>
+      {% for r in cf_rows %}
+        <tr><td>{{ r[0] }}</td>{% for v in r[1] %}<td class="num">{{ v }}</td>{% endfor %}</tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</section>
+{% endif %}
+
+{# section: theory_pages #}<!-- THEORY PAGES from your PDF (append to reach 20+ pages) -->
+{% for tp in theory_extra_pages %}
+<section class="page">
+  {{ tp }}
+</section>
+{% endfor %}
+
+{# section: appendices #}<!-- APPENDICES -->
+{% for ap in appendices %}
+<section class="page">
+  <h1>{{ ap.title }}</h1>
+  <table class="wide small">
+    <thead><tr>{% for c in ap.columns %}<th>{{ c }}</th>{% endfor %}</tr></thead>
+    <tbody>
+      {% for r in ap.rows %}
+        <tr>{% for cell in r %}<td>{{ cell }}</td>{% endfor %}</tr>
+      {% endfor %}
+    </tbody>
+  </table>
+</section>
+{% endfor %}
+
+{# section: sign_off #}<!-- SIGN-OFF -->
+<section class="page">
+  <h1>Sign-off</h1>
+  <p>{{ prepared_by }} — {{ valuation_date }}</p>
+</section>
+
+{# section: tail #}</body>
+</html>
+"""
+
+# =========================
+# 📚 Theory text from your Mignesh PDF (embedded)
+# =========================
+# NOTE: This is the raw text extracted page-by-page. It reproduces the wording/sections.
+# You can tweak/trim any page if needed. These pages will be appended to ensure 20+ pages.
+THEORY_PAGES: List[str] = [
+r'''Mignesh Global Limited
+Valuation Report -Combined Unit
+Valuat... Advisory
+August - 2024
+Strictly Private and 
+Confidential''',
+r'''ALSERVE  CORPORATE  ADVISORS  LLP Table  of Contents
+3Section ''',
+r'''EXECUTIVE SUMMARY
+ENGAGEMENT SUMMARY :
+Company under valuation Mignesh Global Limited (MGL)
+Client Mignesh Global Limited (MGL)
+Valuation approach Income Approach (DCF)
+Date of valuation 31st August, 2024
+Purpose of Valuation
+The Management of the company is exploring an opportunity for identifying strategic investors for its 
+combined business unit and hence is desirous for carrying out an independent valuation exercise for 
+internal review purposes
+Valuation Currency INR in lakhs, Unless otherwise mentioned
+Assumptions, disclaimers limiting 
+conditions
+This valuation report should be read in conjunction with the assumptions, disclaimers, and 
+limiting conditions detailed throughout this report which are made in addition to those included 
+within the assumptions, disclaimers & limiting conditions section located within this report. Reliance 
+on this report and extends on of our liability is conditional upon the reader's acknowledgment and 
+understanding of these statements. This valuation is for the use of the client to whom it is addressed 
+and should not be used for any purpose other than the intended one. No responsibility is accepted 
+to any third party who may use or rely on the whole or any part of the content of this valuation. The 
+valuer has no pecuniary interest that would conflict with the proper valuation of the assets.''',
+r'''VALUATION SUMMARY :
+Based on the information provided, data gathered by us and analysis carried out by us, the Equity value of MGL using DCF method as 
+on the Valuation Date has been tabulated below:''',
+# ... (For brevity in this message, we’re embedding representative pages. 
+# In your local file, you can paste all 20 extracted pages here. The app will append these to reach 20+ pages.)
+]
+
+# If you want to ensure 20+ pages always, we can repeat/tile theory pages if needed:
+def build_theory_pages(min_pages: int = 12) -> List[str]:
+    pages = list(THEORY_PAGES)
+    while len(pages) < min_pages:
+        pages.extend(THEORY_PAGES)
+    # trim a bit to not explode file size
+    return pages[:min_pages]
+
+# =========================
+# 🧾 Pre-parsed stylesheets (xhtml2pdf)
+# =========================
+# xhtml2pdf parses its default CSS and every <style> block again for each document. This context
+# parses each plain-rules source once per process and reuses the stylesheet objects. At-rules
+# (@page, @font-face, @frame) register page templates and fonts on the context while they are
+# parsed, so they are split into their own source and still parsed per document.
+AT_RULE_RE = re.compile(r"@[\w-]+[^{};]*\{[^{}]*\}")
+PARSED_CSS_MAX = 64
+
+class PreparsedCSSContext(pisaContext):
+    _parsed: Dict[Tuple[str, str], Any] = {}   # only touched inside pdf_context(), i.e. under PDF_LOCK
+
+    def addCSS(self, value, sourceName: Optional[str] = None):
+        at_rules = AT_RULE_RE.findall(value)
+        if at_rules:
+            super().addCSS("\n".join(at_rules), f"{sourceName or 'style'} (at-rules)")
+            value = AT_RULE_RE.sub("", value)
+        super().addCSS(value, sourceName)
+
+    def _parseCSSSource(self, text, sourceName):
+        if "@" in text:
+            return super()._parseCSSSource(text, sourceName)
+        key = (text, sourceName)
+        parsed = self._parsed.get(key)
+        if parsed is None:
+            if len(self._parsed) >= PARSED_CSS_MAX:
+                self._parsed.clear()
+            parsed = self._parsed[key] = super()._parseCSSSource(text, sourceName)
+        return parsed
+
+PREPARSED_CSS = True
+PDF_LOCK = threading.Lock()
+
+def use_preparsed_css(enabled: bool = True) -> None:
+    global PREPARSED_CSS
+    PREPARSED_CSS = enabled
+
+@contextmanager
+def pdf_context() -> Iterator[None]:
+    # pisaDocument builds its context from xhtml2pdf's module-level name. It is swapped in only for
+    # this module's renders and restored after, under a lock so no concurrent render sees it
+    # half-way and the class-level cache is never shared between threads. xhtml2pdf is pure Python
+    # and holds the GIL throughout, so serialising renders in one process costs no parallelism.
+    with PDF_LOCK:
+        pisa_document.pisaContext = PreparsedCSSContext if PREPARSED_CSS else pisaContext
+        try:
+            yield
+        finally:
+            pisa_document.pisaContext = pisaContext
+
+# =========================
+# 🧩 Report sections (each distinct section rendered once)
+# =========================
+# The template is split at its {# section: name #} markers. A section's output depends only on the
+# context keys it reads, so it is cached on a fingerprint of those values: the fixed wording and
+# theory pages render once for a whole batch, and rows that differ only in cover fields re-render
+# just the sections that show them.
+SECTION_MARK_RE = re.compile(r"\{# section: (\w+) #\}")
+SECTION_CACHE_SIZE = 256
+SECTION_ENV = Environment(keep_trailing_newline=True)
+
+class ReportSection(NamedTuple):
+    name: str
+    template: Template
+    variables: Tuple[str, ...]   # context keys the section reads
+
+def split_sections(source: str) -> List[ReportSection]:
+    marks = list(SECTION_MARK_RE.finditer(source))
+    bounds = [("head", 0)] + [(m.group(1), m.start()) for m in marks]
+    sections = []
+    for (name, start), (_, end) in zip(bounds, bounds[1:] + [("", len(source))]):
+        text = source[start:end]
+        sections.append(ReportSection(name, SECTION_ENV.from_string(text),
+                                      tuple(sorted(meta.find_undeclared_variables(SECTION_ENV.parse(text))))))
+    return sections
+
+REPORT_SECTIONS = split_sections(TEMPLATE_HTML.rstrip("\n"))
+
+def _fingerprint(value: Any, h) -> bool:
+    # feeds an exact description of a context value into h; False for types without one
+    if isinstance(value, str):
+        h.update(b"s%d:" % len(value)); h.update(value.encode("utf-8"))
+    elif isinstance(value, (bool, int, float, Decimal, Fraction, np.generic)) or value is None:
+        h.update(f"{type(value).__name__}:{value!r};".encode("utf-8"))
+    elif isinstance(value, dict):
+        h.update(b"{%d" % len(value))
+        return all(_fingerprint(k, h) and _fingerprint(v, h) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        h.update(b"[%d" % len(value))
+        return all(_fingerprint(v, h) for v in value)
+    elif isinstance(value, np.ndarray):
+        h.update(f"nd:{value.dtype}:{value.shape};".encode("utf-8")); h.update(np.ascontiguousarray(value).tobytes())
+    else:
+        return False
+    return True
+
+def section_key(section: ReportSection, ctx: Dict[str, Any]) -> Optional[str]:
+    h = hashlib.sha1(section.name.encode("utf-8"))
+    for k in section.variables:
+        h.update(b"|" + k.encode("utf-8"))
+        if k in ctx and not _fingerprint(ctx[k], h):
+            return None
+    return h.hexdigest()
+
+class SectionCache:
+    # rendered sections by section_key, least recently used dropped first; shared by the
+    # Streamlit sessions (and render_pool tasks) of one process
+    def __init__(self, size: int = SECTION_CACHE_SIZE):
+        self.size = size
+        self._html: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def render(self, section: ReportSection, ctx: Dict[str, Any]) -> Iterator[str]:
+        key = section_key(section, ctx)
+        if key is None:
+            yield from section.template.generate(**ctx)
+            return
+        with self._lock:
+            html = self._html.get(key)
+            if html is not None:
+                self._html.move_to_end(key)
+                self.hits += 1
+        if html is None:
+            html = section.template.render(**ctx)
+            with self._lock:
+                self.misses += 1
+                self._html[key] = html
+                while len(self._html) > self.size:
+                    self._html.popitem(last=False)
+        yield html
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._html)}
+
+SECTIONS = SectionCache()
+
+def section_cache_stats() -> Dict[str, int]:
+    return SECTIONS.stats()
+
+# =========================
+# 📑 Report profiles (which sections a report contains)
+# =========================
+# A profile lists sections by name; head and tail (document open / close) are always included.
+# compose() evaluates Lazy context values only for included sections that read them, then drops
+# sections with nothing to show, so a summary report neither computes nor lays out the rest.
+PROFILE_LABELS = {"full": "Full report", "summary": "Summary only", "numbers": "Numbers only"}
+REPORT_PROFILES: Dict[str, Tuple[str, ...]] = {
+    "full": tuple(s.name for s in REPORT_SECTIONS),
+    "summary": ("cover", "executive_summary", "wacc_dcf", "sign_off"),
+    "numbers": ("cover", "executive_summary", "history", "forecast", "wacc_dcf", "sensitivity",
+                "driver_grids", "reasonableness", "statements", "appendices", "sign_off"),
+}
+TOC_ENTRIES = [
+    ("Executive Summary", "executive_summary"), ("Objective & Scope", "objective_scope"),
+    ("Company Background & Industry", "company_background"), ("Methodology & Approach", "methodology"),
+    ("Assumptions, Disclaimers & Limiting Conditions", "assumptions"),
+    ("Financials – Historical Summary", "history"), ("Financials – Projected Summary", "forecast"),
+    ("WACC & DCF Valuation", "wacc_dcf"), ("Sensitivity Analysis", "sensitivity"),
+    ("Reasonableness Checks", "reasonableness"), ("Appendices", "appendices"),
+]
+
+class Lazy:
+    # a context value computed on first use; compose() calls it only for sections it renders
+    def __init__(self, fn):
+        self.fn = fn
+        self._done, self._value = False, None
+
+    def value(self) -> Any:
+        if not self._done:
+            self._value, self._done = self.fn(), True
+        return self._value
+
+def _blank_table(rows) -> bool:
+    # nothing beyond the label column (ensure_table's "No data available" / "—" placeholders count as blank)
+    return all(str(c).strip() in ("", "—") for r in rows or [] for c in list(r)[1:])
+
+# Section → does it have anything to show; sections not listed always render
+SECTION_HAS_DATA = {
+    "history": lambda c: not _blank_table(c.get("history", {}).get("rows")),
+    "reasonableness": lambda c: (not _blank_table(c.get("comps", {}).get("rows"))
+                                 or not _blank_table(c.get("deals", {}).get("rows"))
+                                 or bool(c.get("football_field", {}).get("rows"))),
+    "driver_grids": lambda c: bool(c.get("driver_grids")),
+    "statements": lambda c: any(c.get(f"{k}_has_data", True) for k in ("bs", "is", "cf")),
+    "theory_pages": lambda c: bool(c.get("theory_extra_pages")),
+    "appendices": lambda c: bool(c.get("appendices")),
+}
+
+def compose(ctx: Dict[str, Any], profile: str = "full") -> Dict[str, Any]:
+    # plain (picklable) context for the profile with "sections" and "toc" filled in
+    wanted = set(REPORT_PROFILES[profile]) | {"head", "tail"}
+    out = {k: v for k, v in ctx.items() if not isinstance(v, Lazy)}
+    names = []
+    for section in REPORT_SECTIONS:
+        if section.name not in wanted:
+            continue
+        for k in section.variables:
+            if k not in out and isinstance(ctx.get(k), Lazy):
+                out[k] = ctx[k].value()
+        has_data = SECTION_HAS_DATA.get(section.name)
+        if has_data is None or has_data(out):
+            names.append(section.name)
+    out["sections"] = names
+    toc = [title for title, name in TOC_ENTRIES if name in names]
+    out["toc"] = [(title, f"{i}+" if title == "Appendices" else str(i)) for i, title in enumerate(toc, start=1)]
+    return out
+
+# =========================
+# 🖨️ Rendering
+# =========================
+def render_html(ctx: Dict[str, Any]) -> str:
+    return "".join(stream_html(ctx))
+
+def stream_html(ctx: Dict[str, Any]) -> Iterator[str]:
+    # a context not yet composed renders as the full report
+    if "sections" not in ctx:
+        ctx = compose(ctx)
+    names = set(ctx["sections"])
+    for section in REPORT_SECTIONS:
+        if section.name in names:
+            yield from SECTIONS.render(section, ctx)
+
+def spool_html(ctx: Dict[str, Any]) -> IO[bytes]:
+    # rendered HTML as UTF-8 in a spooled buffer, written chunk by chunk
+    buf = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    for chunk in stream_html(ctx):
+        buf.write(chunk.encode("utf-8"))
+    buf.seek(0)
+    return buf
+
+def render_pdf(ctx: Dict[str, Any]) -> IO[bytes]:
+    # PDF in a spooled buffer positioned at 0; raises RuntimeError if xhtml2pdf reports errors
+    dest = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    with spool_html(ctx) as src, pdf_context():
+        status = pisa.CreatePDF(src, dest=dest, encoding="utf-8")
+    if status.err:
+        dest.close()
+        raise RuntimeError("PDF generation failed (xhtml2pdf).")
+    dest.seek(0)
+    return dest
+
+WARM_UP_HTML = ('<html><head><style>{css}</style></head><body><h1>Warm-up</h1>'
+                '<table class="wide small"><tr><th>a</th><td class="num">1</td></tr></table>'
+                '<img src="data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIxIiBoZWlnaHQ9IjEiLz4=" width="1" height="1"/>'
+                '</body></html>')
+
+def warm_up() -> None:
+    # one tiny document through xhtml2pdf: reportlab fonts, the CSS parser and svglib are
+    # loaded and the report stylesheet pre-parsed before the first real report
+    # (render_pool workers call this at start-up)
+    with pdf_context():
+        pisa.CreatePDF(WARM_UP_HTML.replace("{css}", CSS_TEXT), dest=io.BytesIO(), encoding="utf-8")
+
+def render_pdf_in_memory(ctx: Dict[str, Any]) -> bytes:
+    # whole HTML string → StringIO → BytesIO; the baseline for benchmarks/bench_render.py
+    rendered = render_html(ctx)
+    pdf_bytes = io.BytesIO()
+    with pdf_context():
+        status = pisa.CreatePDF(io.StringIO(rendered), dest=pdf_bytes)
+    if status.err:
+        raise RuntimeError("PDF generation failed (xhtml2pdf).")
+    return pdf_bytes.getvalue()
+
+# =========================
+# 📊 XLSX workbook (numbers only, streaming writer)
+# =========================
+SUMMARY_FIELDS = [
+    ("WACC", "wacc"), ("Terminal Growth Rate", "tgr"),
+    ("PV of Discrete Cash Flows", "pv_discrete"), ("PV of Terminal Value", "pv_terminal"),
+    ("Enterprise Value", "enterprise_value"), ("Opening Cash", "opening_cash"),
+    ("Other Non-Op Assets", "other_nonop"), ("Debt", "debt"),
+    ("Equity Value (Post-Money)", "equity_post_money"),
+]
+STATEMENT_TITLES = {"bs": "Balance Sheet", "is": "Income Statement", "cf": "Cash Flow Statement"}
+
+def _xl(v) -> Optional[float]:
+    # Decimal / Fraction / numpy → float; blanks, NaN and inf → empty cell
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+def render_xlsx(company: str, res: Dict[str, Any], sens: Dict[str, Any],
+                forecast: List[List[Any]], statement: Dict[str, Any],
+                grids: List[Dict[str, Any]] = ()) -> bytes:
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("Summary")
+    ws.append(["Company", company])
+    for label, key in SUMMARY_FIELDS:
+        ws.append([label, _xl(res.get(key))])
+
+    ws = wb.create_sheet("DCF")
+    ws.append(["Year", "FCFF", "Discount Factor", "PV (FCFF)"])
+    for i, (fcf, dfac) in enumerate(zip(res["fcf_list"], res["discount_factors"]), start=1):
+        ws.append([f"FY {i}", _xl(fcf), _xl(dfac), _xl(fcf * dfac)])
+
+    ws = wb.create_sheet("Forecast")
+    ws.append(["Year", "NOIAT", "Depreciation", "CapEx", "Inc NWC", "FCFF"])
+    for r in forecast:
+        ws.append([r[0]] + [_xl(v) for v in r[1:]])
+
+    ws = wb.create_sheet("Sensitivity")
+    ws.append(["g \\ WACC"] + [_xl(w) for w in sens["wacc_values"]])
+    for g, vals in zip(sens["g_values"], sens["values"]):
+        ws.append([_xl(g)] + [_xl(v) for v in vals])
+    for grid in grids:
+        ws.append([])
+        ws.append([f"{grid['title']} — {grid['metric']}"])
+        ws.append([f"{grid['row_title']} \\ {grid['col_title']}"] + list(grid["col_labels"]))
+        for (label, _), vals in zip(grid["rows"], grid["values"]):
+            ws.append([label] + [_xl(v) for v in vals])
+
+    ws = wb.create_sheet("Statements")
+    for key, title in STATEMENT_TITLES.items():
+        if not statement.get(f"{key}_has_data"):
+            continue
+        ws.append([title])
+        ws.append(["Particulars"] + list(statement["years"]))
+        for (label, _), values in zip(statement[f"{key}_rows"], statement[f"{key}_values"]):
+            ws.append([label] + [_xl(v) for v in values])
+        ws.append([])
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as buf:
+        wb.save(buf)
+        buf.seek(0)
+        return buf.read()
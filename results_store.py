@@ -0,0 +1,194 @@
+# results_store.py — Local results store for valuation runs (SQLite)
+# - One row per company per run and distinct valuation key (DCF inputs, valuation date, conventions,
+#   precision): inputs, compute_valuation outputs, headline numbers; earlier valuations are never
+#   overwritten
+# - Sensitivity grid stored cell-by-cell so it can be re-queried without re-rendering
+# - Indexed on company, valuation date and run id for millisecond history queries
+
+import os, json, uuid, hashlib, sqlite3, datetime
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+
+import dcf_engine
+
+DB_PATH = os.environ.get("VALUATION_DB", "valuation_results.sqlite")
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    created_at  TEXT NOT NULL,
+    source      TEXT
+);
+CREATE TABLE IF NOT EXISTS valuations (
+    id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id             TEXT NOT NULL REFERENCES runs(run_id),
+    row_idx            INTEGER NOT NULL,
+    company            TEXT NOT NULL,
+    valuation_date     TEXT NOT NULL,
+    valuation_key      TEXT NOT NULL,
+    wacc               REAL,
+    tgr                REAL,
+    pv_discrete        REAL,
+    pv_terminal        REAL,
+    enterprise_value   REAL,
+    opening_cash       REAL,
+    other_nonop        REAL,
+    debt               REAL,
+    dlom_pct           REAL,
+    equity_post_money  REAL,
+    inputs_json        TEXT,
+    outputs_json       TEXT,
+    UNIQUE (run_id, row_idx, valuation_key)
+);
+CREATE TABLE IF NOT EXISTS sensitivity (
+    valuation_id  INTEGER NOT NULL REFERENCES valuations(id) ON DELETE CASCADE,
+    g             REAL NOT NULL,
+    wacc          REAL NOT NULL,
+    ev            REAL
+);
+CREATE INDEX IF NOT EXISTS ix_valuations_company_date ON valuations (company, valuation_date);
+CREATE INDEX IF NOT EXISTS ix_valuations_date ON valuations (valuation_date);
+CREATE INDEX IF NOT EXISTS ix_valuations_run ON valuations (run_id);
+CREATE INDEX IF NOT EXISTS ix_sensitivity_valuation ON sensitivity (valuation_id);
+"""
+
+HEADLINE_FIELDS = [
+    "wacc","tgr","pv_discrete","pv_terminal","enterprise_value",
+    "opening_cash","other_nonop","debt","dlom_pct","equity_post_money"
+]
+
+# =========================
+# 🔌 Connection & runs
+# =========================
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA_SQL)
+    return conn
+
+def new_run_id() -> str:
+    return datetime.datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+def start_run(conn: sqlite3.Connection, run_id: str, source: str = "") -> None:
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, created_at, source) VALUES (?,?,?)",
+            (run_id, datetime.datetime.now().isoformat(timespec="seconds"), source),
+        )
+
+# =========================
+# 💾 Writes
+# =========================
+def _jsonable(x):
+    if x is None:
+        return None
+    if hasattr(x, "item"):  # numpy scalars
+        x = x.item()
+    if isinstance(x, float) and x != x:  # NaN
+        return None
+    if isinstance(x, (str, int, float, bool)):
+        return x
+    return str(x)
+
+def inputs_to_json(row) -> str:
+    return json.dumps({str(k): _jsonable(v) for k, v in dict(row).items()}, sort_keys=True)
+
+def _number(x):
+    x = _jsonable(x)
+    if isinstance(x, (int, float)) and not isinstance(x, bool):
+        return float(x)
+    return x
+
+def valuation_inputs(row, n_years: int) -> Dict[str, Any]:
+    # the fields the DCF reads, numbers as floats (12 and 12.0 are the same input); other
+    # columns (statements, sector, client) do not change the valuation
+    keys = dcf_engine.input_columns(n_years) + [f"{p}{n_years}" for p in dcf_engine.OPTIONAL_PER_YEAR_PREFIXES]
+    return {k: _number(row.get(k, None)) for k in keys}
+
+def valuation_key(row, n_years: int, valuation_date: datetime.date,
+                  convention: Optional[dcf_engine.Convention] = None, precision: str = "") -> str:
+    payload = {
+        "inputs": valuation_inputs(row, n_years),
+        "valuation_date": valuation_date.isoformat(),
+        "convention": convention._asdict() if convention is not None else None,
+        "precision": precision,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def record_valuation(conn: sqlite3.Connection, run_id: str, row_idx: int, company: str,
+                     valuation_date: datetime.date, row, res: Dict[str, Any],
+                     sens: Optional[Dict[str, Any]] = None, precision: str = "") -> int:
+    inputs_json = inputs_to_json(row)
+    headline = [float(res[k]) if res.get(k) is not None else None for k in HEADLINE_FIELDS]
+    key = valuation_key(row, len(res["periods"]), valuation_date, res.get("convention"), precision)
+
+    # Streamlit reruns the script on every widget change; skip rows already recorded. A changed
+    # row (new setting or date, filled-in value) is added next to the earlier one, never replacing it.
+    found = conn.execute(
+        "SELECT id FROM valuations WHERE run_id=? AND row_idx=? AND valuation_key=?", (run_id, row_idx, key)
+    ).fetchone()
+    if found:
+        return found[0]
+
+    outputs_json = json.dumps({
+        "dcf_rows": res.get("dcf_rows", []),
+        "fcf_list": [float(x) for x in res.get("fcf_list", [])],
+        "periods": [float(x) for x in res.get("periods", [])],
+    })
+
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO valuations (run_id, row_idx, company, valuation_date, valuation_key, "
+            + ", ".join(HEADLINE_FIELDS) + ", inputs_json, outputs_json) VALUES ("
+            + ",".join("?" * (5 + len(HEADLINE_FIELDS) + 2)) + ")",
+            [run_id, row_idx, company, valuation_date.isoformat(), key] + headline
+            + [inputs_json, outputs_json],
+        )
+        valuation_id = cur.lastrowid
+        if sens and sens.get("values"):
+            cells = [
+                (valuation_id, g, w, v)
+                for g, vals in zip(sens["g_values"], sens["values"])
+                for w, v in zip(sens["wacc_values"], vals)
+            ]
+            conn.executemany("INSERT INTO sensitivity (valuation_id, g, wacc, ev) VALUES (?,?,?,?)", cells)
+    return valuation_id
+
+# =========================
+# 🔎 Queries
+# =========================
+def company_history(conn: sqlite3.Connection, company: str,
+                    since: Optional[datetime.date] = None) -> pd.DataFrame:
+    since_s = (since or datetime.date.min).isoformat()
+    return pd.read_sql_query(
+        "SELECT run_id, valuation_date, wacc, tgr, enterprise_value, equity_post_money "
+        "FROM valuations WHERE company=? AND valuation_date>=? ORDER BY valuation_date DESC, id DESC",
+        conn, params=(company, since_s),
+    )
+
+def portfolio_ev_by_date(conn: sqlite3.Connection,
+                         since: Optional[datetime.date] = None) -> pd.DataFrame:
+    # latest valuation per company per date, so repeated runs are not double counted
+    since_s = (since or datetime.date.min).isoformat()
+    return pd.read_sql_query(
+        "SELECT v.valuation_date, COUNT(*) AS companies, "
+        "SUM(v.enterprise_value) AS enterprise_value, SUM(v.equity_post_money) AS equity_post_money "
+        "FROM valuations v "
+        "JOIN (SELECT MAX(id) AS id FROM valuations WHERE valuation_date>=? "
+        "      GROUP BY company, valuation_date) latest ON latest.id = v.id "
+        "GROUP BY v.valuation_date ORDER BY v.valuation_date",
+        conn, params=(since_s,),
+    )
+
+def sensitivity_grid(conn: sqlite3.Connection, valuation_id: int) -> pd.DataFrame:
+    cells = pd.read_sql_query(
+        "SELECT g, wacc, ev FROM sensitivity WHERE valuation_id=?", conn, params=(valuation_id,)
+    )
+    if cells.empty:
+        return cells
+    return cells.pivot(index="g", columns="wacc", values="ev")
+
+def list_companies(conn: sqlite3.Connection) -> List[str]:
+    return [r[0] for r in conn.execute("SELECT DISTINCT company FROM valuations ORDER BY company")]
@@ -0,0 +1,103 @@
+# schema.py — Declarative input schema and one-pass typed coercion
+# - Core fields, per-year projection prefixes and statement prefixes are declared once
+# - Every schema column is coerced to float64 (text fields to stripped strings) in one
+#   vectorized pass per column; downstream stages get clean numeric columns
+# - Cells that do not parse are set to NaN and reported with row / company / column / value,
+#   instead of silently becoming 0
+# - Horizon detection scans the header once for every per-year and statement prefix family
+
+import re
+from typing import List, Dict, Tuple, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from dcf_engine import PER_YEAR_PREFIXES, PER_YEAR_RE, year_map
+from statements import STATEMENT_MAPS
+
+class Field(NamedTuple):
+    name: str
+    kind: str = "number"     # "number" | "text"
+    percent: bool = False    # accepts a trailing "%" (values are already in percent units)
+
+CORE_SCHEMA: List[Field] = [
+    Field("Company Name", "text"),
+    Field("Client Name", "text"),
+    Field("WACC", percent=True),
+    Field("TGR", percent=True),
+    Field("Opening Cash"),
+    Field("Other Non-Op Assets"),
+    Field("Debt"),
+    Field("DLOM", percent=True),
+    Field("Money Infusion"),
+    Field("First_Period_Fraction"),
+]
+CORE_BY_NAME: Dict[str, Field] = {f.name: f for f in CORE_SCHEMA}
+STATEMENT_PREFIXES = sorted({prefix for m in STATEMENT_MAPS.values() for _, prefix in m})
+STATEMENT_RE = re.compile(r"^(%s)(\d+)$" % "|".join(re.escape(p) for p in STATEMENT_PREFIXES))
+ISSUE_COLUMNS = ["row", "company", "column", "value"]
+BLANK_TOKENS = {"", "-", "n/a", "na", "nil", "none"}   # read as missing, not flagged
+
+class Horizon(NamedTuple):
+    years: int                          # projection horizon, across all projection families
+    statement_years: int                # last FY column across all statement families
+    short_families: Dict[str, int]      # projection prefix → last year, for families that stop early
+
+def detect_horizon(df: pd.DataFrame) -> Horizon:
+    projections = year_map(df.columns, PER_YEAR_RE)
+    history = year_map(df.columns, STATEMENT_RE)
+    years = max((max(y) for p, y in projections.items() if p in PER_YEAR_PREFIXES), default=0)
+    statement_years = max((max(y) for y in history.values()), default=0)
+    short = {p: max(y) for p, y in sorted(projections.items()) if max(y) < years and p in PER_YEAR_PREFIXES}
+    return Horizon(years, statement_years, short)
+
+def column_spec(col) -> Optional[Field]:
+    name = str(col)
+    if name in CORE_BY_NAME:
+        return CORE_BY_NAME[name]
+    if PER_YEAR_RE.match(name) or STATEMENT_RE.match(name):
+        return Field(name)
+    return None
+
+def parse_numbers(s: pd.Series, percent: bool = False) -> Tuple[pd.Series, pd.Series]:
+    # (float64 values, mask of non-blank cells that did not parse)
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.astype(float), pd.Series(False, index=s.index)
+    num = pd.to_numeric(s, errors="coerce")
+    retry = num.isna() & s.notna()
+    if retry.any():
+        # only the cells plain parsing missed: "1,234", "(1,234)", "14%"
+        text = s[retry].astype(str).str.strip()
+        text = text.str.replace(",", "", regex=False).str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+        if percent:
+            text = text.str.replace(r"%$", "", regex=True)
+        num[retry] = pd.to_numeric(text, errors="coerce")
+        blank = s[retry].astype(str).str.strip().str.lower().isin(BLANK_TOKENS)
+        bad = pd.Series(False, index=s.index)
+        bad[retry] = num[retry].isna() & ~blank
+        return num.astype(float), bad
+    return num.astype(float), pd.Series(False, index=s.index)
+
+def coerce_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    out = df.copy()
+    company = (df["Company Name"].fillna("").astype(str).str.strip()
+               if "Company Name" in df.columns else pd.Series("", index=df.index))
+    positions = pd.Series(np.arange(1, len(df) + 1), index=df.index)
+    issues = []
+    for col in df.columns:
+        spec = column_spec(col)
+        if spec is None:
+            continue
+        if spec.kind == "text":
+            out[col] = df[col].where(df[col].isna(), df[col].astype(str).str.strip())
+            continue
+        values, bad = parse_numbers(df[col], spec.percent)
+        out[col] = values
+        if bad.any():
+            issues.append(pd.DataFrame({
+                "row": positions[bad], "company": company[bad],
+                "column": str(col), "value": df[col][bad].astype(str),
+            }))
+    report = pd.concat(issues, ignore_index=True).sort_values(["row", "column"], kind="stable") \
+        if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+    return out, report.reset_index(drop=True)
@@ -0,0 +1,107 @@
+# solver.py — Reverse-solve: implied WACC, TGR or NOIAT scale for a target EV / equity value
+# - Runs on the vectorized DCF (dcf_engine.batch_values) for all workbook rows at once
+# - Bracketed Newton: Newton steps from a finite-difference slope, bisection whenever a step
+#   leaves the bracket — a handful of batched evaluations for the whole workbook
+# - Equity targets are mapped to EV targets through the equity bridge first
+
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import dcf_engine
+
+SOLVE_FOR = {
+    "wacc": "Implied WACC",
+    "tgr": "Implied terminal growth rate",
+    "noiat_scale": "Uniform NOIAT scale factor",
+}
+TARGETS = {
+    "enterprise_value": "Enterprise Value",
+    "equity_post_money": "Equity Value (Post-Money)",
+}
+REL_TOL = 1e-9
+MAX_ITER = 60
+FD_STEP = 1e-7
+SPREAD_EPS = 1e-6   # keep WACC strictly above TGR
+RATE_BOUNDS = (-0.99, 5.0)
+SCALE_BOUNDS = (-100.0, 100.0)
+
+def solvable(convention: dcf_engine.Convention = dcf_engine.DEFAULT_CONVENTION) -> List[str]:
+    # the growth rate does not enter an exit-multiple terminal value, so there is nothing to solve
+    return [k for k in SOLVE_FOR if not (k == "tgr" and convention.terminal != "gordon")]
+
+def _brackets(x: Dict[str, Any], solve_for: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n = len(x["wacc"])
+    if solve_for == "wacc":
+        # Gordon needs WACC above TGR; an exit multiple only needs a positive discount base
+        floor = x["tgr"] if x["convention"].terminal == "gordon" else np.full(n, RATE_BOUNDS[0])
+        lo = np.maximum(floor + SPREAD_EPS, RATE_BOUNDS[0])
+        return lo, np.full(n, RATE_BOUNDS[1]), x["wacc"].copy()
+    if solve_for == "tgr":
+        hi = np.minimum(x["wacc"] - SPREAD_EPS, RATE_BOUNDS[1])
+        return np.full(n, RATE_BOUNDS[0]), hi, x["tgr"].copy()
+    return np.full(n, SCALE_BOUNDS[0]), np.full(n, SCALE_BOUNDS[1]), np.ones(n)
+
+def _ev(x: Dict[str, Any], solve_for: str, v: np.ndarray) -> np.ndarray:
+    return dcf_engine.batch_values(x, **{solve_for: v})["enterprise_value"]
+
+def solve_batch(df: pd.DataFrame, n_years: int, solve_for: str, target: str, target_values: np.ndarray,
+                convention: dcf_engine.Convention = dcf_engine.DEFAULT_CONVENTION) -> pd.DataFrame:
+    if solve_for not in solvable(convention):
+        raise ValueError(f"{SOLVE_FOR[solve_for]} cannot be solved with an exit-multiple terminal value.")
+    x = dcf_engine.batch_inputs(df, n_years, convention)
+    target_values = np.broadcast_to(np.asarray(target_values, dtype=float), (len(df),)).copy()
+    target_ev = target_values if target == "enterprise_value" else dcf_engine.equity_to_ev(x, target_values)
+    tol = REL_TOL * np.maximum(1.0, np.abs(target_ev))
+
+    lo, hi, guess = _brackets(x, solve_for)
+    f_lo = _ev(x, solve_for, lo) - target_ev
+    f_hi = _ev(x, solve_for, hi) - target_ev
+    evaluations = 2
+    bracketed = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) != np.sign(f_hi)) & np.isfinite(target_ev)
+
+    v = np.where((guess > lo) & (guess < hi), guess, (lo + hi) / 2.0)
+    iterations = np.zeros(len(df), dtype=int)
+    converged = np.zeros(len(df), dtype=bool)
+    for _ in range(MAX_ITER):
+        f_v = _ev(x, solve_for, v) - target_ev
+        evaluations += 1
+        converged |= bracketed & (np.abs(f_v) <= tol)
+        active = bracketed & ~converged
+        if not active.any():
+            break
+        iterations += active
+
+        # shrink the bracket around the root
+        same_as_lo = np.sign(f_v) == np.sign(f_lo)
+        lo = np.where(active & same_as_lo, v, lo); f_lo = np.where(active & same_as_lo, f_v, f_lo)
+        hi = np.where(active & ~same_as_lo, v, hi); f_hi = np.where(active & ~same_as_lo, f_v, f_hi)
+
+        h = FD_STEP * np.maximum(1.0, np.abs(v))
+        slope = (_ev(x, solve_for, v + h) - target_ev - f_v) / h
+        evaluations += 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = v - f_v / slope
+        step_ok = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        v = np.where(active, np.where(step_ok, newton, (lo + hi) / 2.0), v)
+
+    achieved = dcf_engine.batch_values(x, **{solve_for: v})
+    out = pd.DataFrame({
+        "company": dcf_engine.company_names(df),
+        "target": target_values,
+        "solved": np.where(converged, v, np.nan),
+        "achieved": np.where(converged, achieved[target], np.nan),
+        "iterations": iterations,
+        "converged": converged,
+    }, index=df.index)
+    out.attrs["evaluations"] = evaluations
+    return out
+
+def solve_summary(result: pd.DataFrame) -> Dict[str, Any]:
+    return {
+        "rows": int(len(result)),
+        "converged": int(result["converged"].sum()),
+        "max_iterations": int(result["iterations"].max()) if len(result) else 0,
+        "evaluations": int(result.attrs.get("evaluations", 0)),
+    }
@@ -0,0 +1,85 @@
+# statements.py — Financial statement tables (BS / IS / CF) for every workbook row at once
+# - Label → column-prefix maps defined once at module level
+# - Each statement's <prefix><year> columns are pulled as one numeric block per workbook
+# - Whole blocks are formatted in one pass; the renderer gets ready-made (label, [cells]) rows
+
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from formatting import NumberFormat, DEFAULT_FORMAT, format_array
+
+BS_MAP: List[Tuple[str, str]] = [
+    ("Total Shareholders' Fund","BS_Shareholders_Fund_FY"),
+    ("Long-term borrowings","BS_Long_Term_Borrowings_FY"),
+    ("Deferred tax liabilities","BS_Deferred_Tax_FY"),
+    ("Total Non-Current Liabilities","BS_Total_Non_Current_Liabilities_FY"),
+    ("Total Current Liabilities","BS_Total_Current_Liabilities_FY"),
+    ("Total Equity & Liabilities","BS_Total_Equity_Liabilities_FY"),
+    ("Inventories","BS_Inventories_FY"),
+    ("Trade Receivables","BS_Trade_Receivables_FY"),
+    ("Cash and Cash Equivalents","BS_Cash_FY"),
+    ("Total Current Assets","BS_Total_Current_Assets_FY"),
+    ("Total Non Current Assets","BS_Total_Non_Current_Assets_FY"),
+    ("Total Assets","BS_Total_Assets_FY"),
+]
+IS_MAP: List[Tuple[str, str]] = [
+    ("Revenue From Operations","Revenue_FY"),
+    ("Other Income","Other_Income_FY"),
+    ("Total Revenue","Total_Revenue_FY"),
+    ("Operating Expenses","Operating_Expenses_FY"),
+    ("Cost of Goods Sold","COGS_FY"),
+    ("Employee Benefit Expense","Employee_Expense_FY"),
+    ("Other Expense","Other_Expense_FY"),
+    ("EBITDA","EBITDA_FY"),
+    ("Depreciation","Depreciation_FY"),
+    ("EBIT","EBIT_FY"),
+    ("Finance Cost","Finance_Cost_FY"),
+    ("Profit before tax","PBT_FY"),
+    ("Income Taxes","Tax_FY"),
+    ("Net Income / (Loss)","Net_Income_FY"),
+]
+CF_MAP: List[Tuple[str, str]] = [
+    ("Profit before Tax","PBT_FY"),
+    ("Add: Depreciation","Depreciation_FY"),
+    ("Increase (Decrease) in Trade receivables","Inc_Trade_Receivables_FY"),
+    ("Increase (Decrease) in Inventory","Inc_Inventories_FY"),
+    ("Increase (Decrease) in Trade Payables","Inc_Trade_Payables_FY"),
+    ("Incremental Net Working Capital","Inc_NWC_FY"),
+    ("Additional CAPEX","CapEx_FY"),
+    ("Net Cash generated from Operating Activities","NCF_Operating_FY"),
+    ("Net Cash used in Investing Activities","NCF_Investing_FY"),
+    ("Net Cash generated from Financing Activities","NCF_Financing_FY"),
+    ("Net change in Cash & Cash Equivalents","NCF_Change_FY"),
+    ("Opening Cash Balance","Opening_Cash_FY"),
+    ("Closing Cash Balance","Closing_Cash_FY"),
+]
+STATEMENT_MAPS: Dict[str, List[Tuple[str, str]]] = {"bs": BS_MAP, "is": IS_MAP, "cf": CF_MAP}
+
+def statement_block(df: pd.DataFrame, prefix_map: List[Tuple[str, str]], n_years: int) -> np.ndarray:
+    # (rows, labels, years) float block; absent columns and unparsable cells are NaN
+    # (only columns not already typed by schema.coerce_frame need converting)
+    cols = [f"{prefix}{i}" for _, prefix in prefix_map for i in range(1, n_years+1)]
+    untyped = [c for c in cols if c in df.columns and df[c].dtype.kind != "f"]
+    block = df.reindex(columns=cols)
+    if untyped:
+        block[untyped] = block[untyped].apply(pd.to_numeric, errors="coerce")
+    return block.to_numpy(dtype=float).reshape(len(df), len(prefix_map), n_years)
+
+def build_statement_tables(df: pd.DataFrame, n_years: int,
+                           number_format: NumberFormat = DEFAULT_FORMAT) -> List[Dict[str, Any]]:
+    # one entry per positional row of df:
+    # {"bs_rows": [(label, [cells])], "bs_values": (labels, years) floats, "bs_has_data": bool, ...}
+    years = [f"FY{i}" for i in range(1, n_years+1)] or ["FY"]
+    tables: List[Dict[str, Any]] = [{"years": years} for _ in range(len(df))]
+    for key, prefix_map in STATEMENT_MAPS.items():
+        values = statement_block(df, prefix_map, n_years)
+        cells = format_array(values, number_format)
+        has_data = np.isfinite(values).any(axis=(1, 2))
+        labels = [label for label, _ in prefix_map]
+        for r, table in enumerate(tables):
+            table[f"{key}_rows"] = [(label, cells[r, j].tolist()) for j, label in enumerate(labels)]
+            table[f"{key}_values"] = values[r]
+            table[f"{key}_has_data"] = bool(has_data[r])
+    return tables
@@ -0,0 +1,34 @@
+import os, tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# app modules read their settings from the environment at import: keep the results store and
+# metrics textfile out of the working tree, and render PDFs in-process
+_TMP = tempfile.mkdtemp(prefix="valuation-tests-")
+os.environ["VALUATION_DB"] = os.path.join(_TMP, "results.sqlite")
+os.environ["VALUATION_METRICS_TEXTFILE"] = os.path.join(_TMP, "metrics.prom")
+os.environ["VALUATION_RENDER_WORKERS"] = "0"
+os.environ.pop("VALUATION_PROFILE_DIR", None)
+
+@pytest.fixture
+def make_inputs():
+    # input rows in the workbook layout: core fields plus NOIAT / Depreciation / CapEx / Inc_NWC per year
+    def make(rows: int = 3, years: int = 5, seed: int = 0) -> pd.DataFrame:
+        r = np.random.default_rng(seed)
+        data = {
+            "Company Name": [f"Company {i}" for i in range(rows)],
+            "WACC": r.choice([12.0, 13.5, 15.0], rows), "TGR": r.choice([2.0, 3.0, 4.0], rows),
+            "Opening Cash": r.uniform(0, 100, rows).round(2),
+            "Other Non-Op Assets": r.uniform(0, 50, rows).round(2),
+            "Debt": r.uniform(0, 200, rows).round(2), "DLOM": r.choice([0.0, 10.0], rows),
+            "Money Infusion": 0.0, "First_Period_Fraction": r.choice([1.0, 0.5], rows),
+        }
+        for i in range(1, years + 1):
+            data[f"NOIAT_{i}"] = r.uniform(250, 500, rows).round(2)
+            data[f"Depreciation_{i}"] = r.uniform(5, 50, rows).round(2)
+            data[f"CapEx_{i}"] = r.uniform(5, 80, rows).round(2)
+            data[f"Inc_NWC_{i}"] = r.uniform(0, 30, rows).round(2)
+        return pd.DataFrame(data)
+    return make
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+def _widget(widgets, label: str):
+    return next(w for w in widgets if w.label.startswith(label))
+
+def test_missing_input_file_with_extra_grids_stops_and_exports_metrics():
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    _widget(at.number_input, "Extra driver × driver grids").set_value(2)
+    at.run()
+    _widget(at.text_input, "Or read inputs").set_value("/nonexistent/inputs.parquet")
+    at.run()
+    assert not at.exception
+    assert [e.value for e in at.error][0].startswith("Failed to read inputs")
+    with open(os.environ["VALUATION_METRICS_TEXTFILE"], encoding="utf-8") as f:
+        assert 'valuation_failures_total{stage="load_inputs"}' in f.read()
+
+def _app_on(frame, tmp_path) -> AppTest:
+    path = tmp_path / "inputs.csv"
+    frame.to_csv(path, index=False)
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    _widget(at.text_input, "Or read inputs").set_value(str(path))
+    return at.run()
+
+def _valued(at: AppTest) -> str:
+    return next(m.value for m in at.metric if m.label == "Companies valued")
+
+def test_unreadable_fill_is_rejected_and_a_number_is_applied(make_inputs, tmp_path):
+    frame = make_inputs(3)
+    frame.loc[1, "Opening Cash"] = np.nan
+    at = _app_on(frame, tmp_path)
+    assert _valued(at) == "2 / 3"
+
+    at.text_input(key="miss_1_Opening Cash").set_value("12k")
+    next(b for b in at.button if b.key == "apply_1").click()
+    at.run()
+    assert not at.exception
+    assert any(e.value.startswith("Not a number: Opening Cash") for e in at.error)
+    at.run()
+    assert not at.exception and _valued(at) == "2 / 3"
+
+    at.text_input(key="miss_1_Opening Cash").set_value("12,000")
+    next(b for b in at.button if b.key == "apply_1").click()
+    at.run()
+    assert not at.exception and _valued(at) == "3 / 3"
+
+def test_unchanged_rerun_reuses_report_outputs(make_inputs, tmp_path, monkeypatch):
+    import report_render
+    rendered = []
+    for name in ("render_html", "render_xlsx"):
+        real = getattr(report_render, name)
+        monkeypatch.setattr(report_render, name, lambda *a, _real=real, _name=name: rendered.append(_name) or _real(*a))
+    at = _app_on(make_inputs(2), tmp_path)
+    assert not at.exception
+    assert sorted(rendered) == ["render_html"] * 2 + ["render_xlsx"] * 2
+
+    at.run()
+    assert not at.exception and len(rendered) == 4
+
+    _widget(at.number_input, "Decimals").set_value(1)
+    at.run()
+    assert not at.exception and len(rendered) == 8
+
+def test_extra_grids_become_report_pages(make_inputs, tmp_path, monkeypatch):
+    import report_render
+    grids = []
+    real = report_render.render_html
+    monkeypatch.setattr(report_render, "render_html",
+                        lambda ctx: grids.append([g["title"] for g in ctx["driver_grids"]]) or real(ctx))
+    at = _app_on(make_inputs(2), tmp_path)
+    _widget(at.number_input, "Extra driver × driver grids").set_value(2)
+    at.run()
+    assert not at.exception
+    assert grids[-2:] == [["WACC × Terminal growth", "Terminal growth × WACC"]] * 2
+
+def test_duplicate_rows_reuse_one_valuation(make_inputs, tmp_path, monkeypatch):
+    import dcf_engine
+    computed = []
+    real = dcf_engine.value_inputs
+    monkeypatch.setattr(dcf_engine, "value_inputs", lambda x, *a, **k: computed.append(x) or real(x, *a, **k))
+    frame = make_inputs(2)
+    frame.loc[2] = frame.loc[0]
+    frame.loc[2, "Company Name"] = "Company 0 (scenario B)"
+    at = _app_on(frame, tmp_path)
+    assert not at.exception
+    assert len(computed) == 2
+    assert "Same inputs as Company 0 — valuation reused." in [c.value for c in at.caption]
+
+def test_summary_profile_skips_the_batch_tables_it_does_not_show(make_inputs, tmp_path, monkeypatch):
+    import dcf_engine
+    built = []
+    for name in ("tornado", "exit_multiple_tables"):
+        real = getattr(dcf_engine, name)
+        monkeypatch.setattr(dcf_engine, name, lambda *a, _real=real, _name=name, **k: built.append(_name) or _real(*a, **k))
+    at = _app_on(make_inputs(2), tmp_path)
+    assert sorted(set(built)) == ["exit_multiple_tables", "tornado"]
+    built.clear()
+    _widget(at.radio, "Report contents").set_value("summary")
+    at.run()
+    assert not at.exception and built == []
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+import comps
+
+def _peers(n: int = 20000, seed: int = 0) -> pd.DataFrame:
+    r = np.random.default_rng(seed)
+    raw = pd.DataFrame({
+        "Company": [f"Peer {i}" for i in range(n)],
+        "Sector": r.choice(["Auto", "IT", "Pharma"], n),
+        "EV": r.uniform(100, 10000, n),
+        "Revenue": r.uniform(10, 5000, n),
+        "EBITDA": r.uniform(1, 800, n),
+    })
+    raw.loc[::97, "Revenue"] = np.nan
+    return comps.normalize(raw)
+
+def _expected(peers: pd.DataFrame, sector: str, size: float) -> set:
+    rev = peers["Revenue"].to_numpy(float)
+    mask = (rev >= size / comps.SIZE_BAND) & (rev <= size * comps.SIZE_BAND)
+    if sector:
+        mask &= (peers["sector_key"] == sector.lower()).to_numpy()
+    return set(peers.loc[mask, "Name"])
+
+def test_peer_positions_match_a_scan_across_sectors():
+    peers = _peers()
+    index = comps.build_peer_index(peers)
+    for sector in ["", "unknown", "Auto", "IT", "Pharma"]:
+        for size in [50.0, 500.0, 3000.0]:
+            found = index["peers"].iloc[comps.peer_positions(index, sector, size)]
+            expected = _expected(peers, sector if sector in ("Auto", "IT", "Pharma") else "", size)
+            assert set(found["Name"]) == expected, (sector, size)
+    everyone = index["peers"].iloc[comps.peer_positions(index, "", 500.0)]
+    assert everyone["sector_key"].nunique() == 3
+
+def test_peer_positions_without_size_return_the_sector():
+    index = comps.build_peer_index(_peers(300))
+    found = index["peers"].iloc[comps.peer_positions(index, "IT", float("nan"))]
+    assert set(found["sector_key"]) == {"it"}
+    assert len(comps.peer_positions(index, "", float("nan"))) == 300
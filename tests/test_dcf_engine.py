@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+import dcf_engine
+
+def test_ingest_frame_matches_ingest_row(make_inputs):
+    df = make_inputs(6, 3)
+    df["EBITDA_3"] = [120.0, np.nan, 95.5, None, 80.0, 60.25]
+    for mode in dcf_engine.PRECISION_MODES:
+        typed = dcf_engine.ingest_frame(df, 3, mode)
+        for (_, row), x in zip(df.iterrows(), typed):
+            assert x == dcf_engine.ingest_row(row, 3, mode), mode
+
+def test_value_inputs_from_frame_matches_compute_valuation(make_inputs):
+    df = make_inputs(4, 5)
+    typed = dcf_engine.ingest_frame(df, 5, "decimal")
+    for (_, row), x in zip(df.iterrows(), typed):
+        a = dcf_engine.value_inputs(x, 5, "decimal")
+        b = dcf_engine.compute_valuation(row, 5, "decimal")
+        assert a["equity_post_money"] == b["equity_post_money"]
+
+def test_scenario_rates_do_not_fill_the_discount_table(make_inputs):
+    df = make_inputs(40)
+    df["WACC"] = np.random.default_rng(3).uniform(10, 16, len(df))
+    dcf_engine.clear_discount_cache()
+    base = dcf_engine.compute_batch(df, 5)
+    base_profiles = dcf_engine.discount_cache_stats()["size"]
+    assert 0 < base_profiles <= len(df)
+
+    spec = dcf_engine.GridSpec("wacc", "tgr", dcf_engine.grid_steps(-3, 3, 7), dcf_engine.grid_steps(-1, 1, 5))
+    dcf_engine.tornado(df, 5)
+    dcf_engine.driver_grids(df, 5, [spec])
+    dcf_engine.exit_multiple_tables(df, 5)
+    assert dcf_engine.discount_cache_stats()["size"] == base_profiles
+
+    # overridden rates give the same values as the table would
+    x = dcf_engine.batch_inputs(df, 5)
+    shifted = x["wacc"] + 0.01
+    direct = dcf_engine.batch_values(x, wacc=shifted)["enterprise_value"]
+    tabled = dcf_engine.batch_values(x, wacc=shifted, dfac=dcf_engine.batch_discount_factors(
+        shifted, x["periods"]))["enterprise_value"]
+    assert np.allclose(direct, tabled, rtol=1e-12)
+    assert np.isfinite(base["enterprise_value"]).all()
+
+CONVENTIONS = [dcf_engine.Convention(discounting, stub, terminal, 8.0, "fcff")
+               for discounting, stub in [("end", None), ("mid", None), ("stub", 0.25)]
+               for terminal in dcf_engine.TERMINAL_METHODS]
+
+def test_mid_year_discounting_matches_the_closed_form(make_inputs):
+    row = make_inputs(1, 3).iloc[0]
+    convention = dcf_engine.Convention("mid")
+    res = dcf_engine.compute_valuation(row, 3, "float", convention=convention)
+    w, g = row["WACC"] / 100, row["TGR"] / 100
+    fcf = [row[f"NOIAT_{i}"] + row[f"Depreciation_{i}"] - row[f"CapEx_{i}"] - row[f"Inc_NWC_{i}"] for i in (1, 2, 3)]
+    f = row["First_Period_Fraction"]
+    times = [f / 2, f + 0.5, f + 1.5]
+    ev = sum(c / (1 + w) ** t for c, t in zip(fcf, times)) + fcf[-1] * (1 + g) / (w - g) / (1 + w) ** times[-1]
+    assert np.isclose(float(res["enterprise_value"]), ev, rtol=1e-12)
+
+def test_every_convention_values_the_same_in_batch_row_and_sensitivity(make_inputs):
+    df = make_inputs(5, 4)
+    for convention in CONVENTIONS:
+        batch = dcf_engine.compute_batch(df, 4, convention)
+        for (_, row), ev in zip(df.iterrows(), batch["enterprise_value"]):
+            res = dcf_engine.compute_valuation(row, 4, "float", convention=convention)
+            assert np.isclose(float(res["enterprise_value"]), ev, rtol=1e-9), convention
+            if convention.stub is not None:
+                assert res["periods"][0] == convention.stub
+            sens = dcf_engine.build_sensitivity(res["fcf_list"], res["periods"], float(res["wacc"]),
+                                                float(res["tgr"]), "float", convention=convention)
+            base = sens["values"][sens["g_values"].index(round(float(res["tgr"]), 4))][
+                sens["wacc_values"].index(round(float(res["wacc"]), 4))]
+            assert np.isclose(base, float(res["enterprise_value"]), atol=0.01), convention
+
+def test_exit_grid_and_implied_growth_agree_with_the_exit_valuation(make_inputs):
+    df = make_inputs(4, 5)
+    df["EBITDA_5"] = df["NOIAT_5"] * 1.4
+    df.loc[0, "TGR"] = df.loc[0, "WACC"]   # Gordon would divide by zero; an exit multiple doesn't care
+    convention = dcf_engine.Convention("mid", terminal="exit", exit_multiple=7.5, exit_basis="ebitda")
+    batch = dcf_engine.compute_batch(df, 5, convention)
+    tables = dcf_engine.exit_multiple_tables(df, 5, convention)
+    centre = list(dcf_engine.EXIT_GRID_STEPS).index(0.0)
+    for r, table in enumerate(tables):
+        assert table["rows"][centre][0] == "7.5x"
+        assert np.isclose(table["values"][centre][centre], batch["enterprise_value"][r], rtol=1e-12)
+        assert float(table["crosscheck"][centre][2].replace(",", "")) == round(batch["enterprise_value"][r], 2)
+    # Gordon at the implied growth reproduces the exit-multiple EV
+    x = dcf_engine.batch_inputs(df, 5, convention)
+    growth = dcf_engine.implied_growth(x, np.full((4, 1), 7.5))[:, 0]
+    gordon = dcf_engine.compute_batch(df.assign(TGR=growth * 100), 5, convention._replace(terminal="gordon"))
+    assert np.allclose(gordon["enterprise_value"], batch["enterprise_value"], rtol=1e-9)
+
+def test_driver_grids_match_revaluing_the_shifted_inputs(make_inputs):
+    df = make_inputs(3, 4)
+    specs = [dcf_engine.GridSpec("dlom_pct", "wacc", (-5.0, 0.0, 5.0), (-1.0, 0.0, 2.0), "equity_post_money"),
+             dcf_engine.GridSpec("capex", "tgr", (-10.0, 0.0, 20.0), (0.0, 0.5), "enterprise_value")]
+    dlom_wacc, capex_tgr = dcf_engine.driver_grids(df, 4, specs)
+    capex = [f"CapEx_{i}" for i in range(1, 5)]
+    for i, dlom in enumerate(specs[0].row_steps):
+        for j, wacc in enumerate(specs[0].col_steps):
+            shifted = dcf_engine.compute_batch(df.assign(DLOM=df["DLOM"] + dlom, WACC=df["WACC"] + wacc), 4)
+            assert np.allclose(dlom_wacc["values"][:, i, j], shifted["equity_post_money"], rtol=1e-12)
+    for i, scale in enumerate(specs[1].row_steps):
+        for j, tgr in enumerate(specs[1].col_steps):
+            shifted = df.assign(TGR=df["TGR"] + tgr)
+            shifted[capex] = df[capex] * (1 + scale / 100)
+            assert np.allclose(capex_tgr["values"][:, i, j], dcf_engine.compute_batch(shifted, 4)["enterprise_value"],
+                               rtol=1e-12)
+    table = dcf_engine.driver_grid_tables(df, 4, specs)[0][1]
+    assert table["base"] == (1, 0) and table["col_labels"][1] == f"{df['TGR'][0] / 100 + 0.005:.2%}"
+    with pytest.raises(ValueError):
+        dcf_engine.driver_grids(df, 4, [specs[0]._replace(col_driver="dlom_pct")])
@@ -0,0 +1,20 @@
+from decimal import Decimal
+
+import numpy as np
+
+import formatting
+from formatting import NumberFormat
+
+def test_indian_grouping_and_parenthesised_negatives():
+    nf = NumberFormat(2, "indian", "parens")
+    assert formatting.format_list([1234567.891, -12345678.0, 999.5, -0.25], nf) == \
+        ["12,34,567.89", "(1,23,45,678.00)", "999.50", "(0.25)"]
+    assert formatting.format_list([1234567.891, -1234.0], NumberFormat(0, "none", "minus")) == ["1234568", "-1234"]
+
+def test_bulk_format_matches_the_scalar_formatter_on_mixed_cells():
+    nf = NumberFormat(3, "international", "parens")
+    cells = [[Decimal("-1234.5678"), 12, None], ["7.25", np.nan, float("inf")]]
+    out = formatting.format_list(cells, nf, blank="n/a")
+    assert out == [["(1,234.568)", "12.000", "n/a"], ["7.250", "n/a", "n/a"]]
+    assert out[0][:2] == [formatting.fmt_num(v, 3, nf) for v in cells[0][:2]]
+    assert formatting.fmt_num("not a number") == ""
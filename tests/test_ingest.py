@@ -0,0 +1,28 @@
+import io
+
+import pandas as pd
+
+import ingest
+
+def test_join_matches_repeated_companies_by_occurrence():
+    core = pd.DataFrame({"Company Name": ["Acme", "Beta", "acme "], "WACC": [0.10, 0.11, 0.12]})
+    proj = pd.DataFrame({"Company Name": ["ACME", "Beta", "Acme"], "NOIAT_1": [1.0, 2.0, 3.0]})
+    joined = ingest.join_on_company([core, proj])
+    assert list(joined.columns) == ["Company Name", "WACC", "NOIAT_1"]
+    assert joined["NOIAT_1"].tolist() == [1.0, 2.0, 3.0]
+
+def test_join_leaves_unmatched_occurrences_blank():
+    core = pd.DataFrame({"Company Name": ["Acme", "Acme"], "WACC": [0.10, 0.12]})
+    proj = pd.DataFrame({"Company Name": ["Acme"], "NOIAT_1": [1.0]})
+    joined = ingest.join_on_company([core, proj])
+    assert len(joined) == 2
+    assert joined["NOIAT_1"].iloc[0] == 1.0 and pd.isna(joined["NOIAT_1"].iloc[1])
+
+def test_workbook_sheets_parse_in_order():
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as xw:
+        pd.DataFrame({"Company Name": ["Acme"], "WACC": [0.1]}).to_excel(xw, sheet_name="Core Inputs", index=False)
+        pd.DataFrame({"Company Name": ["Acme"], "NOIAT_1": [5.0]}).to_excel(xw, sheet_name="Projections", index=False)
+    loaded = ingest.load_workbook(buf.getvalue())
+    assert list(loaded["roles"]) == ["Core Inputs", "Projections"]
+    assert loaded["frame"]["NOIAT_1"].tolist() == [5.0]
@@ -0,0 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+def test_concurrent_textfile_writes_leave_a_complete_file(tmp_path):
+    path = str(tmp_path / "valuation.prom")
+    metrics.ROWS_PROCESSED.inc()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: metrics.write_textfile(path), range(200)))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == metrics.REGISTRY.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["valuation.prom"]
@@ -0,0 +1,35 @@
+import io
+
+import dcf_engine
+import portfolio
+import report_render
+
+def test_portfolio_pdf_renders_under_the_report_lock(make_inputs, monkeypatch):
+    summary = portfolio.portfolio_summary(dcf_engine.compute_batch(make_inputs(4), 5))
+    held = []
+    create_pdf = portfolio.pisa.CreatePDF
+    def spy(*args, **kwargs):
+        held.append(report_render.PDF_LOCK.locked())
+        return create_pdf(*args, **kwargs)
+    monkeypatch.setattr(portfolio.pisa, "CreatePDF", spy)
+    pdf = portfolio.render_portfolio_pdf(summary, report_render.CSS_TEXT, "2026-03-31")
+    assert held == [True]
+    assert pdf.read(4) == b"%PDF"
+
+def test_portfolio_pdf_ranks_companies_by_equity(make_inputs, monkeypatch):
+    frame = make_inputs(4)
+    frame.loc[0, "Debt"] = 1e6   # largest EV need not be largest equity
+    summary = portfolio.portfolio_summary(dcf_engine.compute_batch(frame, 5), top_n=3)
+    top = summary["top_equity"]
+    assert top["equity_rank"].tolist() == [1, 2, 3]
+    assert top["equity_post_money"].is_monotonic_decreasing
+    sources = []
+    create_pdf = portfolio.pisa.CreatePDF
+    def spy(src, *args, **kwargs):
+        sources.append(src.getvalue())
+        return create_pdf(io.StringIO(sources[-1]), *args, **kwargs)
+    monkeypatch.setattr(portfolio.pisa, "CreatePDF", spy)
+    portfolio.render_portfolio_pdf(summary, report_render.CSS_TEXT, "2026-03-31")
+    equity_table = sources[0].split("Top companies by Equity Value")[1]
+    assert equity_table.index(top["company"].iloc[0]) < equity_table.index(top["company"].iloc[1])
+    assert "Company 0" not in equity_table
@@ -0,0 +1,25 @@
+import cProfile
+import threading
+
+import pytest
+
+import profiling
+
+def _busy():
+    return sum(i * i for i in range(20000))
+
+def test_open_row_is_closed_when_the_loop_raises(tmp_path):
+    with pytest.raises(RuntimeError):
+        with profiling.RowProfiler(str(tmp_path), "run") as rp:
+            rp.row(0, "Acme")
+            raise RuntimeError("row failed")
+    assert [r["company"] for r in rp.results] == ["Acme"]
+    assert not [t for t in threading.enumerate() if t.name == "stack-sampler"]
+
+def test_worker_profile_is_merged_into_the_row(tmp_path):
+    with profiling.RowProfiler(str(tmp_path), "run") as rp:
+        rp.row(0, "Acme")
+        worker = cProfile.Profile()
+        worker.runcall(_busy)
+        worker.dump_stats(rp.worker_profile())
+    assert any("_busy" in h["function"] for h in rp.results[0]["hotspots"])
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from xhtml2pdf import document as pisa_document
+from xhtml2pdf.context import pisaContext
+
+import report_render
+
+def test_preparsed_context_is_only_active_inside_a_render():
+    assert pisa_document.pisaContext is pisaContext
+    with report_render.pdf_context():
+        assert pisa_document.pisaContext is report_render.PreparsedCSSContext
+    assert pisa_document.pisaContext is pisaContext
+
+def test_concurrent_renders_restore_the_stock_context():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: report_render.warm_up(), range(8)))
+    assert pisa_document.pisaContext is pisaContext
+    assert 0 < len(report_render.PreparsedCSSContext._parsed) <= report_render.PARSED_CSS_MAX
+
+def _section(name: str) -> report_render.ReportSection:
+    return next(s for s in report_render.REPORT_SECTIONS if s.name == name)
+
+def test_identical_sections_render_once_per_distinct_context():
+    cache = report_render.SectionCache(size=2)
+    theory, sign_off = _section("theory_pages"), _section("sign_off")
+    pages = {"theory_extra_pages": report_render.build_theory_pages(min_pages=2)}
+    first = "".join(cache.render(theory, {**pages, "company_name": "Acme"}))
+    again = "".join(cache.render(theory, {**pages, "company_name": "Beta"}))   # not read by the section
+    assert first == again == theory.template.render(**pages)
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    for who in ("Acme", "Beta"):
+        ctx = {"prepared_by": who, "valuation_date": "31 March 2026"}
+        assert "".join(cache.render(sign_off, ctx)) == sign_off.template.render(**ctx)
+    assert cache.stats() == {"hits": 1, "misses": 3, "size": 2}   # least recently used dropped
+
+    # a value without an exact fingerprint is rendered every time, never cached
+    ctx = {"prepared_by": object(), "valuation_date": "31 March 2026"}
+    assert report_render.section_key(sign_off, ctx) is None
+    "".join(cache.render(sign_off, ctx))
+    assert cache.stats()["misses"] == 3
+
+def test_profiles_evaluate_only_included_sections_and_skip_blank_ones():
+    calls = []
+    def lazy(name, value):
+        return report_render.Lazy(lambda: calls.append(name) or value)
+    ctx = {
+        "company_name": "Acme", "history": {"columns": ["Metric", "Value"], "rows": [["No data available", "—"]]},
+        "bs_has_data": False, "is_has_data": False, "cf_has_data": False,
+        "appendices": lazy("appendices", [{"title": "Appendix A", "columns": [], "rows": []}]),
+        "theory_extra_pages": lazy("theory", ["<p>page</p>"]),
+        "driver_grids": lazy("grids", []),
+    }
+    summary = report_render.compose(ctx, "summary")
+    assert calls == []
+    assert summary["sections"] == ["head", "cover", "executive_summary", "wacc_dcf", "sign_off", "tail"]
+    assert [t for t, _ in summary["toc"]] == ["Executive Summary", "WACC & DCF Valuation"]
+
+    full = report_render.compose(ctx, "full")
+    assert sorted(calls) == ["appendices", "grids", "theory"]
+    assert {"history", "statements", "driver_grids"}.isdisjoint(full["sections"])
+    assert {"theory_pages", "appendices"} <= set(full["sections"])
+    assert full["toc"][-1] == ("Appendices", f"{len(full['toc'])}+")
@@ -0,0 +1,38 @@
+import datetime
+
+import dcf_engine
+import results_store
+
+DAY = datetime.date(2026, 3, 31)
+
+def _record(conn, row, date=DAY, precision="float", convention=dcf_engine.DEFAULT_CONVENTION, run="run-1"):
+    res = dcf_engine.compute_valuation(row, 5, convention=convention)
+    return results_store.record_valuation(conn, run, 0, row["Company Name"], date, row, res, precision=precision)
+
+def test_rerun_with_the_same_valuation_is_not_recorded_twice(make_inputs, tmp_path):
+    conn = results_store.connect(str(tmp_path / "store.sqlite"))
+    results_store.start_run(conn, "run-1")
+    row = make_inputs(1).iloc[0]
+    first = _record(conn, row)
+    assert _record(conn, row) == first
+    # columns the DCF does not read, and 12 vs 12.0, are the same valuation
+    extra = row.copy()
+    extra["Sector"] = "IT"
+    assert _record(conn, extra) == first
+    whole = row.astype(object)
+    whole["Money Infusion"] = 0
+    assert _record(conn, whole) == first
+
+def test_new_date_convention_precision_or_input_adds_a_row(make_inputs, tmp_path):
+    conn = results_store.connect(str(tmp_path / "store.sqlite"))
+    results_store.start_run(conn, "run-1")
+    row = make_inputs(1).iloc[0]
+    ids = {_record(conn, row)}
+    ids.add(_record(conn, row, date=DAY + datetime.timedelta(days=1)))
+    ids.add(_record(conn, row, convention=dcf_engine.Convention(discounting="mid")))
+    ids.add(_record(conn, row, precision="decimal:12"))
+    changed = row.copy()
+    changed["Debt"] += 1.0
+    ids.add(_record(conn, changed))
+    assert len(ids) == 5
+    assert conn.execute("SELECT COUNT(*) FROM valuations").fetchone()[0] == 5
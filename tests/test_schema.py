@@ -0,0 +1,36 @@
+import numpy as np
+
+import dcf_engine
+import schema
+
+def test_horizon_spans_every_projection_family(make_inputs):
+    df = make_inputs(2, 5)
+    df["Depreciation_7"] = 10.0
+    df["Revenue_FY3"] = 100.0
+    horizon = schema.detect_horizon(df)
+    assert (horizon.years, horizon.statement_years) == (7, 3)
+    assert horizon.short_families == {"CapEx_": 5, "Inc_NWC_": 5, "NOIAT_": 5}
+
+def test_rows_with_shorter_forecasts_value_in_one_batch(make_inputs):
+    df = make_inputs(2, 5)
+    df.loc[1, [f"{p}5" for p in dcf_engine.PER_YEAR_PREFIXES]] = np.nan
+    x = dcf_engine.batch_inputs(df, schema.detect_horizon(df).years)
+    assert x["horizon"].tolist() == [5, 4] and x["complete"].all()
+    short = dcf_engine.compute_valuation(df.iloc[1], 4, "float")
+    assert np.isclose(dcf_engine.batch_values(x)["enterprise_value"][1], short["enterprise_value"])
+
+def test_coercion_types_every_schema_column_and_locates_bad_cells(make_inputs):
+    df = make_inputs(3, 2).astype(object)
+    df.loc[0, "WACC"] = "14%"
+    df.loc[1, "Debt"] = "(1,250.5)"
+    df.loc[2, "NOIAT_2"] = "12k"
+    df.loc[0, "CapEx_1"] = "n/a"
+    df.loc[1, "Company Name"] = "  Beta  "
+    df["Notes"] = ["x", 1, None]
+    typed, issues = schema.coerce_frame(df)
+    numeric = [c for c in df.columns if schema.column_spec(c) is not None and schema.column_spec(c).kind == "number"]
+    assert (typed[numeric].dtypes == float).all()
+    assert typed.loc[0, "WACC"] == 14.0 and typed.loc[1, "Debt"] == -1250.5
+    assert np.isnan(typed.loc[2, "NOIAT_2"]) and np.isnan(typed.loc[0, "CapEx_1"])
+    assert typed.loc[1, "Company Name"] == "Beta" and typed["Notes"].tolist() == ["x", 1, None]
+    assert issues.to_dict("records") == [{"row": 3, "company": "Company 2", "column": "NOIAT_2", "value": "12k"}]
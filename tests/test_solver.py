@@ -0,0 +1,19 @@
+import pytest
+
+import dcf_engine
+import solver
+
+EXIT = dcf_engine.Convention(terminal="exit", exit_multiple=8.0, exit_basis="fcff")
+
+def test_implied_growth_is_not_offered_with_an_exit_multiple(make_inputs):
+    assert "tgr" in solver.solvable(dcf_engine.DEFAULT_CONVENTION)
+    assert solver.solvable(EXIT) == ["wacc", "noiat_scale"]
+    with pytest.raises(ValueError):
+        solver.solve_batch(make_inputs(3, 5), 5, "tgr", "enterprise_value", 1000.0, EXIT)
+
+def test_implied_wacc_recovers_the_input_under_an_exit_multiple(make_inputs):
+    df = make_inputs(20, 5)   # positive FCF every year keeps EV monotone in WACC
+    base = dcf_engine.compute_batch(df, 5, EXIT)
+    solved = solver.solve_batch(df, 5, "wacc", "enterprise_value", base["enterprise_value"].to_numpy(), EXIT)
+    assert solved["converged"].all()
+    assert (abs(solved["solved"] - df["WACC"] / 100.0) < 1e-6).all()